@@ -0,0 +1,51 @@
+"""
+Headless batch profiling of CSV files: every file (or group of columns) is profiled
+on a pool of worker processes with the analyses of the app's tabs, and the summary
+tables and frequent values are written to a JSON report (or a long Parquet table).
+
+Usage: python app/batch_profile.py data/extracts "archive/*.csv" --output report.json --workers 8
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.batch import DEFAULT_MEMORY_BYTES, find_csv_files, run_batch, write_report
+from common.sketches import DEFAULT_ERROR
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("--output", default="profile_report.json", help="Report path (.json or .parquet)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_BYTES // 1024 ** 2,
+                        help="Memory budget of each worker; larger files are profiled out-of-core")
+    parser.add_argument("--approximate", action="store_true",
+                        help="Estimate unique counts and frequent values with sketches")
+    parser.add_argument("--error", type=float, default=DEFAULT_ERROR, help="Relative error of the sketches")
+    args = parser.parse_args()
+
+    files = find_csv_files(args.inputs)
+    if not files:
+        parser.error("no CSV file found")
+    print(f"Profiling {len(files)} files on {args.workers} workers")
+
+    def progress(task):
+        status = f"failed ({task['error']})" if 'error' in task else f"{task['seconds']:.2f}s"
+        part = "" if task['columns'] is None else f" [{len(task['columns'])} columns]" if task['columns'] else " [dataset]"
+        print(f"  {task['file']}{part}: {status}")
+
+    reports, totals = run_batch(files, workers=args.workers, memory_bytes=args.memory_mb * 1024 ** 2,
+                                approximate=args.approximate, error=args.error, progress=progress)
+    write_report(reports, totals, args.output)
+    print(f"Profiled {totals['files']} files ({totals['failed']} failed), {totals['rows']:,} rows, "
+          f"{totals['bytes'] / 1024 ** 2:,.1f} MB in {totals['seconds']:.2f}s: "
+          f"{totals['files_per_second']:.2f} files/s, {totals['rows_per_second']:,.0f} rows/s")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,10 +11,14 @@ parent_dir = str(Path(current_dir).resolve().parents[0])
 sys.path.append(parent_dir)
 
 # Import custom functions
-from tab_df.display import display_tab_df_content
+from tab_df.display import (display_performance, display_progressive_load, display_tab_df_content,
+                            display_profiling_progress, get_recorder)
 from tab_num.display import display_tab_num_content
 from tab_text.display import display_tab_text_content
 from tab_date.display import display_tab_date_content
+from common.disk_cache import DISK_CACHE
+from common.instrument import recording
+from common.parsers import PARSERS
 
 # Set Streamlit Page Configuration
 st.set_page_config(
@@ -24,32 +28,72 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-# Set objects in Streamlit session state
-st.session_state["file_path"] = None
-st.session_state["df"] = None
-st.session_state["dataset"] = None
-st.session_state["selected_num_col"] = None
-st.session_state["num_column"] = None
-st.session_state["selected_text_col"] = None
-st.session_state["text_column"] = None
-st.session_state["selected_date_col"] = None
-st.session_state["date_column"] = None
+# Set objects in Streamlit session state (only on the first run, so they survive reruns)
+for key in [
+    "file_path", "file_key", "file_hash", "df", "dataset",
+    "selected_num_col", "num_column",
+    "selected_text_col", "text_column",
+    "selected_date_col", "date_column",
+]:
+    if key not in st.session_state:
+        st.session_state[key] = None
 
 # Display Title
 st.title("CSV Explorer")
 
+# Sidebar with the loading settings
+with st.sidebar:
+    st.header("Settings")
+    out_of_core = st.checkbox("Out-of-core mode (profile the CSV chunk by chunk)", value=False)
+    chunksize = st.number_input("Chunk size (rows)", min_value=1_000, value=100_000, step=10_000, disabled=not out_of_core)
+    optimize_dtypes = st.checkbox("Optimize memory (downcast numbers, load text as categories/Arrow strings)", value=True, disabled=out_of_core)
+    parser = st.selectbox("CSV parser", options=["auto", *PARSERS], disabled=out_of_core,
+                          help="auto: pandas for small files, pyarrow's multi-threaded reader for large ones")
+    approximate = st.checkbox("Approximate mode (estimate unique counts and frequent values with sketches)", value=False)
+    error = st.select_slider("Relative error of the sketches", options=[0.001, 0.005, 0.01, 0.02, 0.05], value=0.01)
+    progressive = st.checkbox("Show estimates from a sample while the file loads", value=True, disabled=out_of_core)
+    persist = st.checkbox("Keep loaded files and profiles in the on-disk cache", value=True)
+    background = st.checkbox("Profile every column in the background after loading", value=True)
+    processes = st.checkbox("Use worker processes for the column analyses", value=False, disabled=not background)
+    instrument = st.checkbox("Record the time and memory of every stage (Performance panels)", value=False)
+    trace_memory = st.checkbox("Trace memory allocations (slower)", value=True, disabled=not instrument)
+
 # Add Window to upload CSV file
 with st.expander("ℹ️ - Streamlit application for performing data exploration on a CSV", expanded=True):
     st.session_state.file_path = st.file_uploader("Choose a CSV file", type="csv")
 
 # If a CSV file is uploaded, display the different tabs
 if st.session_state.file_path is not None:
-    tab_df, tab_num, tab_text, tab_date = st.tabs(["DataFrame", "Numeric Serie", "Text Serie", "Datetime Serie"])
-    with tab_df:
-        display_tab_df_content(file_path=st.session_state.file_path)
-    with tab_num:
-        display_tab_num_content(df=st.session_state.dataset.df)
-    with tab_text:
-        display_tab_text_content(df=st.session_state.dataset.df)
-    with tab_date:
-        display_tab_date_content(df=st.session_state.dataset.df)
+    recorder = get_recorder(instrument, trace_memory)
+    with recording(recorder):
+        disk_cache = DISK_CACHE if persist else None
+        tab_df, tab_num, tab_text, tab_date = st.tabs(["DataFrame", "Numeric Serie", "Text Serie", "Datetime Serie"])
+        if progressive and not out_of_core:
+            tabs = {'df': tab_df, 'num': tab_num, 'text': tab_text, 'date': tab_date}
+            if display_progressive_load(st.session_state.file_path, tabs, error=error, optimize_dtypes=optimize_dtypes,
+                                        disk_cache=disk_cache, parser=parser):
+                # The exact results are loaded: display them instead of the estimates
+                st.experimental_rerun()
+        with tab_df:
+            display_tab_df_content(file_path=st.session_state.file_path, chunksize=chunksize if out_of_core else None, error=error,
+                                   optimize_dtypes=optimize_dtypes, disk_cache=disk_cache, parser=parser)
+            if background:
+                display_profiling_progress(st.session_state.dataset, approximate=approximate, error=error, processes=processes,
+                                           disk_cache=disk_cache)
+            if recorder is not None:
+                display_performance(recorder, 'df')
+        with tab_num:
+            display_tab_num_content(df=st.session_state.dataset.df, profile=st.session_state.dataset.profile, approximate=approximate, error=error,
+                                    key=st.session_state.dataset.fingerprint, disk_cache=disk_cache)
+            if recorder is not None:
+                display_performance(recorder, 'num')
+        with tab_text:
+            display_tab_text_content(df=st.session_state.dataset.df, profile=st.session_state.dataset.profile, approximate=approximate, error=error,
+                                     key=st.session_state.dataset.fingerprint, disk_cache=disk_cache)
+            if recorder is not None:
+                display_performance(recorder, 'text')
+        with tab_date:
+            display_tab_date_content(df=st.session_state.dataset.df, profile=st.session_state.dataset.profile, approximate=approximate, error=error,
+                                     key=st.session_state.dataset.fingerprint, disk_cache=disk_cache)
+            if recorder is not None:
+                display_performance(recorder, 'date')
@@ -0,0 +1,66 @@
+"""
+Benchmark of tab_date.stats.compute_date_stats() against the former DateColumn
+summary and bar chart (one .dt accessor or full-column comparison per count, the
+weekday computed twice and the years computed again for the chart).
+
+Usage: python benchmarks/bench_date_stats.py --rows 10000000 50000000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from tab_date.stats import compute_date_stats, to_nanoseconds
+
+
+def former_summary(serie):
+    summary = {
+        "n_missing": serie.isna().sum(),
+        "n_weekend": serie.dt.dayofweek.isin([5, 6]).sum(),
+        "n_weekday": (~serie.dt.dayofweek.isin([5, 6])).sum(),
+        "n_future": (serie > pd.Timestamp.now()).sum(),
+        "n_1900": (serie == pd.Timestamp("1900-01-01")).sum(),
+        "n_1970": (serie == pd.Timestamp("1970-01-01")).sum(),
+        "col_min": serie.min(),
+        "col_max": serie.max(),
+    }
+    summary["years"] = serie.dt.year.value_counts()
+    return summary
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--missing", type=float, default=0.05, help="Ratio of missing values")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    start, end = pd.Timestamp("1990-01-01").value, pd.Timestamp("2030-01-01").value
+    print(f"{'rows':>12} {'former (s)':>11} {'engine (s)':>11} {'speedup':>8}")
+    for n_rows in args.rows:
+        serie = pd.Series(pd.to_datetime(rng.integers(start, end, n_rows)))
+        serie[rng.random(n_rows) < args.missing] = pd.NaT
+
+        former = best_time(lambda: former_summary(serie), args.repeat)
+        engine = best_time(lambda: compute_date_stats(to_nanoseconds(serie)), args.repeat)
+        print(f"{n_rows:>12,} {former:>11.3f} {engine:>11.3f} {former / engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
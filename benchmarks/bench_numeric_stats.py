@@ -0,0 +1,68 @@
+"""
+Benchmark of tab_num.stats.compute_numeric_stats() against the former chain of
+NumericColumn setters, reproduced below (one full scan of the Series per statistic).
+
+Usage: python benchmarks/bench_numeric_stats.py --rows 10000000 50000000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from tab_num.stats import compute_numeric_stats
+
+
+def method_chain(serie):
+    """The statistics as the former NumericColumn setters computed them, one pandas call each."""
+    if serie is None or serie.empty:
+        return None
+    return {
+        'n_unique': serie.nunique(),
+        'n_missing': serie.isnull().sum(),
+        'n_zeros': (serie == 0).sum(),
+        'n_negatives': (serie < 0).sum(),
+        'col_mean': serie.mean(),
+        'col_std': serie.std(),
+        'col_min': serie.min(),
+        'col_max': serie.max(),
+        'col_median': serie.median(),
+        'frequent': serie.value_counts().head(20),
+    }
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--missing", type=float, default=0.05, help="Ratio of missing values")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>12} {'method chain (s)':>17} {'fused kernel (s)':>17} {'speedup':>8}")
+    for n_rows in args.rows:
+        values = np.round(rng.normal(0, 100, n_rows), 1)
+        values[rng.random(n_rows) < args.missing] = np.nan
+        serie = pd.Series(values, name="x")
+
+        chain = best_time(lambda: method_chain(serie), args.repeat)
+        fused = best_time(lambda: compute_numeric_stats(values), args.repeat)
+        print(f"{n_rows:>12,} {chain:>17.3f} {fused:>17.3f} {chain / fused:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
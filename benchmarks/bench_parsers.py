@@ -0,0 +1,97 @@
+"""
+Benchmark of the CSV parser backends of common.parsers (pandas C engine, pyarrow's
+multi-threaded reader, byte ranges parsed on a process pool) on synthetic wide and
+tall CSV files: throughput in MB/s and peak memory. Each run is made in a fresh
+subprocess so its peak resident memory is measured alone.
+
+Usage: python benchmarks/bench_parsers.py --size-mb 200 --parsers pandas pyarrow parallel
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.parsers import PARSERS, parse_csv
+
+# Shapes of the synthetic files: (number of columns, share of numeric columns)
+SHAPES = {
+    'tall': (8, 0.75),
+    'wide': (400, 0.9),
+}
+
+
+def write_csv(path, shape, size_mb, rng):
+    """Write a CSV file of about size_mb megabytes with integer, float, text and date columns."""
+    n_cols, numeric_share = SHAPES[shape]
+    n_rows = 100_000 // n_cols
+    block = pd.DataFrame({
+        f"c{i}": (rng.integers(0, 1_000_000, n_rows) if i % 3 == 0 else rng.normal(size=n_rows).round(6))
+        if i < n_cols * numeric_share else
+        (pd.Series(rng.integers(0, 1000, n_rows)).map("label_{}".format) if i % 2 else
+         pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 10 ** 8, n_rows), unit="s")).astype(str))
+        for i in range(n_cols)
+    })
+    text = block.to_csv(index=False)
+    header, body = text.split("\n", 1)
+    with open(path, "w") as f:
+        f.write(header + "\n")
+        written = len(header)
+        while written < size_mb * 1024 ** 2:
+            f.write(body)
+            written += len(body)
+
+
+def run_one(path, parser):
+    """Parse a file once (in this process) and print the timing and peak memory as JSON."""
+    start = time.perf_counter()
+    df = parse_csv(path, parser=parser)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux; the workers of the parallel backend are children of this process,
+    # so the sum is an upper bound of the peak memory of the run
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024
+    print(json.dumps({'seconds': elapsed, 'peak_bytes': peak, 'rows': len(df)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, nargs="+", default=[200])
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=list(SHAPES))
+    parser.add_argument("--parsers", nargs="+", default=list(PARSERS), choices=list(PARSERS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--run-one", nargs=2, metavar=("PATH", "PARSER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(*args.run_one)
+        return
+
+    rng = np.random.default_rng(0)
+    print(f"{'shape':>6} {'MB':>6} {'parser':>9} {'best (s)':>9} {'MB/s':>8} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in args.shapes:
+            for size_mb in args.size_mb:
+                path = os.path.join(directory, f"{shape}_{size_mb}.csv")
+                write_csv(path, shape, size_mb, rng)
+                file_mb = os.path.getsize(path) / 1024 ** 2
+                for name in args.parsers:
+                    runs = [json.loads(subprocess.run([sys.executable, __file__, "--run-one", path, name],
+                                                      check=True, capture_output=True, text=True).stdout)
+                            for _ in range(args.repeat)]
+                    best = min(run['seconds'] for run in runs)
+                    peak = max(run['peak_bytes'] for run in runs) / 1024 ** 2
+                    print(f"{shape:>6} {file_mb:>6.0f} {name:>9} {best:>9.3f} {file_mb / best:>8.1f} {peak:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
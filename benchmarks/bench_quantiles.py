@@ -0,0 +1,65 @@
+"""
+Benchmark of common.quantiles: exact percentiles with one np.partition call against
+Series.quantile(), and the KLL sketch fed chunk by chunk (time, kept items and
+worst rank error of the estimated percentiles).
+
+Usage: python benchmarks/bench_quantiles.py --rows 10000000 --chunks 100
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.quantiles import DEFAULT_PERCENTILES, KLLSketch, exact_quantiles
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000_000])
+    parser.add_argument("--chunks", type=int, default=100, help="Number of chunks fed to the sketch")
+    parser.add_argument("--error", type=float, default=0.01, help="Rank error of the sketch")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>12} {'Series (s)':>11} {'partition (s)':>14} {'speedup':>8} {'KLL (s)':>8} {'items':>7} "
+          f"{'max rank err':>13} {'bound':>7}")
+    for n_rows in args.rows:
+        values = rng.lognormal(size=n_rows)
+        serie = pd.Series(values)
+        fractions = [p / 100 for p in DEFAULT_PERCENTILES]
+        series_time = best_time(lambda: serie.quantile(fractions), args.repeat)
+        partition_time = best_time(lambda: exact_quantiles(values), args.repeat)
+
+        def sketch():
+            kll = KLLSketch.from_error(args.error)
+            for chunk in np.array_split(values, args.chunks):
+                kll.update(chunk)
+            return kll
+
+        kll_time = best_time(sketch, args.repeat)
+        kll = sketch()
+        ordered = np.sort(values)
+        estimates = kll.quantiles()
+        rank_error = max(abs(np.searchsorted(ordered, estimates[p]) / n_rows - p / 100) for p in DEFAULT_PERCENTILES)
+        print(f"{n_rows:>12,} {series_time:>11.3f} {partition_time:>14.3f} {series_time / partition_time:>7.1f}x "
+              f"{kll_time:>8.3f} {sum(len(level) for level in kll.levels):>7,} {rank_error:>13.4f} {kll.error:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
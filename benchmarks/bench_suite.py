@@ -0,0 +1,308 @@
+"""
+Benchmark suite of the profiling stages on a synthetic CSV file (see synthetic.py):
+Dataset.load_data() and each of its steps, the overview of every column, the analysis
+of the numeric, text and datetime columns, the correlations of the numeric columns
+and the construction of their charts. Every stage is timed (best of --repeat runs)
+and its peak memory measured with tracemalloc (allocations made through Python and
+NumPy; the C buffers of the CSV parsers are not traced) in one more run.
+
+A stage raising an exception is recorded as failed (with its error) and the other
+stages still run. The results are written as a JSON baseline with --output. A run is
+compared with a baseline with --baseline, two stored runs with --compare: stages
+slower or using more memory than the baseline by more than --threshold, or failing
+while they succeeded in the baseline, are flagged as regressions and the script
+exits with status 1.
+
+Usage:
+    python benchmarks/bench_suite.py --rows 1000000 --cols 20 --output baseline.json
+    python benchmarks/bench_suite.py --rows 1000000 --cols 20 --baseline baseline.json
+    python benchmarks/bench_suite.py --compare baseline.json current.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import altair as alt
+import numpy as np
+import pandas as pd
+import pyarrow
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from benchmarks.synthetic import write_csv
+from common.dates import FORMAT_CACHE
+from tab_date.logics import DateColumn
+from tab_df.logics import Dataset
+from tab_num.correlation import NumericCorrelation
+from tab_num.logics import NumericColumn
+from tab_text.logics import TextColumn
+
+# Steps of Dataset.load_data() on an in-memory DataFrame, timed one by one
+DATASET_STEPS = ['extract_columns', 'calculate_dimensions', 'find_duplicates', 'find_missing', 'identify_numeric',
+                 'identify_text', 'create_summary_table']
+
+# Differences below these floors are noise, never regressions
+MIN_SECONDS = 0.005
+MIN_PEAK_BYTES = 1024 ** 2
+
+
+def loaded_dataset(df):
+    """Dataset holding df as if load_df() had parsed it."""
+    dataset = Dataset(None)
+    dataset.df = df
+    return dataset
+
+
+def analyzed(column_class, df, col_names, prepare):
+    """Columns of df analysed up to their charts: a column_class instance per column, prepared by prepare(column)."""
+    columns = []
+    for col_name in col_names:
+        column = column_class(df=df)
+        column.serie = df[col_name]
+        prepare(column)
+        columns.append(column)
+    return columns
+
+
+def prepare_numeric(column):
+    column.convert_serie_to_num()
+    column.set_stats()
+
+
+def prepare_text(column):
+    column.set_stats()
+
+
+def prepare_date(column):
+    column.serie = column.parse_column(column.serie.name)
+    column._calculate_summary()
+
+
+def chart_datasets(data, datasets):
+    """Altair data transformer of st.altair_chart(): the data is referenced by id, not converted to records."""
+    datasets[id(data)] = data
+    return {'name': str(id(data))}
+
+
+def build_charts(columns, build, attribute):
+    # st.altair_chart() serializes the chart as streamlit does: the spec references the
+    # data, sent as Arrow bytes (altair's own conversion of the data is not used)
+    datasets = {}
+    alt.data_transformers.register('datasets', lambda data: chart_datasets(data, datasets))
+    with alt.data_transformers.enable('datasets'):
+        for column in columns:
+            build(column)
+            chart = getattr(column, attribute)
+            if isinstance(chart, alt.TopLevelMixin):
+                chart.to_dict()
+    for data in datasets.values():
+        sink = pyarrow.BufferOutputStream()
+        table = pyarrow.Table.from_pandas(data)
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def define_stages(path, df):
+    """
+    Stages of the suite as {name: setup}, setup() returning the function to measure
+    (work done by setup() is not measured, and every run gets a fresh setup).
+    """
+    num_cols = NumericColumn.finder(df).cols_list
+    text_cols = TextColumn.finder(df).cols_list
+    FORMAT_CACHE.clear()
+    date_finder = DateColumn.finder(df)
+    date_cols = date_finder.cols_list
+
+    def uncached_date_finder():
+        # The detected formats are cached by content: clear them to time the detection
+        FORMAT_CACHE.clear()
+        return DateColumn(df=df).find_date_cols
+
+    stages = {
+        'Dataset.load_data': lambda: Dataset(path).load_data,
+        'Dataset.load_df': lambda: Dataset(path).load_df,
+    }
+    for step in DATASET_STEPS:
+        stages[f'Dataset.{step}'] = lambda step=step: getattr(loaded_dataset(df), step)
+    stages.update({
+        'Dataset.profile_columns': lambda: loaded_dataset(df).profile_columns,
+        'NumericColumn.find_num_cols': lambda: NumericColumn(df=df).find_num_cols,
+        'NumericColumn.set_data': lambda: lambda: [NumericColumn(df=df).set_data(col) for col in num_cols],
+        'NumericCorrelation.set_data': lambda: NumericCorrelation(df=df).set_data,
+        'TextColumn.find_text_cols': lambda: TextColumn(df=df).find_text_cols,
+        'TextColumn.set_data': lambda: lambda: [TextColumn(df=df).set_data(col) for col in text_cols],
+        'DateColumn.find_date_cols': uncached_date_finder,
+        'DateColumn.set_data': lambda: lambda: [date_finder.analyze(col) for col in date_cols],
+        'charts.numeric_histogram': lambda: lambda columns=analyzed(NumericColumn, df, num_cols, prepare_numeric):
+            build_charts(columns, NumericColumn.set_histogram, 'histogram'),
+        'charts.text_barchart': lambda: lambda columns=analyzed(TextColumn, df, text_cols, prepare_text):
+            build_charts(columns, TextColumn.set_barchart, 'barchart'),
+        'charts.date_barchart': lambda: lambda columns=analyzed(DateColumn, df, date_cols, prepare_date):
+            build_charts(columns, DateColumn._generate_barchart, 'barchart'),
+    })
+    return stages
+
+
+def measure(setup, repeat):
+    """Best time of repeat runs and peak traced memory of one more run of the function returned by setup()."""
+    timings = []
+    for _ in range(repeat):
+        func = setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    func = setup()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': max(peak, 0)}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pyarrow.__version__,
+        'altair': alt.__version__,
+    }
+
+
+def run_suite(config, repeat=3, only=None, progress=print):
+    """
+    Generate the synthetic file of config (arguments of synthetic.write_csv()) and measure every stage.
+
+    Returns:
+        dict: 'config', 'environment', 'created' and 'stages' ({name: {'seconds', 'peak_bytes'}},
+        with 'error' and None measures for the stages that raised an exception).
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.csv")
+        write_csv(path, **config)
+        df = Dataset(path)
+        df.load_df()
+        stages = define_stages(path, df.df)
+        results = {}
+        for name, setup in stages.items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            try:
+                results[name] = measure(setup, repeat)
+            except Exception as error:
+                # A broken stage must not prevent the other stages from being measured and stored
+                results[name] = {'seconds': None, 'peak_bytes': None, 'error': f"{type(error).__name__}: {error}"}
+                progress(f"{name:<32} FAILED {results[name]['error']}")
+                continue
+            progress(f"{name:<32} {results[name]['seconds']:>9.3f} s {results[name]['peak_bytes'] / 1024 ** 2:>10.1f} MB")
+    return {
+        'config': config,
+        'environment': environment(),
+        'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'stages': results,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Compare the stages of two runs.
+
+    Returns:
+        list: (stage, metric, baseline value, current value, ratio, status) for every
+        stage and metric of both runs, status being 'regression', 'improvement' or ''.
+        Stages that failed in either run get one 'status' row ('ok' or 'failed' values,
+        no ratio) instead, a regression when only the current run failed.
+    """
+    rows = []
+    floors = {'seconds': MIN_SECONDS, 'peak_bytes': MIN_PEAK_BYTES}
+    for name, before in baseline['stages'].items():
+        after = current['stages'].get(name)
+        if after is None:
+            continue
+        if 'error' in before or 'error' in after:
+            old, new = ('failed' if 'error' in run else 'ok' for run in (before, after))
+            status = {('ok', 'failed'): 'regression', ('failed', 'ok'): 'improvement'}.get((old, new), '')
+            rows.append((name, 'status', old, new, None, status))
+            continue
+        for metric, floor in floors.items():
+            old, new = before[metric], after[metric]
+            ratio = new / old if old else float('inf') if new else 1.0
+            status = ''
+            if abs(new - old) >= floor:
+                if ratio > 1 + threshold:
+                    status = 'regression'
+                elif ratio < 1 / (1 + threshold):
+                    status = 'improvement'
+            rows.append((name, metric, old, new, ratio, status))
+    return rows
+
+
+def print_comparison(baseline, current, threshold):
+    if baseline['config'] != current['config']:
+        print(f"Warning: the runs have different configurations ({baseline['config']} and {current['config']})")
+    if baseline['environment'] != current['environment']:
+        print("Warning: the runs have different environments")
+    rows = compare(baseline, current, threshold)
+    print(f"{'stage':<32} {'metric':<10} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, metric, old, new, ratio, status in rows:
+        if metric == 'status':
+            print(f"{name:<32} {metric:<10} {old:>12} {new:>12} {'':>7} {status.upper()}")
+            continue
+        if metric == 'seconds':
+            old_text, new_text = f"{old:.3f} s", f"{new:.3f} s"
+        else:
+            old_text, new_text = f"{old / 1024 ** 2:.1f} MB", f"{new / 1024 ** 2:.1f} MB"
+        print(f"{name:<32} {metric:<10} {old_text:>12} {new_text:>12} {ratio:>6.2f}x {status.upper()}")
+    regressions = [row for row in rows if row[5] == 'regression']
+    print(f"{len(regressions)} regression(s) above {threshold:.0%}")
+    return not regressions
+
+
+def load_run(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--mix", type=float, nargs=3, default=[0.5, 0.3, 0.2], metavar=("NUMERIC", "TEXT", "DATETIME"))
+    parser.add_argument("--cardinality", type=int, default=1_000)
+    parser.add_argument("--missing", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", help="Only run the stages whose name contains one of these")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results with this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two JSON files")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative increase flagged as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if print_comparison(load_run(args.compare[0]), load_run(args.compare[1]), args.threshold) else 1)
+
+    config = {'rows': args.rows, 'cols': args.cols, 'mix': args.mix, 'cardinality': args.cardinality,
+              'missing': args.missing, 'seed': args.seed}
+    run = run_suite(config, args.repeat, args.stages)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=1)
+    if args.baseline and not print_comparison(load_run(args.baseline), run, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark of tab_text.stats.compute_text_stats() against the former TextColumn
+pipeline (astype(str) copy followed by one pass per string class).
+
+Usage: python benchmarks/bench_text_stats.py --rows 5000000 --cardinality 1000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from tab_text.stats import compute_text_class_counts, compute_text_stats
+
+
+def former_pipeline(serie):
+    serie = serie.astype(str)
+    len(serie.unique())
+    serie.isnull().sum()
+    (serie == '').sum()
+    serie.mode().iloc[0]
+    (serie == ' ').sum()
+    serie.str.islower().sum()
+    serie.str.isupper().sum()
+    serie.str.isalpha().sum()
+    serie.str.isdigit().sum()
+    serie.value_counts().head(20)
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def make_column(n_rows, cardinality, missing, rng):
+    words = np.array(["alpha", "BETA", "Gamma", "123", " ", "delta echo", "x9"], dtype=object)
+    vocabulary = pd.Series(words[rng.integers(0, len(words), cardinality)]) + pd.Series(np.arange(cardinality)).astype(str)
+    serie = pd.Series(vocabulary.to_numpy()[rng.integers(0, cardinality, n_rows)], dtype=object)
+    serie[rng.random(n_rows) < missing] = np.nan
+    return serie
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[5_000_000])
+    parser.add_argument("--cardinality", type=int, nargs="+", default=[1_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--missing", type=float, default=0.05, help="Ratio of missing values")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>12} {'distinct':>10} {'former (s)':>11} {'engine (s)':>11} {'speedup':>8} {'row scan (s)':>13}")
+    for n_rows in args.rows:
+        for cardinality in args.cardinality:
+            serie = make_column(n_rows, cardinality, args.missing, rng)
+            former = best_time(lambda: former_pipeline(serie), args.repeat)
+            engine = best_time(lambda: compute_text_stats(serie), args.repeat)
+            row_scan = best_time(lambda: compute_text_class_counts(serie), args.repeat)
+            print(f"{n_rows:>12,} {cardinality:>10,} {former:>11.3f} {engine:>11.3f} {former / engine:>7.1f}x {row_scan:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Generator of synthetic CSV files of configurable shape for the benchmarks: number of
+rows and columns, mix of numeric, text and datetime columns, cardinality of the
+integer and text columns and ratio of missing values. The same arguments and seed
+always give the same file.
+
+Usage: python benchmarks/synthetic.py data.csv --rows 1000000 --cols 20 --mix 0.5 0.3 0.2
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Rows generated and written at once, bounding the memory used for large files
+BLOCK_ROWS = 100_000
+
+# Range of the generated dates
+DATE_START = pd.Timestamp("2000-01-01")
+DATE_SPAN_SECONDS = 25 * 365 * 24 * 3600
+
+
+def column_kinds(cols, mix):
+    """Kind ('int', 'float', 'text' or 'date') of each column for a (numeric, text, datetime) mix, interleaved."""
+    weights = np.asarray(mix, dtype='float64') / np.sum(mix)
+    counts = np.floor(weights * cols).astype('int64')
+    counts[np.argmax(weights)] += cols - counts.sum()
+    n_num, n_text, n_date = counts
+    kinds = [('int' if i % 2 else 'float') for i in range(n_num)] + ['text'] * n_text + ['date'] * n_date
+    # Round-robin order, so that the first columns already hold every kind
+    return [kinds[i] for i in np.argsort(np.concatenate([np.linspace(0, 1, n, endpoint=False) for n in counts]),
+                                         kind='stable')]
+
+
+def generate_block(kinds, n_rows, cardinality, missing, rng, labels):
+    """DataFrame of n_rows random rows with one column per kind (labels are the text values)."""
+    columns = {}
+    for i, kind in enumerate(kinds):
+        if kind == 'int':
+            values = pd.Series(rng.integers(0, cardinality, n_rows), dtype='Int64')
+        elif kind == 'float':
+            values = pd.Series(rng.normal(0, 100, n_rows).round(3))
+        elif kind == 'text':
+            values = pd.Series(labels[rng.integers(0, len(labels), n_rows)], dtype=object)
+        else:
+            seconds = rng.integers(0, DATE_SPAN_SECONDS, n_rows)
+            values = pd.Series((DATE_START + pd.to_timedelta(seconds, unit='s')).strftime("%Y-%m-%d %H:%M:%S"),
+                               dtype=object)
+        if missing:
+            values[rng.random(n_rows) < missing] = None
+        columns[f"{kind}_{i}"] = values
+    return pd.DataFrame(columns)
+
+
+def text_labels(cardinality, rng):
+    """cardinality distinct words of 3 to 12 letters, some capitalized or upper case."""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    labels = []
+    for i in range(cardinality):
+        word = "".join(rng.choice(letters, rng.integers(3, 13))) + str(i)
+        labels.append(word.upper() if i % 7 == 0 else word.capitalize() if i % 3 == 0 else word)
+    return np.array(labels, dtype=object)
+
+
+def write_csv(path, rows=100_000, cols=10, mix=(0.5, 0.3, 0.2), cardinality=1_000, missing=0.05, seed=0):
+    """
+    Write a synthetic CSV file.
+
+    Parameters:
+        path (str): Path of the file to write.
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        mix (tuple): Shares of numeric, text and datetime columns.
+        cardinality (int): Number of distinct values of the integer and text columns.
+        missing (float): Ratio of missing values in every column.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        list: Kind of each column.
+    """
+    rng = np.random.default_rng(seed)
+    kinds = column_kinds(cols, mix)
+    labels = text_labels(cardinality, rng)
+    with open(path, "w", newline="") as f:
+        for start in range(0, rows, BLOCK_ROWS):
+            block = generate_block(kinds, min(BLOCK_ROWS, rows - start), cardinality, missing, rng, labels)
+            block.to_csv(f, index=False, header=start == 0)
+    return kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--mix", type=float, nargs=3, default=[0.5, 0.3, 0.2], metavar=("NUMERIC", "TEXT", "DATETIME"))
+    parser.add_argument("--cardinality", type=int, default=1_000)
+    parser.add_argument("--missing", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    kinds = write_csv(args.path, args.rows, args.cols, args.mix, args.cardinality, args.missing, args.seed)
+    print(f"Wrote {args.rows:,} rows x {len(kinds)} columns ({', '.join(kinds)}) to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import copy
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from common.dates import parse_dates
+from common.quantiles import KLLSketch
+from common.sketches import DEFAULT_ERROR, HyperLogLog, SpaceSaving
+from tab_date.stats import NAT, compute_date_stats, to_nanoseconds
+from tab_text.stats import compute_text_class_counts
+
+
+def _min(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _max(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+class NumericAccumulator:
+    """
+    Mergeable summary statistics of a numeric column, built one chunk at a time.
+    Mean and variance are combined with Chan's parallel algorithm; the unique
+    count, frequent values and percentiles are estimated with sketches.
+    """
+
+    STATISTICS = ['n_rows', 'n_missing', 'n_zeros', 'n_negatives', 'count', 'mean', 'm2', 'col_min', 'col_max']
+
+    def __init__(self, error=DEFAULT_ERROR):
+        self.error = error
+        self.distinct = HyperLogLog.from_error(error)
+        self.frequent = SpaceSaving.from_error(error)
+        self.quantiles = KLLSketch.from_error(error)
+        self.n_rows = 0
+        self.n_missing = 0
+        self.n_zeros = 0
+        self.n_negatives = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.col_min = None
+        self.col_max = None
+
+    def update(self, serie):
+        """Fold a chunk of the column into the accumulator."""
+        values = pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        valid = values[~np.isnan(values)]
+        chunk = NumericAccumulator(error=self.error)
+        chunk.distinct.update(valid)
+        chunk.frequent.update(valid)
+        chunk.quantiles.update(valid)
+        chunk.n_rows = len(values)
+        chunk.n_missing = len(values) - len(valid)
+        if len(valid):
+            chunk.n_zeros = int(np.count_nonzero(valid == 0))
+            chunk.n_negatives = int(np.count_nonzero(valid < 0))
+            chunk.count = len(valid)
+            chunk.mean = float(valid.mean())
+            chunk.m2 = float(((valid - chunk.mean) ** 2).sum())
+            chunk.col_min = valid.min().item()
+            chunk.col_max = valid.max().item()
+        self.merge(chunk)
+        return self
+
+    def merge(self, other):
+        """Merge the statistics of another NumericAccumulator into this one."""
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        self.quantiles.merge(other.quantiles)
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+            self.mean += delta * other.count / count
+        self.count = count
+        self.n_rows += other.n_rows
+        self.n_missing += other.n_missing
+        self.n_zeros += other.n_zeros
+        self.n_negatives += other.n_negatives
+        self.col_min = _min(self.col_min, other.col_min)
+        self.col_max = _max(self.col_max, other.col_max)
+        return self
+
+    def to_state(self):
+        """State of the accumulator as JSON values and arrays (see common.disk_cache.StateWriter)."""
+        state = {name: getattr(self, name) for name in self.STATISTICS}
+        state.update(error=self.error, distinct=self.distinct.to_state(), frequent=self.frequent.to_state(),
+                     quantiles=self.quantiles.to_state())
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls(error=state['error'])
+        for name in cls.STATISTICS:
+            setattr(accumulator, name, state[name])
+        accumulator.distinct = HyperLogLog.from_state(state['distinct'])
+        accumulator.frequent = SpaceSaving.from_state(state['frequent'])
+        accumulator.quantiles = KLLSketch.from_state(state['quantiles'])
+        return accumulator
+
+    @property
+    def col_mean(self):
+        return self.mean if self.count else np.nan
+
+    @property
+    def col_std(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else np.nan
+
+
+class TextAccumulator:
+    """
+    Mergeable string-class counts of a text column, built one chunk at a time,
+    with sketches of its unique count and frequent values.
+    """
+
+    COUNTS = ['n_rows', 'n_missing', 'n_empty', 'n_space', 'n_lower', 'n_upper', 'n_alpha', 'n_digit']
+
+    def __init__(self, error=DEFAULT_ERROR):
+        self.error = error
+        self.distinct = HyperLogLog.from_error(error)
+        self.frequent = SpaceSaving.from_error(error)
+        self.n_rows = 0
+        self.n_missing = 0
+        self.n_empty = 0
+        self.n_space = 0
+        self.n_lower = 0
+        self.n_upper = 0
+        self.n_alpha = 0
+        self.n_digit = 0
+
+    def update(self, serie):
+        """
+        Fold a chunk of the column into the accumulator. Missing values and character
+        classes are counted by compute_text_class_counts() without a converted copy.
+        """
+        values = serie.dropna().to_numpy(dtype=object)
+        chunk = TextAccumulator(error=self.error)
+        chunk.distinct.update(values)
+        chunk.frequent.update(values)
+        chunk.n_rows = len(serie)
+        for name, count in compute_text_class_counts(serie).items():
+            setattr(chunk, name, count)
+        self.merge(chunk)
+        return self
+
+    def to_state(self):
+        """State of the accumulator as JSON values and arrays (see common.disk_cache.StateWriter)."""
+        state = {name: getattr(self, name) for name in self.COUNTS}
+        state.update(error=self.error, distinct=self.distinct.to_state(), frequent=self.frequent.to_state())
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls(error=state['error'])
+        for name in cls.COUNTS:
+            setattr(accumulator, name, state[name])
+        accumulator.distinct = HyperLogLog.from_state(state['distinct'])
+        accumulator.frequent = SpaceSaving.from_state(state['frequent'])
+        return accumulator
+
+    def merge(self, other):
+        """Merge the counts of another TextAccumulator into this one."""
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        for name in self.COUNTS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+
+class DateAccumulator:
+    """
+    Mergeable counts, extrema and year/month/weekday/hour histograms of a datetime
+    column, built one chunk at a time, with sketches of its unique count and frequent
+    values (stored as int64 nanoseconds). n_future counts the dates after now; the
+    dates after now are also kept in a quantile sketch, so they can be counted again
+    later on (see future_dates()).
+    """
+
+    COUNTS = ['n_rows', 'n_missing', 'n_weekend', 'n_weekday', 'n_future', 'n_1900', 'n_1970']
+    HISTOGRAMS = {'months': 12, 'weekdays': 7, 'hours': 24}
+
+    def __init__(self, now=None, error=DEFAULT_ERROR, date_format=None):
+        self.now = pd.Timestamp.now() if now is None else now
+        self.error = error
+        self.date_format = date_format
+        self.distinct = HyperLogLog.from_error(error)
+        self.frequent = SpaceSaving.from_error(error)
+        self.future = KLLSketch.from_error(error)
+        self.n_rows = 0
+        self.n_missing = 0
+        self.n_weekend = 0
+        self.n_weekday = 0
+        self.n_future = 0
+        self.n_1900 = 0
+        self.n_1970 = 0
+        self.col_min = None
+        self.col_max = None
+        self.years = pd.Series(dtype='int64')
+        for name, n_bins in self.HISTOGRAMS.items():
+            setattr(self, name, np.zeros(n_bins, dtype='int64'))
+
+    def update(self, serie):
+        """Fold a chunk of the column into the accumulator."""
+        nanoseconds = to_nanoseconds(parse_dates(serie, self.date_format))
+        stats = compute_date_stats(nanoseconds, now=self.now)
+        valid = nanoseconds[nanoseconds != NAT]
+        chunk = DateAccumulator(now=self.now, error=self.error, date_format=self.date_format)
+        chunk.distinct.update(valid)
+        chunk.frequent.update(valid)
+        chunk.future.update(valid[valid > pd.Timestamp(self.now).value])
+        for name in self.COUNTS + list(self.HISTOGRAMS) + ['years']:
+            setattr(chunk, name, stats[name])
+        if len(valid):
+            chunk.col_min = stats['col_min']
+            chunk.col_max = stats['col_max']
+        self.merge(chunk)
+        return self
+
+    def to_state(self):
+        """State of the accumulator as JSON values, arrays and tables (see common.disk_cache.StateWriter)."""
+        state = {name: getattr(self, name) for name in self.COUNTS + list(self.HISTOGRAMS)}
+        state.update(now=self.now, error=self.error, date_format=self.date_format, col_min=self.col_min,
+                     col_max=self.col_max, years=self.years, distinct=self.distinct.to_state(),
+                     frequent=self.frequent.to_state(), future=self.future.to_state())
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls(now=state['now'], error=state['error'], date_format=state['date_format'])
+        for name in cls.COUNTS:
+            setattr(accumulator, name, state[name])
+        for name in cls.HISTOGRAMS:
+            setattr(accumulator, name, np.array(state[name], dtype='int64'))
+        accumulator.col_min = state['col_min']
+        accumulator.col_max = state['col_max']
+        accumulator.years = state['years'].astype('int64').rename_axis('year')
+        accumulator.distinct = HyperLogLog.from_state(state['distinct'])
+        accumulator.frequent = SpaceSaving.from_state(state['frequent'])
+        accumulator.future = KLLSketch.from_state(state['future'])
+        return accumulator
+
+    def future_dates(self, now=None):
+        """
+        Number of dates after now (the current time by default), as n_future counts them after
+        self.now: the dates after self.now that are no longer after now are found in the sketch
+        of the future dates, exactly unless it was compacted.
+
+        Returns:
+            tuple: (number of dates, whether it is exact, first date after now or None).
+        """
+        now_ns = (pd.Timestamp.now() if now is None else pd.Timestamp(now)).value
+        if self.future.n == 0:
+            return self.n_future, True, None
+        if now_ns < self.future.col_min:
+            return self.n_future, True, pd.Timestamp(int(self.future.col_min))
+        items, weights = self.future.weighted_items()
+        later = items > now_ns
+        first = pd.Timestamp(int(items[later][0])) if later.any() else None
+        return int(weights[later].sum()), self.future.exact, first
+
+    def merge(self, other):
+        """Merge the counts, extrema and histograms of another DateAccumulator into this one."""
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        self.future.merge(other.future)
+        for name in self.COUNTS + list(self.HISTOGRAMS):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.years = self.years.add(other.years, fill_value=0).astype('int64').rename_axis('year')
+        self.col_min = _min(self.col_min, other.col_min)
+        self.col_max = _max(self.col_max, other.col_max)
+        return self
+
+
+class CoMomentAccumulator:
+    """
+    Mergeable pairwise-complete co-moments of numeric columns, built one block of
+    rows at a time: for every pair of columns (i, j), over the rows where both are
+    present, the row count n[i, j], the sums[i, j] and squares[i, j] of column i and
+    the products[i, j] of both. Values are accumulated minus a per-column shift (the
+    column means, or those of the first block), which keeps the sums of squares
+    accurate; accumulators with different shifts are rebased before merging. Each
+    block costs a few matrix products, and the state is O(columns²) whatever the rows.
+    """
+
+    def __init__(self, n_cols, shift=None):
+        self.n_rows = 0
+        self.shift = None if shift is None else np.asarray(shift, dtype='float64')
+        self.n = np.zeros((n_cols, n_cols))
+        self.sums = np.zeros((n_cols, n_cols))
+        self.squares = np.zeros((n_cols, n_cols))
+        self.products = np.zeros((n_cols, n_cols))
+
+    def update(self, block):
+        """Fold a block of rows (2D float array, one column per column, NaN for missing values)."""
+        block = np.asarray(block, dtype='float64')
+        if self.shift is None:
+            with np.errstate(invalid='ignore'), warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.shift = np.nan_to_num(np.nanmean(block, axis=0)) if len(block) else np.zeros(block.shape[1])
+        values = block - self.shift
+        valid = ~np.isnan(values)
+        values[~valid] = 0.0
+        self.n_rows += len(block)
+        if valid.all():
+            # No missing value: every pair has every row of the block
+            self.n += len(block)
+            self.sums += values.sum(axis=0)[:, None]
+            self.squares += np.einsum('ij,ij->j', values, values)[:, None]
+        else:
+            present = valid.astype('float64')
+            self.n += present.T @ present
+            self.sums += values.T @ present
+            self.squares += (values * values).T @ present
+        self.products += values.T @ values
+        return self
+
+    def rebase(self, shift):
+        """Express the co-moments relative to another shift."""
+        shift = np.asarray(shift, dtype='float64')
+        if self.shift is not None:
+            delta = self.shift - shift
+            n, sums = self.n, self.sums
+            self.products = (self.products + sums * delta[None, :] + sums.T * delta[:, None]
+                             + n * np.outer(delta, delta))
+            self.squares = self.squares + 2 * delta[:, None] * sums + n * delta[:, None] ** 2
+            self.sums = sums + n * delta[:, None]
+        self.shift = shift
+        return self
+
+    def merge(self, other):
+        """Merge the co-moments of another CoMomentAccumulator (of the same columns) into this one."""
+        if other.shift is not None and self.shift is not None and not np.array_equal(other.shift, self.shift):
+            other = copy.deepcopy(other).rebase(self.shift)
+        self.shift = other.shift if self.shift is None else self.shift
+        self.n_rows += other.n_rows
+        for name in ('n', 'sums', 'squares', 'products'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def correlation(self):
+        """Pairwise-complete Pearson correlations (NaN for pairs with fewer than 2 rows or a constant column)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            n = self.n
+            covariance = self.products - self.sums * self.sums.T / n
+            variance = np.maximum(self.squares - self.sums ** 2 / n, 0)
+            correlation = covariance / np.sqrt(variance * variance.T)
+        correlation[(n < 2) | ~np.isfinite(correlation)] = np.nan
+        return np.clip(correlation, -1, 1)
+
+    def missingness(self):
+        """Fraction of the rows where a pair of columns is not complete (the diagonal: where a column is missing)."""
+        return 1 - self.n / self.n_rows if self.n_rows else np.zeros_like(self.n)
@@ -0,0 +1,280 @@
+import glob
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from common.parsers import file_size
+from common.sketches import DEFAULT_ERROR
+from tab_date.logics import DateColumn
+from tab_df.logics import Dataset
+from tab_num.logics import NumericColumn
+from tab_text.logics import TextColumn
+
+# Column analyses of every profiled file: (kind of the analysis, class)
+ANALYSIS_KINDS = [
+    ('num', NumericColumn),
+    ('text', TextColumn),
+    ('date', DateColumn),
+]
+
+# Default memory budget of each worker process (1 GB)
+DEFAULT_MEMORY_BYTES = 1024 ** 3
+
+# Memory of a parsed DataFrame relative to the size of its CSV file (text columns as Python strings)
+EXPANSION = 4
+
+# Tasks run by a worker process before it is replaced, returning its memory to the system
+TASKS_PER_CHILD = 16
+
+# Parser of the workers: the pool already uses every core, so the multi-threaded and
+# multi-process backends would only compete with the other workers
+WORKER_PARSER = 'pandas'
+
+# Bytes read at the start of a file to estimate the size of its lines
+SNIFF_BYTES = 1024 ** 2
+
+
+def find_csv_files(inputs):
+    """CSV files of a list of files, directories (searched recursively) and glob patterns, sorted and deduplicated."""
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(glob.glob(os.path.join(item, "**", "*.csv"), recursive=True))
+        elif os.path.isfile(item):
+            files.add(item)
+        else:
+            files.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+def line_bytes(path, sniff_bytes=SNIFF_BYTES):
+    """Average number of bytes per line in the first sniff_bytes of a file."""
+    with open(path, "rb") as f:
+        head = f.read(sniff_bytes)
+    return max(len(head) / max(head.count(b"\n"), 1), 1.0)
+
+
+def plan_file(path, memory_bytes=DEFAULT_MEMORY_BYTES):
+    """
+    How to profile a file within the memory budget of a worker: in memory when its
+    DataFrame fits (about EXPANSION times the file size), out-of-core otherwise, with
+    chunks of a quarter of the budget.
+
+    Returns:
+        dict: 'path', 'bytes', 'columns' (from the header) and 'chunksize' (None in memory).
+    """
+    n_bytes = file_size(path)
+    try:
+        columns = pd.read_csv(path, nrows=0).columns.tolist()
+    except (ValueError, pd.errors.ParserError):
+        columns = []
+    chunksize = None
+    if n_bytes * EXPANSION > memory_bytes:
+        chunksize = max(int(memory_bytes / 4 / (EXPANSION * line_bytes(path))), 1_000)
+    return {'path': path, 'bytes': n_bytes, 'columns': columns, 'chunksize': chunksize}
+
+
+def plan_tasks(plans, workers):
+    """
+    Split the profiling of files into tasks for the worker pool. With at least as many
+    files as workers, a task profiles a whole file (parsed once). Otherwise, the
+    columns of the files loaded in memory are split into groups, each task parsing
+    only the columns of its group, plus one task per file for the dataset summary
+    (only with at least two groups, a single group being the whole file parsed twice).
+
+    Returns:
+        list: Tasks as (path, chunksize, columns or None for the whole file, with the dataset summary).
+    """
+    if len(plans) >= workers:
+        return [(plan['path'], plan['chunksize'], None, True) for plan in plans]
+    tasks = []
+    groups_per_file = max(math.ceil(workers / max(len(plans), 1)) - 1, 1)
+    for plan in plans:
+        if plan['chunksize'] or min(groups_per_file, len(plan['columns'])) < 2:
+            tasks.append((plan['path'], plan['chunksize'], None, True))
+            continue
+        tasks.append((plan['path'], None, [], True))
+        for group in np.array_split(np.array(plan['columns'], dtype=object), min(groups_per_file, len(plan['columns']))):
+            tasks.append((plan['path'], None, group.tolist(), False))
+    return tasks
+
+
+def records(df):
+    """Rows of a table as a list of dicts (values converted by json_default() when written)."""
+    if df is None:
+        return []
+    return df.reset_index(drop=True).to_dict(orient='records')
+
+
+def analyze_columns(df=None, profile=None, approximate=False, error=DEFAULT_ERROR):
+    """Summary table and frequent values of every numeric, text and datetime column, as the tabs compute them."""
+    analyses = []
+    for kind, column_class in ANALYSIS_KINDS:
+        finder = column_class.finder(df, profile, approximate=approximate, error=error)
+        for col_name in finder.cols_list:
+            column = finder.analyze(col_name)
+            analyses.append({
+                'column': col_name,
+                'kind': kind,
+                'summary': records(column.get_summary()),
+                'frequent': records(column.frequent),
+            })
+    return analyses
+
+
+def profile_task(path, chunksize=None, columns=None, with_dataset=True, approximate=False, error=DEFAULT_ERROR):
+    """
+    Profile a CSV file, or some of its columns (run in a worker process).
+
+    Parameters:
+        path (str): Path of the CSV file.
+        chunksize (int): Number of rows per chunk to profile the file out-of-core (optional).
+        columns (list): Only analyse these columns, parsing only them; an empty list skips
+            the column analyses; None analyses every column of the parsed file.
+        with_dataset (bool): Compute the dataset summary and column table (the whole file is then parsed).
+        approximate (bool): Estimate unique counts and frequent values with sketches.
+        error (float): Relative error of the sketches.
+
+    Returns:
+        dict: Report of the task, with the elapsed 'seconds' and the 'error' message if it failed.
+    """
+    start = time.perf_counter()
+    report = {'file': path, 'columns': columns, 'mode': 'out-of-core' if chunksize else 'in-memory'}
+    try:
+        df, profile = None, None
+        if with_dataset:
+            dataset = Dataset(path, chunksize=chunksize, error=error, parser=WORKER_PARSER)
+            dataset.load_data()
+            df, profile = dataset.df, dataset.profile
+            report.update({
+                'rows': int(dataset.n_rows),
+                'dataset': records(dataset.generate_summary()),
+                'column_table': records(dataset.table),
+            })
+        if columns is None:
+            report['analyses'] = analyze_columns(df, profile, approximate, error)
+        elif columns:
+            report['analyses'] = analyze_columns(pd.read_csv(path, usecols=columns), None, approximate, error)
+    except Exception as exception:
+        report['error'] = f"{type(exception).__name__}: {exception}"
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def merge_reports(plans, task_reports):
+    """Gather the reports of the tasks of each file into one report per file, in the order of the files."""
+    files = {plan['path']: {'file': plan['path'], 'bytes': plan['bytes'], 'rows': 0, 'analyses': [], 'errors': [],
+                            'seconds': 0.0} for plan in plans}
+    for task in task_reports:
+        report = files[task['file']]
+        report['seconds'] += task['seconds']
+        if 'error' in task:
+            report['errors'].append(task['error'])
+        if 'dataset' in task:
+            report.update({key: task[key] for key in ('mode', 'rows', 'dataset', 'column_table')})
+        report['analyses'].extend(task.get('analyses', []))
+    for report in files.values():
+        # Group tasks finish in any order: list the analyses by column, as in the file
+        order = {col: i for i, col in enumerate(col['Column Name'] for col in report.get('column_table', []))}
+        report['analyses'].sort(key=lambda analysis: (order.get(analysis['column'], len(order)), analysis['kind']))
+    return list(files.values())
+
+
+def run_batch(files, workers=None, memory_bytes=DEFAULT_MEMORY_BYTES, approximate=False, error=DEFAULT_ERROR,
+              progress=None):
+    """
+    Profile CSV files on a pool of worker processes.
+
+    Parameters:
+        files (list): Paths of the CSV files.
+        workers (int): Number of worker processes (default: one per CPU).
+        memory_bytes (int): Memory budget of each worker; larger files are profiled out-of-core.
+        approximate (bool): Estimate unique counts and frequent values with sketches.
+        error (float): Relative error of the sketches.
+        progress (callable): Called with the report of every finished task (optional).
+
+    Returns:
+        tuple: (list of per-file reports, dict of totals: files, rows, bytes, seconds, files/s, rows/s).
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    plans = [plan_file(path, memory_bytes) for path in files]
+    tasks = plan_tasks(plans, workers)
+    task_reports = []
+    # Spawned workers start clean and are replaced every TASKS_PER_CHILD tasks
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                             max_tasks_per_child=TASKS_PER_CHILD) as pool:
+        futures = [pool.submit(profile_task, path, chunksize, columns, with_dataset, approximate, error)
+                   for path, chunksize, columns, with_dataset in tasks]
+        for future in as_completed(futures):
+            task_reports.append(future.result())
+            if progress is not None:
+                progress(task_reports[-1])
+    reports = merge_reports(plans, task_reports)
+    seconds = time.perf_counter() - start
+    n_rows = sum(report['rows'] for report in reports)
+    totals = {
+        'files': len(reports),
+        'failed': sum(bool(report['errors']) for report in reports),
+        'rows': n_rows,
+        'bytes': sum(plan['bytes'] for plan in plans),
+        'seconds': seconds,
+        'files_per_second': len(reports) / seconds if seconds else 0.0,
+        'rows_per_second': n_rows / seconds if seconds else 0.0,
+    }
+    return reports, totals
+
+
+def json_default(value):
+    """Convert the values json cannot encode (NumPy scalars, timestamps, missing values)."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def clean(value):
+    """Replace NaN and missing values, which are not valid JSON, by None."""
+    if isinstance(value, dict):
+        return {key: clean(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clean(item) for item in value]
+    if value is pd.NaT or value is pd.NA or (isinstance(value, (float, np.floating)) and math.isnan(value)):
+        return None
+    return value
+
+
+def report_table(reports):
+    """
+    Flatten the per-file reports into one long table (one row per cell of every
+    summary and frequent values table), with the values as text, for Parquet.
+    """
+    rows = []
+
+    def add(file, table, column, kind, entries):
+        for i, entry in enumerate(entries):
+            for key, value in entry.items():
+                rows.append((file, table, column, kind, i, str(key), None if clean(value) is None else str(value)))
+
+    for report in reports:
+        add(report['file'], 'dataset', None, None, report.get('dataset', []))
+        add(report['file'], 'column_table', None, None, report.get('column_table', []))
+        for analysis in report['analyses']:
+            add(report['file'], 'summary', analysis['column'], analysis['kind'], analysis['summary'])
+            add(report['file'], 'frequent', analysis['column'], analysis['kind'], analysis['frequent'])
+        add(report['file'], 'errors', None, None, [{'error': error} for error in report['errors']])
+    return pd.DataFrame(rows, columns=['file', 'table', 'column', 'kind', 'row', 'field', 'value'])
+
+
+def write_report(reports, totals, path):
+    """Write the reports as JSON, or as a long Parquet table when path ends with .parquet."""
+    if path.endswith(".parquet"):
+        report_table(reports).to_parquet(path, index=False)
+        return
+    with open(path, "w") as f:
+        json.dump(clean({'totals': totals, 'files': reports}), f, default=json_default, indent=1)
@@ -0,0 +1,134 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Size of the blocks read when hashing a file that is not already in memory
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Default memory budget of the process-wide ingestion cache (2 GB)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def read_blocks(f, n_bytes=None):
+    """Iterate over the blocks of an open binary file, up to n_bytes bytes (all of them when None)."""
+    remaining = n_bytes
+    while remaining is None or remaining > 0:
+        block = f.read(HASH_BLOCK_SIZE if remaining is None else min(HASH_BLOCK_SIZE, remaining))
+        if not block:
+            return
+        if remaining is not None:
+            remaining -= len(block)
+        yield block
+
+
+def content_hash(file_path, n_bytes=None):
+    """
+    Compute a hash of the content of a CSV file.
+
+    Parameters:
+        file_path (str or file-like): Path to a CSV file or an uploaded file object.
+        n_bytes (int): Only hash the first n_bytes of the file (optional); the hash of a
+            prefix equals the content hash of a file holding just that prefix.
+
+    Returns:
+        str: Hexadecimal blake2b digest of the file content.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    if hasattr(file_path, "getbuffer"):
+        # In-memory uploads (BytesIO, Streamlit UploadedFile) are hashed without copying
+        hasher.update(file_path.getbuffer()[:n_bytes])
+    elif hasattr(file_path, "read"):
+        position = file_path.tell()
+        file_path.seek(0)
+        for block in read_blocks(file_path, n_bytes):
+            hasher.update(block)
+        file_path.seek(position)
+    else:
+        with open(file_path, "rb") as f:
+            for block in read_blocks(f, n_bytes):
+                hasher.update(block)
+    return hasher.hexdigest()
+
+
+class IngestionCache:
+    """
+    Least-recently-used cache of parsed datasets, keyed by file content hash
+    and bounded by a total memory budget.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.n_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for key (or None) and mark it as recently used."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value, n_bytes=0):
+        """Store a value with its size in bytes, evicting least recently used entries."""
+        with self._lock:
+            if key in self._entries:
+                self.n_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, n_bytes)
+            self.n_bytes += n_bytes
+            self.evict()
+
+    def get_or_create(self, key, factory, size_of=None):
+        """
+        Return the cached value for key, building and storing it with factory() on a miss.
+        Values are built outside the cache lock: lookups and builds of other keys are not
+        blocked, while a key being built is built only once.
+
+        Parameters:
+            key (str): Cache key, usually a content hash.
+            factory (callable): Function without arguments returning the value to cache.
+            size_of (callable): Function returning the size in bytes of the value (optional).
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                value = self.get(key)
+                if value is None:
+                    value = factory()
+                    self.put(key, value, size_of(value) if size_of else 0)
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+        return value
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits its budget (the newest entry is always kept)."""
+        with self._lock:
+            while len(self._entries) > 1 and (
+                self.n_bytes > self.max_bytes
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                _, (_, n_bytes) = self._entries.popitem(last=False)
+                self.n_bytes -= n_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
+
+
+# Process-wide cache shared by every Streamlit session and rerun
+INGESTION_CACHE = IngestionCache()
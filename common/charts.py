@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# Upper bound on the number of bins of a numeric histogram
+MAX_BINS = 100
+
+# Columns with at most this number of distinct values get one bar per value
+MAX_DISCRETE_VALUES = 50
+
+# Number of categories shown before grouping the rest into "Other"
+TOP_K = 20
+
+
+def bin_count(n, value_min, value_max, iqr):
+    """
+    Number of histogram bins: Freedman-Diaconis rule, falling back to Sturges'
+    rule when the interquartile range is 0.
+    """
+    value_range = float(value_max) - float(value_min)
+    if value_range == 0:
+        return 1
+    if iqr > 0:
+        bins = int(np.ceil(value_range / (2 * iqr * n ** (-1 / 3))))
+    else:
+        bins = int(np.ceil(np.log2(n))) + 1
+    return int(np.clip(bins, 1, MAX_BINS))
+
+
+def histogram_table(values, is_sorted=True):
+    """
+    Aggregate numeric values into histogram bins.
+
+    Parameters:
+        values (np.ndarray): Non-missing values of the column.
+        is_sorted (bool): Whether values are sorted in ascending order.
+
+    Returns:
+        pd.DataFrame: One row per bin with columns 'bin_start', 'bin_end' and 'count'.
+    """
+    n = len(values)
+    if n == 0:
+        return pd.DataFrame(columns=['bin_start', 'bin_end', 'count'])
+    if is_sorted:
+        value_min, value_max = values[0], values[-1]
+        q1, q3 = values[(n - 1) // 4], values[(3 * (n - 1)) // 4]
+    else:
+        value_min, value_max = values.min(), values.max()
+        q1, q3 = np.partition(values, [(n - 1) // 4, (3 * (n - 1)) // 4])[[(n - 1) // 4, (3 * (n - 1)) // 4]]
+    bins = bin_count(n, value_min, value_max, float(q3) - float(q1))
+    edges = np.histogram_bin_edges(np.array([value_min, value_max], dtype='float64'), bins=bins)
+    if is_sorted:
+        # The count of each bin comes from a binary search on its edges
+        # (the last bin includes its right edge, as in np.histogram)
+        positions = np.concatenate(([0], np.searchsorted(values, edges[1:-1], side='left'), [n]))
+        counts = np.diff(positions)
+    else:
+        counts, _ = np.histogram(values, bins=edges)
+    return pd.DataFrame({
+        'bin_start': edges[:-1],
+        'bin_end': edges[1:],
+        'count': counts
+    })
+
+
+def value_count_table(sorted_values):
+    """
+    Count the occurrences of each distinct value of sorted values.
+
+    Returns:
+        pd.DataFrame: Columns 'value' and 'count', one row per distinct value.
+    """
+    if len(sorted_values) == 0:
+        return pd.DataFrame(columns=['value', 'count'])
+    starts = np.concatenate(([0], np.flatnonzero(sorted_values[1:] != sorted_values[:-1]) + 1))
+    return pd.DataFrame({
+        'value': sorted_values[starts],
+        'count': np.diff(np.append(starts, len(sorted_values)))
+    })
+
+
+def top_k_table(counts, total=None, k=TOP_K, other_label="Other"):
+    """
+    Keep the k largest counts and group every other value into a single row.
+
+    Parameters:
+        counts (pd.Series): Occurrences indexed by value, sorted in descending order.
+        total (int): Total number of occurrences (defaults to the sum of counts).
+        k (int): Number of values kept.
+        other_label (str): Label of the row grouping the remaining values.
+
+    Returns:
+        pd.DataFrame: Columns 'value' (as strings) and 'count'.
+    """
+    total = int(counts.sum()) if total is None else total
+    top = counts.head(k)
+    table = pd.DataFrame({'value': top.index.astype(str), 'count': top.to_numpy()})
+    other = total - int(top.sum())
+    if other > 0:
+        table = pd.concat([table, pd.DataFrame({'value': [other_label], 'count': [other]})], ignore_index=True)
+    return table
@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from common.accumulators import DateAccumulator, NumericAccumulator, TextAccumulator
+from common.dates import detect_date_format, sample_values
+from common.duplicates import DuplicateCounter
+from common.ingest import read_csv_chunks
+from common.sketches import DEFAULT_ERROR, Reservoir
+
+# Number of rows read at once in out-of-core mode
+DEFAULT_CHUNKSIZE = 100_000
+
+# Number of rows kept for the head, tail and random sample previews
+PREVIEW_ROWS = 50
+
+
+def column_kind(serie):
+    """Return 'number', 'text' or 'other' depending on the dtype of a column chunk."""
+    if is_numeric_dtype(serie.dtype) and not is_bool_dtype(serie.dtype):
+        return 'number'
+    if serie.dtype == 'object':
+        return 'text'
+    return 'other'
+
+
+class ChunkedProfile:
+    """
+    Out-of-core profile of a CSV file: the file is read with read_csv(chunksize=...)
+    and every chunk is folded into mergeable per-column accumulators, so peak memory
+    is bounded by the chunk size rather than by the file size. Unique counts and
+    frequent values are estimated with sketches of relative error about error.
+    The accumulators and row fingerprints are kept, so rows appended to the file
+    later are folded in with extend() without reading the file again.
+    """
+
+    # Attributes stored as they are by to_state() (the accumulators and sketches give their own state)
+    ATTRIBUTES = ['chunksize', 'error', 'seed', 'cols_list', 'dtypes', 'memory', 'n_rows', 'n_missing', 'n_duplicates',
+                  'num_cols', 'text_cols', 'date_cols', 'mixed', 'head', 'tail']
+
+    def __init__(self, file_path, chunksize=DEFAULT_CHUNKSIZE, seed=0, error=DEFAULT_ERROR):
+        self.file_path = file_path
+        self.chunksize = chunksize
+        self.error = error
+        self.seed = seed
+        self.cols_list = []
+        self.dtypes = {}
+        self.memory = {}
+        self.n_rows = 0
+        self.n_missing = 0
+        self.n_duplicates = 0
+        self.num_cols = []
+        self.text_cols = []
+        self.date_cols = []
+        self.numeric = {}
+        self.text = {}
+        self.dates = {}
+        self.head = None
+        self.tail = None
+        self.sample = None
+        self.mixed = []
+        self._reservoir = Reservoir(PREVIEW_ROWS, seed)
+        self._kinds = {}
+        self._chunk_dtypes = {}
+        self._date_candidates = set()
+        self._duplicates = DuplicateCounter()
+
+    def to_state(self):
+        """
+        State of the profile as JSON values, arrays (sketch buffers, row fingerprints) and
+        tables (previews), see common.disk_cache.StateWriter. The file is not part of it:
+        it is attached again when reloaded.
+        """
+        state = {name: getattr(self, name) for name in self.ATTRIBUTES}
+        state.update(
+            numeric={col: accumulator.to_state() for col, accumulator in self.numeric.items()},
+            text={col: accumulator.to_state() for col, accumulator in self.text.items()},
+            dates={col: accumulator.to_state() for col, accumulator in self.dates.items()},
+            reservoir=self._reservoir.to_state(),
+            kinds={col: sorted(kinds) for col, kinds in self._kinds.items()},
+            chunk_dtypes={col: sorted(str(dtype) for dtype in dtypes) for col, dtypes in self._chunk_dtypes.items()},
+            date_candidates=sorted(self._date_candidates),
+            duplicates=self._duplicates.to_state(),
+        )
+        return state
+
+    @classmethod
+    def from_state(cls, state, file_path=None):
+        profile = cls(file_path, chunksize=state['chunksize'], seed=state['seed'], error=state['error'])
+        for name in cls.ATTRIBUTES:
+            setattr(profile, name, state[name])
+        profile.numeric = {col: NumericAccumulator.from_state(item) for col, item in state['numeric'].items()}
+        profile.text = {col: TextAccumulator.from_state(item) for col, item in state['text'].items()}
+        profile.dates = {col: DateAccumulator.from_state(item) for col, item in state['dates'].items()}
+        profile._reservoir = Reservoir.from_state(state['reservoir'])
+        profile.sample = profile._reservoir.rows
+        profile._kinds = {col: set(kinds) for col, kinds in state['kinds'].items()}
+        profile._chunk_dtypes = {col: {np.dtype(dtype) for dtype in dtypes}
+                                 for col, dtypes in state['chunk_dtypes'].items()}
+        profile._date_candidates = set(state['date_candidates'])
+        profile._duplicates = DuplicateCounter.from_state(state['duplicates'])
+        return profile
+
+    def read_chunks(self, **kwargs):
+        """Iterate over the chunks of the CSV file."""
+        return read_csv_chunks(self.file_path, self.chunksize, **kwargs)
+
+    def read_options(self):
+        """Options of read_csv() for this file: columns mixing numbers and text are read as strings."""
+        return {'dtype': {col: str for col in self.mixed}} if self.mixed else {}
+
+    def run(self):
+        """Read the whole file once and compute every accumulator."""
+        self.fold_chunks(self.read_chunks())
+        return self.finish()
+
+    def extend(self, file_path, tail):
+        """
+        Update the profile for rows appended to the profiled file, reading only them.
+
+        Parameters:
+            file_path (str or file-like): The whole file, now with the appended rows (only
+                read again when the new rows turn a numeric column into text, and up to
+                the last earlier row sharing its fingerprint with an appended row).
+            tail (file-like): CSV file made of the header line and the appended lines.
+        """
+        self.file_path = file_path
+        counted = self.n_rows
+        self.fold_chunks(read_csv_chunks(tail, self.chunksize, **self.read_options()))
+        return self.finish(counted, lambda: read_csv_chunks(tail, self.chunksize, **self.read_options()))
+
+    def fold_chunks(self, chunks):
+        """Fold chunks of rows into the accumulators, the row fingerprints and the previews."""
+        for chunk in chunks:
+            if not self.cols_list:
+                self.start(chunk)
+            if self._date_candidates:
+                self.detect_dates(chunk)
+            # Rows of the appended part are numbered after the rows already profiled
+            chunk.index = pd.RangeIndex(self.n_rows, self.n_rows + len(chunk))
+            self.n_rows += len(chunk)
+            self.n_missing += int(chunk.isnull().sum().sum())
+            for col in self.cols_list:
+                serie = chunk[col]
+                kind = column_kind(serie)
+                self._kinds.setdefault(col, set()).add(kind)
+                self._chunk_dtypes.setdefault(col, set()).add(serie.dtype)
+                self.fold(col, serie, kind)
+                self.memory[col] = self.memory.get(col, 0) + int(serie.memory_usage(deep=True, index=False))
+            self._duplicates.update(chunk)
+            self.update_previews(chunk)
+
+    def finish(self, counted=0, read_appended=None):
+        """
+        Resolve the columns mixing numbers and text, count duplicates and set the column types.
+        With counted, the duplicates of the first counted rows are known: only the duplicates
+        of the later rows (read again with read_appended() when possible) are counted.
+        """
+        # Columns read as numbers in some chunks and as text in others are text columns
+        # for a full read_csv: fold them again as strings (and fingerprint the rows again)
+        mixed = [col for col, kind in self._kinds.items() if kind >= {'number', 'text'} and col not in self.mixed]
+        if mixed:
+            self.mixed += mixed
+            for col in mixed:
+                self.numeric.pop(col, None)
+                self.text[col] = TextAccumulator(error=self.error)
+                if col in self.dates:
+                    self.dates[col] = DateAccumulator(error=self.error, date_format=self.dates[col].date_format)
+            self._duplicates = DuplicateCounter(text_cols=self.mixed)
+            for chunk in self.read_chunks(**self.read_options()):
+                for col in mixed:
+                    self.fold(col, chunk[col], 'text')
+                self._duplicates.update(chunk)
+            counted = 0
+        read_chunks = lambda: self.read_chunks(**self.read_options())
+        if counted:
+            self.n_duplicates += self._duplicates.count(read_chunks, counted, read_appended)
+        else:
+            self.n_duplicates = self._duplicates.count(read_chunks)
+
+        for col in self.cols_list:
+            if col in self.mixed or self._kinds[col] == {'text'}:
+                self.dtypes[col] = 'object'
+            else:
+                self.dtypes[col] = str(np.result_type(*self._chunk_dtypes[col]))
+        self.num_cols = [col for col in self.cols_list if col in self.numeric]
+        self.text_cols = [col for col in self.cols_list if col in self.text]
+        self.date_cols = [col for col in self.cols_list if col in self.dates]
+        return self
+
+    def start(self, chunk):
+        """Set up the column list, previews and datetime candidates from the first chunk."""
+        self.cols_list = chunk.columns.tolist()
+        self.head = chunk.head(PREVIEW_ROWS)
+        self._date_candidates = set(self.cols_list)
+
+    def detect_dates(self, chunk):
+        """
+        Decide whether the datetime candidates are dates, each from the first chunk where
+        it is text with digits. Until then (values all missing, so read as numbers, or
+        placeholders such as "n/a") a column stays a candidate, and its earlier rows are
+        counted as missing dates once it is found to hold dates.
+        """
+        for col in [col for col in self.cols_list if col in self._date_candidates]:
+            serie = chunk[col]
+            if column_kind(serie) != 'text':
+                continue
+            sample = sample_values(serie)
+            if not sample.astype(str).str.contains(r"\d").any():
+                continue
+            self._date_candidates.discard(col)
+            is_date, date_format = detect_date_format(serie)
+            if is_date:
+                self.dates[col] = DateAccumulator(error=self.error, date_format=date_format)
+                self.dates[col].n_rows = self.dates[col].n_missing = self.n_rows
+
+    def fold(self, col, serie, kind):
+        """Fold one column chunk into its accumulators."""
+        if kind == 'number':
+            self.numeric.setdefault(col, NumericAccumulator(error=self.error)).update(serie)
+        elif kind == 'text':
+            self.text.setdefault(col, TextAccumulator(error=self.error)).update(serie)
+            if col in self.dates:
+                self.dates[col].update(serie)
+
+    def update_previews(self, chunk):
+        """Keep the last rows and a uniform random sample of the rows seen so far."""
+        tail = chunk.tail(PREVIEW_ROWS)
+        self.tail = tail if self.tail is None else pd.concat([self.tail, tail]).tail(PREVIEW_ROWS)
+        self.sample = self._reservoir.update(chunk).rows
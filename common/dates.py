@@ -0,0 +1,144 @@
+import hashlib
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from common.cache import IngestionCache
+
+# Number of values tested to decide whether a text column holds dates
+SAMPLE_SIZE = 200
+
+# Explicit formats tried on the sample, most common first ("ISO8601" accepts any ISO 8601 layout)
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "ISO8601",
+    "%Y/%m/%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%d/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%Y%m%d",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+    "%d-%b-%Y",
+    "%a, %d %b %Y %H:%M:%S",
+]
+
+# Detected (is_date, date_format) keyed by column name and hash of its sample
+FORMAT_CACHE = IngestionCache(max_entries=4096)
+
+
+def sample_values(serie, size=SAMPLE_SIZE):
+    """
+    Stratified sample of the non-missing values of a column: one value from each
+    of size equally spaced positions, so every part of the file is represented.
+    """
+    n = len(serie)
+    if n == 0:
+        return serie.iloc[:0]
+    sample = serie.iloc[np.unique(np.linspace(0, n - 1, min(size, n)).astype('int64'))].dropna()
+    if len(sample) < min(size, n) // 4:
+        # Mostly missing column: sample among the non-missing values instead
+        valid = serie.dropna()
+        if len(valid) == 0:
+            return valid
+        sample = valid.iloc[np.unique(np.linspace(0, len(valid) - 1, min(size, len(valid))).astype('int64'))]
+    return sample
+
+
+def infer_parsed_ratio(sample, date_format=None):
+    """Ratio of sample values parsed as dates with date_format (None for pandas' per-element inference)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            parsed = pd.to_datetime(sample, format=date_format, errors='coerce')
+        except (ValueError, TypeError, OverflowError):
+            return 0.0
+    return float(parsed.notna().mean()) if len(sample) else 0.0
+
+
+def infer_date_format(sample):
+    """
+    Find the explicit format parsing the most sample values.
+
+    Returns:
+        tuple: (is_date, date_format) where is_date tells whether any sample value is a date
+        and date_format is None when no explicit format does as well as pandas' inference.
+    """
+    if len(sample) == 0:
+        return False, None
+    sample = sample.astype(str)
+    if not sample.str.contains(r"\d").any():
+        return False, None
+    best_format, best_ratio = None, 0.0
+    for date_format in DATE_FORMATS:
+        ratio = infer_parsed_ratio(sample, date_format)
+        if ratio > best_ratio:
+            best_format, best_ratio = date_format, ratio
+        if ratio == 1.0:
+            return True, date_format
+    inferred_ratio = infer_parsed_ratio(sample)
+    if inferred_ratio > best_ratio:
+        return True, None
+    return best_ratio > 0, best_format
+
+
+def detect_date_format(serie, size=SAMPLE_SIZE):
+    """
+    Decide from a sample whether a text column holds dates, and with which format.
+    Results are cached by column name and sample content.
+
+    Returns:
+        tuple: (is_date, date_format), see infer_date_format().
+    """
+    sample = sample_values(serie, size)
+    hasher = hashlib.blake2b(str(serie.name).encode(), digest_size=16)
+    hasher.update(pd.util.hash_array(sample.to_numpy(dtype=object)).tobytes())
+    key = hasher.hexdigest()
+    result = FORMAT_CACHE.get(key)
+    if result is None:
+        result = infer_date_format(sample)
+        FORMAT_CACHE.put(key, result)
+    return result
+
+
+def parse_dates(serie, date_format=None):
+    """
+    Parse a column as dates in one vectorized pass with an explicit format. Values
+    that do not match the format (other layouts) are parsed again with pandas'
+    inference, once per distinct value, so they are not lost.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Parse each category once, then expand with the codes (-1 for missing values picks NaT)
+        categories = parse_dates(pd.Series(serie.cat.categories), date_format).to_numpy()
+        categories = np.append(categories, np.datetime64('NaT', 'ns'))
+        return pd.Series(categories[serie.cat.codes.to_numpy()], index=serie.index, name=serie.name)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if date_format is None:
+            return pd.to_datetime(serie, errors='coerce')
+        parsed = pd.to_datetime(serie, format=date_format, errors='coerce')
+        failed = parsed.isna()
+        if failed.any():
+            failed &= serie.notna()
+        if failed.any():
+            retry = serie[failed]
+            uniques = pd.Series(retry.unique())
+            mapping = pd.Series(pd.to_datetime(uniques, errors='coerce').to_numpy(), index=uniques.to_numpy())
+            parsed[failed] = retry.map(mapping)
+    return parsed
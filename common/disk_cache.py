@@ -0,0 +1,420 @@
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import altair as alt
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from common.chunked import ChunkedProfile
+from common.incremental import file_source, is_appended
+from common.ingest import ARROW_CONVERSION_ERRORS, open_working_copy, write_working_copy
+from common.lazy import TRANSIENT_ATTRIBUTES, is_expired
+
+# Directory of the persistent cache (override with the CSV_EXPLORER_CACHE_DIR environment variable)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "CSV_EXPLORER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "csv_explorer"))
+
+# Default disk budget of the persistent cache (10 GB)
+DEFAULT_MAX_DISK_BYTES = 10 * 1024 ** 3
+
+# Version of the persisted analyses and profiles, part of their file names: bumped when the
+# analysis or accumulator classes gain attributes, so older entries are recomputed instead of reloaded
+FORMAT_VERSION = 7
+
+INDEX_FILE = "index.json"
+DATA_FILE = "data.feather"
+PROFILE_DIR = f"profile_v{FORMAT_VERSION}"
+ARRAYS_FILE = "arrays.feather"
+
+# Classes whose attributes save_state() persists and load_state() rebuilds, as 'module:name'
+# (out-of-core profiles persist their own state, see ChunkedProfile.to_state()): the class
+# named in a meta.json file is looked up here, never imported from the file's content
+STATE_CLASSES = frozenset([
+    'tab_df.logics:Dataset',
+    'tab_num.logics:NumericColumn',
+    'tab_num.correlation:NumericCorrelation',
+    'tab_text.logics:TextColumn',
+    'tab_date.logics:DateColumn',
+])
+
+
+def digest(value):
+    return hashlib.blake2b(repr(value).encode(), digest_size=16).hexdigest()
+
+
+def write_table(df, path):
+    """
+    Write a DataFrame as an uncompressed Feather (Arrow IPC) file, which can be memory-mapped.
+    Object columns mixing numbers and strings, which have no Arrow type, are written as strings.
+    """
+    try:
+        feather.write_feather(df, path, compression='uncompressed')
+    except ARROW_CONVERSION_ERRORS:
+        df = df.apply(lambda serie: serie.where(serie.isna(), serie.astype(str)) if serie.dtype == 'object' else serie)
+        feather.write_feather(df, path, compression='uncompressed')
+
+
+def read_table(path):
+    """Read a Feather file through a memory map; numeric columns without missing values are not copied."""
+    return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+class StateWriter:
+    """
+    Encode the attributes of an object as JSON, writing its tables to Feather files and
+    its NumPy arrays (sketch buffers, row fingerprints) to one Arrow file, written by close().
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.n_tables = 0
+        self.arrays = {}
+
+    def table(self, df):
+        name = f"table_{self.n_tables}.feather"
+        self.n_tables += 1
+        write_table(df, os.path.join(self.directory, name))
+        return name
+
+    def close(self):
+        """Write the arrays as the columns of a one-row table of lists, so arrays of any length share one file."""
+        if self.arrays:
+            table = pa.table({name: pa.LargeListArray.from_arrays(pa.array([0, len(values)], pa.int64()),
+                                                                  pa.array(values))
+                              for name, values in self.arrays.items()})
+            feather.write_feather(table, os.path.join(self.directory, ARRAYS_FILE), compression='uncompressed')
+
+    def encode(self, value):
+        if isinstance(value, np.ndarray):
+            name = f"array_{len(self.arrays)}"
+            self.arrays[name] = value
+            return {'__array__': name}
+        if isinstance(value, pd.Series):
+            frame = value.to_frame('__values__').rename_axis('__index__').reset_index()
+            return {'__series__': self.table(frame), 'name': self.encode(value.name),
+                    'index_name': self.encode(value.index.name)}
+        if isinstance(value, pd.DataFrame):
+            if value.index.equals(pd.RangeIndex(len(value))) and value.index.name is None:
+                return {'__frame__': self.table(value), 'index': False}
+            frame = value.rename_axis('__index__').reset_index()
+            return {'__frame__': self.table(frame), 'index': True, 'index_name': self.encode(value.index.name)}
+        if isinstance(value, alt.Chart):
+            if value.mark is alt.Undefined:
+                return {'__chart__': None}
+            spec = value.copy(deep=False)
+            spec.data = alt.Data(name='table')
+            return {'__chart__': spec.to_dict(validate=False), 'data': self.encode(value.data)}
+        if isinstance(value, pd.Timestamp):
+            return {'__timestamp__': value.isoformat()}
+        if value is pd.NaT:
+            return {'__nat__': True}
+        if isinstance(value, (set, frozenset)):
+            return {'__set__': [self.encode(item) for item in value]}
+        if isinstance(value, (list, tuple)):
+            return [self.encode(item) for item in value]
+        if isinstance(value, dict):
+            return {'__dict__': [[self.encode(k), self.encode(v)] for k, v in value.items()]}
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+
+class StateReader:
+    """Decode attributes written by StateWriter, reading the tables through memory maps."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.arrays = None
+
+    def table(self, name):
+        return read_table(os.path.join(self.directory, name))
+
+    def array(self, name):
+        """Array written by StateWriter.close(), copied out of the memory map (the sketches update theirs in place)."""
+        if self.arrays is None:
+            self.arrays = feather.read_table(os.path.join(self.directory, ARRAYS_FILE), memory_map=True)
+        return np.array(self.arrays.column(name).chunk(0).flatten().to_numpy(zero_copy_only=False))
+
+    def decode(self, value):
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if '__array__' in value:
+            return self.array(value['__array__'])
+        if '__series__' in value:
+            frame = self.table(value['__series__'])
+            serie = frame.set_index('__index__')['__values__']
+            return serie.rename_axis(self.decode(value['index_name'])).rename(self.decode(value['name']))
+        if '__frame__' in value:
+            frame = self.table(value['__frame__'])
+            if value['index']:
+                frame = frame.set_index('__index__').rename_axis(self.decode(value['index_name']))
+            return frame
+        if '__chart__' in value:
+            if value['__chart__'] is None:
+                return alt.Chart()
+            # Building the chart from the raw spec skips the slow schema matching of Chart.from_dict()
+            spec = {key: item for key, item in value['__chart__'].items() if key not in ('data', 'config', '$schema')}
+            return alt.Chart(self.decode(value['data']), **spec)
+        if '__timestamp__' in value:
+            return pd.Timestamp(value['__timestamp__'])
+        if '__nat__' in value:
+            return pd.NaT
+        if '__set__' in value:
+            return {self.decode(item) for item in value['__set__']}
+        if '__dict__' in value:
+            return {self.decode(k): self.decode(v) for k, v in value['__dict__']}
+        return value
+
+
+class DiskCache:
+    """
+    Persistent cache of loaded datasets and column analyses, kept across sessions and
+    server restarts. Each dataset fingerprint (content hash plus loading options) has
+    one directory holding the DataFrame as an uncompressed Feather file and each
+    analysis as JSON metadata plus Feather tables (summaries, frequent values, chart
+    data). Everything is reloaded through memory maps; datasets profiled out-of-core
+    keep the explicit state of their ChunkedProfile instead of the DataFrame: counts
+    and moments as JSON, sketch buffers and row fingerprints as Arrow arrays, previews
+    as Feather tables. A small JSON index records the size, last use and source file
+    (hash, size) of each directory; least recently used directories are removed when
+    the cache exceeds max_bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+
+    def entry_dir(self, fingerprint):
+        return os.path.join(self.directory, digest(fingerprint))
+
+    def read_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_index(self, index):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(path + ".tmp", path)
+
+    def touch(self, fingerprint, source=None):
+        """Record the size, use time and source file (see file_source()) of an entry, then evict entries over the budget."""
+        with self._lock:
+            name = digest(fingerprint)
+            index = self.read_index()
+            n_bytes = sum(os.path.getsize(os.path.join(root, file))
+                          for root, _, files in os.walk(os.path.join(self.directory, name)) for file in files)
+            entry = index.get(name, {})
+            entry.update({'fingerprint': fingerprint, 'bytes': n_bytes, 'last_used': time.time()})
+            if source is not None:
+                entry['source'] = source
+            index[name] = entry
+            self.evict(index, keep=name)
+            self.write_index(index)
+
+    def evict(self, index, keep=None):
+        """Remove least recently used entries until the cache fits its budget (keep is never removed)."""
+        total = sum(entry['bytes'] for entry in index.values())
+        for name in sorted(index, key=lambda name: index[name]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if name != keep:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+                total -= index.pop(name)['bytes']
+
+    def write_meta(self, directory, encode):
+        """
+        Write the JSON metadata returned by encode(writer) and the tables and arrays it
+        encoded to directory. The meta file is removed first and written last, so a
+        partly written state is never read.
+        """
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        writer = StateWriter(directory)
+        meta = encode(writer)
+        writer.close()
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def save_state(self, directory, obj, skip=()):
+        """Write the attributes of obj (except skip) to directory (only for the STATE_CLASSES)."""
+        name = f"{type(obj).__module__}:{type(obj).__qualname__}"
+        if name not in STATE_CLASSES:
+            return
+        self.write_meta(directory, lambda writer: {
+            'class': name,
+            'attributes': {name: writer.encode(value) for name, value in vars(obj).items() if name not in skip},
+        })
+
+    def load_state(self, directory):
+        """Rebuild an object written by save_state() (None when missing, unreadable or of another class)."""
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+            if meta['class'] not in STATE_CLASSES:
+                return None
+            module, name = meta['class'].split(':')
+            obj = object.__new__(getattr(importlib.import_module(module), name))
+            reader = StateReader(directory)
+            for attribute, value in meta['attributes'].items():
+                setattr(obj, attribute, reader.decode(value))
+            return obj
+        except (OSError, ValueError, KeyError, AttributeError, ImportError):
+            return None
+
+    def save_dataset(self, fingerprint, dataset):
+        """
+        Persist a loaded Dataset: its DataFrame, or its ChunkedProfile when profiled
+        out-of-core. DataFrames with a column that has no Arrow type are not persisted.
+        """
+        if dataset.df is None and dataset.profile is None:
+            return
+        with self._lock:
+            directory = self.entry_dir(fingerprint)
+            os.makedirs(directory, exist_ok=True)
+            try:
+                if dataset.df is None:
+                    self.save_chunked_profile(os.path.join(directory, PROFILE_DIR), dataset.profile)
+                else:
+                    self.save_data(directory, dataset)
+            except ARROW_CONVERSION_ERRORS:
+                return
+            self.save_state(os.path.join(directory, "dataset"), dataset, skip=('file_path', 'df', 'profile'))
+            source = None
+            if dataset.file_path is not None and dataset.content_hash is not None:
+                source = file_source(dataset.file_path, dataset.content_hash)
+            self.touch(fingerprint, source)
+
+    def save_data(self, directory, dataset):
+        data_path = os.path.join(directory, DATA_FILE)
+        working_copy = getattr(dataset, 'working_copy', None)
+        if working_copy and os.path.exists(working_copy):
+            # The working copy already holds the data: share it instead of writing it again
+            if os.path.exists(data_path):
+                os.remove(data_path)
+            try:
+                os.link(working_copy, data_path)
+            except OSError:
+                shutil.copyfile(working_copy, data_path)
+        else:
+            write_working_copy(dataset.df, data_path)
+
+    def save_chunked_profile(self, directory, profile):
+        """Persist the explicit state of an out-of-core profile (see ChunkedProfile.to_state()), never its code."""
+        self.write_meta(directory, lambda writer: {'format': FORMAT_VERSION,
+                                                   'state': writer.encode(profile.to_state())})
+
+    def load_chunked_profile(self, directory, file_path=None):
+        """Rebuild an out-of-core profile from its state (None when written by another format version)."""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get('format') != FORMAT_VERSION:
+            return None
+        return ChunkedProfile.from_state(StateReader(directory).decode(meta['state']), file_path)
+
+    def has_dataset(self, fingerprint):
+        return os.path.exists(os.path.join(self.entry_dir(fingerprint), "dataset", "meta.json"))
+
+    def load_dataset(self, fingerprint, file_path=None):
+        """Reload a persisted Dataset with its DataFrame memory-mapped (None when not cached)."""
+        directory = self.entry_dir(fingerprint)
+        dataset = self.load_state(os.path.join(directory, "dataset"))
+        if dataset is None:
+            return None
+        dataset.df = None
+        dataset.profile = None
+        try:
+            if os.path.exists(os.path.join(directory, PROFILE_DIR)):
+                dataset.profile = self.load_chunked_profile(os.path.join(directory, PROFILE_DIR), file_path)
+                if dataset.profile is None:
+                    return None
+            else:
+                dataset.df = open_working_copy(os.path.join(directory, DATA_FILE),
+                                               getattr(dataset, 'optimize_dtypes', False))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError, pa.ArrowException):
+            # Missing, partly written or incompatible state: the dataset is loaded again
+            return None
+        dataset.file_path = file_path
+        self.touch(fingerprint)
+        return dataset
+
+    def find_prefix(self, file_path, fingerprint_of):
+        """
+        Find the cached dataset of the largest file that file_path extends with appended
+        lines (see is_appended()).
+
+        Parameters:
+            file_path (str or file-like): The new file.
+            fingerprint_of (callable): Returns the fingerprint a file of the given content
+                hash would have with the current loading options.
+
+        Returns:
+            tuple: (fingerprint of the cached dataset, size in bytes of its file), or None.
+        """
+        entries = sorted((entry for entry in self.read_index().values() if 'source' in entry),
+                         key=lambda entry: entry['source']['size'], reverse=True)
+        heads = {}
+        for entry in entries:
+            source = entry['source']
+            if entry['fingerprint'] == fingerprint_of(source['hash']) and is_appended(file_path, source, heads):
+                return entry['fingerprint'], source['size']
+        return None
+
+    def profile_dir(self, fingerprint, kind, column, params):
+        return os.path.join(self.entry_dir(fingerprint), "profiles",
+                            digest((FORMAT_VERSION, kind, column, sorted(params.items()))))
+
+    def save_profile(self, fingerprint, kind, column, params, analysis):
+        """Persist the analysis of a column (summary values, frequent values, chart data)."""
+        with self._lock:
+            self.save_state(self.profile_dir(fingerprint, kind, column, params), analysis, skip=TRANSIENT_ATTRIBUTES)
+            self.touch(fingerprint)
+
+    def load_profile(self, fingerprint, kind, column, params):
+        """Reload a persisted column analysis without its data (None when not cached or out of date)."""
+        analysis = self.load_state(self.profile_dir(fingerprint, kind, column, params))
+        if analysis is None or is_expired(analysis):
+            return None
+        for name in TRANSIENT_ATTRIBUTES:
+            setattr(analysis, name, None)
+        return analysis
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def analyze_cached(finder, col_name, fingerprint, kind, params, disk_cache=None, compute=None):
+    """
+    Return finder.analyze(col_name) (or compute()), reloaded from disk_cache (without its
+    data, see common.lazy.TRANSIENT_ATTRIBUTES) when it was persisted and persisted after computing otherwise.
+    """
+    if compute is None:
+        compute = lambda: finder.analyze(col_name)
+    if disk_cache is None:
+        return compute()
+    analysis = disk_cache.load_profile(fingerprint, kind, col_name, params)
+    if analysis is None:
+        analysis = compute()
+        disk_cache.save_profile(fingerprint, kind, col_name, params, analysis)
+    return analysis
+
+
+# Process-wide persistent cache
+DISK_CACHE = DiskCache()
@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# Frames with fewer columns are checked with duplicated() directly (cheaper than hashing)
+HASH_MIN_COLUMNS = 16
+
+
+def row_hashes(df):
+    """Return a 64-bit fingerprint of every row of a DataFrame (as np.uint64), ignoring the index."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def same_hash_dtypes(before, after):
+    """
+    Whether rows fingerprinted with the dtypes before (see row_hashes()) get the same
+    fingerprints with the dtypes after: every column keeps its dtype, a categorical
+    column may gain categories of the same type.
+    """
+    return len(before) == len(after) and all(
+        left == right or (isinstance(left, pd.CategoricalDtype) and isinstance(right, pd.CategoricalDtype)
+                          and left.categories.dtype == right.categories.dtype)
+        for left, right in zip(before, after))
+
+
+def colliding(hashes):
+    """Boolean mask of the fingerprints that occur more than once."""
+    return pd.Series(hashes).duplicated(keep=False).to_numpy()
+
+
+def rows_equal(df, rows, others):
+    """Whether every row at positions rows equals the row at the same place in others (NaN equals NaN)."""
+    for i in range(df.shape[1]):
+        serie = df.iloc[:, i]
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in 'biuf':
+            values = serie.to_numpy()
+            left, right = values[rows], values[others]
+            equal = left == right
+            if serie.dtype.kind == 'f':
+                equal |= np.isnan(left) & np.isnan(right)
+            if not equal.all():
+                return False
+        else:
+            values = serie.array
+            left, right = pd.Series(values.take(rows)), pd.Series(values.take(others))
+            if not ((left == right).fillna(False) | (left.isna() & right.isna())).all():
+                return False
+    return True
+
+
+def values_equal(left, right):
+    """Elementwise equality of two arrays of the same length, a missing value being equal to another one."""
+    if left.dtype.kind == 'f' and right.dtype.kind == 'f':
+        return (left == right) | (np.isnan(left) & np.isnan(right))
+    left, right = pd.Series(left, dtype=object), pd.Series(right, dtype=object)
+    return ((left == right).fillna(False) | (left.isna() & right.isna())).to_numpy(dtype=bool)
+
+
+def appended_candidates(hashes, counted):
+    """
+    Positions of the rows to verify when the rows from position counted on were appended
+    to rows whose duplicates are already counted: every row of each group of equal
+    fingerprints holding an appended row and another row. Only the appended fingerprints
+    are put in a hash table, the earlier ones are scanned once.
+    """
+    earlier, appended = hashes[:counted], hashes[counted:]
+    shared = pd.Series(earlier).isin(appended).to_numpy()
+    repeated = pd.Series(appended).isin(earlier[shared]).to_numpy() | colliding(appended)
+    return np.concatenate([np.flatnonzero(shared), counted + np.flatnonzero(repeated)])
+
+
+def count_duplicates(df, min_columns=HASH_MIN_COLUMNS, hashes=None):
+    """
+    Exact number of duplicated rows of a DataFrame (same result as df.duplicated().sum()).
+
+    Rows are hashed to 64-bit fingerprints in one vectorized pass (or given in hashes,
+    see row_hashes()), and a row is a duplicate candidate when an earlier row has the
+    same fingerprint. Candidates are compared column by column with that earlier row;
+    only if a genuine hash collision shows up is duplicated() run, on the candidate
+    rows only. Frames narrower than min_columns go straight to duplicated(), which is
+    faster for them, unless their fingerprints are given.
+    """
+    if hashes is None and df.shape[1] < max(min_columns, 1):
+        return int(df.duplicated().sum())
+    if hashes is None:
+        hashes = row_hashes(df)
+    codes, uniques = pd.factorize(hashes)
+    if len(uniques) == len(hashes):
+        return 0
+    first = np.empty(len(uniques), dtype='int64')
+    first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    earlier = first[codes]
+    rows = np.flatnonzero(earlier != np.arange(len(codes)))
+    if rows_equal(df, rows, earlier[rows]):
+        return len(hashes) - len(uniques)
+    return int(df[colliding(hashes)].duplicated().sum())
+
+
+def count_appended_duplicates(df, hashes, counted):
+    """
+    Number of rows of a DataFrame from position counted on that duplicate an earlier row,
+    given the fingerprints of every row: duplicated() only runs on the rows of the
+    fingerprint groups holding an appended row (see appended_candidates()).
+    """
+    positions = appended_candidates(hashes, counted)
+    if not len(positions):
+        return 0
+    return int(df.iloc[positions].duplicated().to_numpy()[positions >= counted].sum())
+
+
+def normalize_chunk(chunk, text_cols=()):
+    """
+    Give a CSV chunk dtypes that do not depend on the chunk, so equal rows of different
+    chunks get equal fingerprints: numbers as float64 (an integer column becomes float
+    in chunks with missing values), text_cols and other columns as objects.
+    """
+    columns = []
+    for i, col in enumerate(chunk.columns):
+        serie = chunk.iloc[:, i]
+        if col not in text_cols and is_numeric_dtype(serie.dtype) and not is_bool_dtype(serie.dtype):
+            columns.append(serie.astype('float64'))
+        else:
+            columns.append(serie.astype(object))
+    return pd.concat(columns, axis=1) if columns else chunk
+
+
+class DuplicateCounter:
+    """
+    Exact duplicate-row count of a file read chunk by chunk. The first pass keeps only
+    the 64-bit fingerprint of every row (8 bytes per row). When some fingerprints
+    collide, a second pass streams the chunks again: the first row of each colliding
+    fingerprint is kept as its reference (one row per distinct fingerprint, in
+    per-column arrays), and every later row with that fingerprint is compared with it
+    as its chunk goes by. Rows differing from their reference (genuine 64-bit hash
+    collisions) are set aside and checked with duplicated() at the end. After rows are
+    appended, only the fingerprint groups holding an appended row are verified.
+    """
+
+    def __init__(self, text_cols=()):
+        self.text_cols = set(text_cols)
+        self._hashes = []
+
+    def to_state(self):
+        """State of the counter as JSON values and the array of fingerprints (see common.disk_cache.StateWriter)."""
+        return {'text_cols': sorted(self.text_cols), 'hashes': self.hashes()}
+
+    @classmethod
+    def from_state(cls, state):
+        counter = cls(state['text_cols'])
+        counter._hashes = [np.asarray(state['hashes'], dtype='uint64')]
+        return counter
+
+    def update(self, chunk):
+        """Fingerprint the rows of a chunk."""
+        self._hashes.append(row_hashes(normalize_chunk(chunk, self.text_cols)))
+        return self
+
+    def hashes(self):
+        """Fingerprints of every row as one array, gathered in place (the chunk arrays are released as they are copied)."""
+        if len(self._hashes) > 1:
+            hashes = np.empty(sum(len(part) for part in self._hashes), dtype='uint64')
+            start = 0
+            while self._hashes:
+                part = self._hashes.pop(0)
+                hashes[start:start + len(part)] = part
+                start += len(part)
+            self._hashes = [hashes]
+        return self._hashes[0] if self._hashes else np.empty(0, dtype='uint64')
+
+    def count(self, read_chunks, counted=0, read_appended=None):
+        """
+        Number of duplicated rows, or of the rows from position counted on that duplicate
+        an earlier row (when the duplicates of the first counted rows are known): only
+        the fingerprint groups holding such a row are verified then.
+
+        Parameters:
+            read_chunks (callable): Returns a new iterator over the same chunks, only
+                called when candidate rows must be verified; the chunks are read up to
+                the last candidate row.
+            counted (int): Number of rows whose duplicates are already counted (optional).
+            read_appended (callable): Returns an iterator over the chunks of the rows from
+                position counted on, read instead of read_chunks() when every candidate
+                row is one of them (optional).
+        """
+        hashes = self.hashes()
+        positions = appended_candidates(hashes, counted) if counted else np.flatnonzero(colliding(hashes))
+        if not len(positions):
+            return 0
+        # Code of a candidate row: number of its fingerprint in order of first occurrence,
+        # which is also the slot of its reference row (the first one)
+        codes, uniques = pd.factorize(hashes[positions])
+        later = pd.Series(codes).duplicated().to_numpy()
+        del uniques
+        references = {}
+        n_duplicates = 0
+        collided = []
+        start, first = 0, 0
+        if read_appended is not None and counted and positions[0] >= counted:
+            start, chunks = counted, read_appended()
+        else:
+            chunks = read_chunks()
+        for chunk in chunks:
+            last = np.searchsorted(positions, start + len(chunk), side='left')
+            if last > first:
+                rows = normalize_chunk(chunk.iloc[positions[first:last] - start], self.text_cols)
+                rows.index = positions[first:last]
+                slots, is_later = codes[first:last], later[first:last]
+                equal = np.ones(is_later.sum(), dtype=bool)
+                for i in range(rows.shape[1]):
+                    values = rows.iloc[:, i].to_numpy()
+                    reference = references.get(i)
+                    if reference is None:
+                        reference = references[i] = np.empty(len(positions) - later.sum(), dtype=values.dtype)
+                    elif reference.dtype != values.dtype:
+                        reference = references[i] = reference.astype(object)
+                    reference[slots[~is_later]] = values[~is_later]
+                    equal &= values_equal(values[is_later], reference[slots[is_later]])
+                n_duplicates += int(equal[positions[first:last][is_later] >= counted].sum())
+                if not equal.all():
+                    collided.append(rows[is_later][~equal])
+            start += len(chunk)
+            first = last
+            if first == len(positions):
+                break
+        if collided:
+            collided = pd.concat(collided)
+            n_duplicates += int(collided.duplicated().to_numpy()[collided.index >= counted].sum())
+        return n_duplicates
@@ -0,0 +1,112 @@
+import io
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from common.cache import content_hash
+from common.ingest import downcast_numeric, is_text_dtype, rewind
+from common.parsers import file_size, needs_text_reparse
+
+# Bytes at the start of a file hashed first to rule out cached files that are not its prefix
+HEAD_BYTES = 64 * 1024
+
+
+def read_bytes(file_path, start, end=None):
+    """Bytes start:end of a file path or an uploaded file object."""
+    if hasattr(file_path, "getbuffer"):
+        return bytes(file_path.getbuffer()[start:end])
+    if hasattr(file_path, "read"):
+        position = file_path.tell()
+        file_path.seek(start)
+        data = file_path.read() if end is None else file_path.read(end - start)
+        file_path.seek(position)
+        return data
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        return f.read() if end is None else f.read(end - start)
+
+
+def header_line(file_path, block_bytes=HEAD_BYTES):
+    """First line of a file, with its line break."""
+    start = 0
+    while True:
+        block = read_bytes(file_path, start, start + block_bytes)
+        position = block.find(b"\n")
+        if position >= 0:
+            return read_bytes(file_path, 0, start + position + 1)
+        if len(block) < block_bytes:
+            return read_bytes(file_path, 0, start + len(block)) + b"\n"
+        start += block_bytes
+
+
+def file_source(file_path, key):
+    """
+    Description of a file recorded with its cached dataset: content hash, size and hash
+    of its first HEAD_BYTES, to recognize a later upload of the file with rows appended.
+    """
+    size = file_size(file_path)
+    return {'hash': key, 'size': size, 'head': content_hash(file_path, min(size, HEAD_BYTES))}
+
+
+def is_appended(file_path, source, heads=None):
+    """
+    Whether file_path is the file described by source (see file_source()) with lines
+    appended: the file is larger, and its first source['size'] bytes, which end with
+    a line break, hash to the content hash of the source. The head hashes of file_path
+    (by length) are memoized in heads, so that testing several sources reads the head once.
+    """
+    size = source['size']
+    if size == 0 or size >= file_size(file_path):
+        return False
+    heads = {} if heads is None else heads
+    n_head = min(size, HEAD_BYTES)
+    if n_head not in heads:
+        heads[n_head] = content_hash(file_path, n_head)
+    if heads[n_head] != source['head'] or read_bytes(file_path, size - 1, size) != b"\n":
+        return False
+    return content_hash(file_path, size) == source['hash']
+
+
+def read_tail(file_path, offset):
+    """CSV file (in memory) made of the header line and the lines of file_path from byte offset."""
+    tail = io.BytesIO(header_line(file_path) + read_bytes(file_path, offset))
+    rewind(file_path)
+    return tail
+
+
+def append_rows(df, tail, optimize_dtypes=False):
+    """
+    Append the rows of a CSV file to a parsed DataFrame, as if both were parsed at once.
+
+    Text columns of df are parsed with their dtype (categoricals get the sorted union
+    of both categories), new text columns holding only missing values take the dtype
+    of df, integers and floats combine as pandas does, and downcast columns are
+    downcast again over all values when optimize_dtypes is True.
+
+    Returns:
+        pd.DataFrame: The appended DataFrame, or None when the new rows do not have the
+        same columns or change the kind of a column (numbers turned into text).
+    """
+    text_dtypes = {col: 'category' if isinstance(dtype, pd.CategoricalDtype) else dtype
+                   for col, dtype in df.dtypes.items() if isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype))}
+    try:
+        new = pd.read_csv(tail, dtype=text_dtypes)
+    except (ValueError, pd.errors.ParserError):
+        return None
+    if new.columns.tolist() != df.columns.tolist():
+        return None
+    columns = {}
+    for col in df.columns:
+        old, added = df[col].reset_index(drop=True), new[col]
+        if needs_text_reparse([old, added]):
+            return None
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            columns[col] = pd.Categorical(union_categoricals([old, added.astype('category')], sort_categories=True))
+        elif is_text_dtype(old.dtype) and added.isna().all():
+            columns[col] = pd.concat([old, added.astype(old.dtype)], ignore_index=True)
+        else:
+            columns[col] = pd.concat([old, added], ignore_index=True)
+    combined = pd.DataFrame(columns)
+    if optimize_dtypes:
+        downcast_numeric(combined)
+    return combined
@@ -0,0 +1,229 @@
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype
+
+from common.memory import column_memory_usage
+from common.parsers import parse_csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    STRING_DTYPE = "string[pyarrow]"
+    # Errors of columns that have no Arrow type (object columns mixing numbers and strings)
+    ARROW_CONVERSION_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError)
+except ImportError:
+    pa = None
+    feather = None
+    STRING_DTYPE = "string"
+    ARROW_CONVERSION_ERRORS = ()
+
+# Directory of the Arrow working copies of the uploads (override with CSV_EXPLORER_WORKING_DIR)
+WORKING_DIR = os.environ.get(
+    "CSV_EXPLORER_WORKING_DIR", os.path.join(os.path.expanduser("~"), ".cache", "csv_explorer", "working"))
+
+# Disk budget of the working copies (20 GB), the least recently used are removed beyond it
+WORKING_MAX_BYTES = 20 * 1024 ** 3
+
+# Number of rows read first to choose the dtypes of the text columns
+SAMPLE_ROWS = 10_000
+
+# Text columns with at most this ratio of distinct values in the sample are loaded as categoricals
+CATEGORY_RATIO = 0.5
+
+
+def is_text_dtype(dtype):
+    """Whether a column dtype holds text (object, string or categorical)."""
+    return dtype == 'object' or isinstance(dtype, (pd.StringDtype, pd.CategoricalDtype))
+
+
+def rewind(file_path):
+    """Move an uploaded file object back to its start before reading it again."""
+    if hasattr(file_path, "seek"):
+        file_path.seek(0)
+
+
+def infer_text_dtypes(sample, category_ratio=CATEGORY_RATIO):
+    """
+    Choose the dtype of every text column of a sample: 'category' for low-cardinality
+    columns, the Arrow-backed string dtype for the others.
+    """
+    dtypes = {}
+    for col in sample.columns:
+        if sample[col].dtype == 'object':
+            values = sample[col].dropna()
+            low_cardinality = len(values) and values.nunique() <= category_ratio * len(values)
+            dtypes[col] = 'category' if low_cardinality else STRING_DTYPE
+    return dtypes
+
+
+def downcast_numeric(df):
+    """
+    Downcast numeric columns in place to the narrowest dtype holding their values:
+    integers to int8/16/32 and floats to float32 only when no value changes.
+    """
+    for col in df.columns:
+        serie = df[col]
+        if is_integer_dtype(serie.dtype):
+            df[col] = pd.to_numeric(serie, downcast='integer')
+        elif is_float_dtype(serie.dtype) and serie.dtype != 'float32':
+            narrow = serie.astype('float32')
+            if np.array_equal(narrow.to_numpy(dtype='float64'), serie.to_numpy(), equal_nan=True):
+                df[col] = narrow
+    return df
+
+
+def memory_report(sample, df):
+    """
+    Compare the memory used by the columns with default dtypes (estimated from the
+    sample read with default dtypes) and with the optimized dtypes.
+
+    Returns:
+        pd.DataFrame: One row per column with dtypes and memory before/after in KB.
+    """
+    scale = len(df) / max(len(sample), 1)
+    before = sample.memory_usage(deep=True, index=False) * scale
+    after = column_memory_usage(df)['bytes']
+    return pd.DataFrame({
+        'Column Name': df.columns,
+        'Data Type (Before)': [str(sample[col].dtype) for col in df.columns],
+        'Data Type (After)': [str(df[col].dtype) for col in df.columns],
+        'Memory Before (KB, estimated)': (before.reindex(df.columns).to_numpy() / 1024).round(2),
+        'Memory After (KB)': (after.to_numpy() / 1024).round(2),
+    })
+
+
+def rescale_memory_report(report, n_rows, df):
+    """
+    Memory report of a DataFrame from the report of its first n_rows rows: the memory
+    with default dtypes is estimated from the same sample, so it is only scaled to the
+    rows of df, and the memory with the optimized dtypes is measured again.
+    """
+    report = report.copy()
+    report['Data Type (After)'] = [str(dtype) for dtype in df.dtypes]
+    before = report['Memory Before (KB, estimated)'] * len(df) / max(n_rows, 1)
+    report['Memory Before (KB, estimated)'] = before.round(2)
+    report['Memory After (KB)'] = (column_memory_usage(df)['bytes'].to_numpy() / 1024).round(2)
+    return report
+
+
+def read_csv_chunks(file_path, chunksize, **kwargs):
+    """Iterate over the chunks of a CSV file, from its start."""
+    rewind(file_path)
+    return pd.read_csv(file_path, chunksize=chunksize, **kwargs)
+
+
+def read_csv(file_path, optimize_dtypes=False, sample_rows=SAMPLE_ROWS, parser='auto'):
+    """
+    Read a CSV file, optionally with memory-optimized dtypes.
+
+    Parameters:
+        file_path (str or file-like): File path to uploaded CSV file.
+        optimize_dtypes (bool): Sample the file first to load low-cardinality text as
+            categoricals and other text as Arrow-backed strings, then downcast numbers.
+        sample_rows (int): Number of rows of the sample.
+        parser (str): Parser backend, see common.parsers.parse_csv() (optional).
+
+    Returns:
+        tuple: (DataFrame, memory report DataFrame or None when optimize_dtypes is False).
+    """
+    if not optimize_dtypes:
+        return parse_csv(file_path, parser=parser), None
+    rewind(file_path)
+    sample = pd.read_csv(file_path, nrows=sample_rows)
+    df = parse_csv(file_path, dtype=infer_text_dtypes(sample), parser=parser)
+    downcast_numeric(df)
+    return df, memory_report(sample, df)
+
+
+def string_types_mapper(arrow_type):
+    """Map Arrow strings to pandas' Arrow-backed string dtype, so they are not copied into Python objects."""
+    if arrow_type in (pa.string(), pa.large_string()):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+def write_working_copy(df, path):
+    """
+    Write a DataFrame as an uncompressed Feather (Arrow IPC) file, atomically. Raises
+    one of ARROW_CONVERSION_ERRORS, writing nothing, when a column has no Arrow type.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def open_working_copy(path, optimize_dtypes=False):
+    """
+    Open a Feather working copy through a memory map. Numeric columns without missing
+    values, and with optimize_dtypes the text columns (as Arrow-backed strings), are
+    views of the mapped file: nothing is read until touched, and every session opening
+    the file shares the operating system's page cache instead of holding its own copy.
+    Without optimize_dtypes, text columns keep the object dtype of read_csv().
+    """
+    table = feather.read_table(path, memory_map=True)
+    os.utime(path)
+    types_mapper = string_types_mapper if optimize_dtypes else None
+    return table.to_pandas(split_blocks=True, self_destruct=True, types_mapper=types_mapper)
+
+
+def evict_working_copies(directory=WORKING_DIR, max_bytes=WORKING_MAX_BYTES, keep=None):
+    """Remove the least recently used working copies until they fit in max_bytes (keep is never removed)."""
+    files = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".feather")]
+    files.sort(key=os.path.getmtime)
+    total = sum(os.path.getsize(path) for path in files)
+    for path in files:
+        if total <= max_bytes:
+            break
+        if path != keep:
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+
+def load_csv(file_path, key=None, optimize_dtypes=False, working_dir=WORKING_DIR, parser='auto'):
+    """
+    Load a CSV file through its memory-mapped Arrow working copy.
+
+    The first load of a file content parses the CSV (see read_csv()) and writes the
+    result to working_dir/<key>.feather; later loads, from any session, only map that
+    file. Without key (or without pyarrow), the CSV is parsed into memory, as it is
+    when a column has no Arrow type (object columns mixing numbers and strings).
+
+    Parameters:
+        file_path (str or file-like): File path to uploaded CSV file.
+        key (str): Content hash of the file (with the loading options), naming the working copy.
+        optimize_dtypes (bool): See read_csv().
+        working_dir (str): Directory of the working copies.
+        parser (str): Parser backend, see common.parsers.parse_csv() (optional).
+
+    Returns:
+        tuple: (DataFrame, memory report DataFrame or None), see read_csv().
+    """
+    if key is None or feather is None:
+        return read_csv(file_path, optimize_dtypes=optimize_dtypes, parser=parser)
+    path = working_copy_path(key, working_dir)
+    report_path = path[:-len(".feather")] + ".report.feather"
+    if not os.path.exists(path):
+        df, report = read_csv(file_path, optimize_dtypes=optimize_dtypes, parser=parser)
+        try:
+            write_working_copy(df, path)
+        except ARROW_CONVERSION_ERRORS:
+            return df, report
+        if report is not None:
+            write_working_copy(report, report_path)
+        del df
+        evict_working_copies(working_dir, keep=path)
+    report = feather.read_feather(report_path) if os.path.exists(report_path) else None
+    return open_working_copy(path, optimize_dtypes), report
+
+
+def working_copy_path(key, working_dir=WORKING_DIR):
+    return os.path.join(working_dir, f"{key}.feather")
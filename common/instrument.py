@@ -0,0 +1,171 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Recorder of the stages run in the current context (None: instrumentation off)
+_CURRENT = contextvars.ContextVar('instrument_recorder', default=None)
+
+
+class StageRecorder:
+    """
+    Records of the stages run while it is active (see recording()): for every stage,
+    its wall time, CPU time of the process, peak memory allocated above the memory
+    at its start (tracemalloc, when trace_memory) and number of rows processed.
+
+    Stages nest: a stage run inside another is recorded with its parent and depth,
+    the peak of the parent including the peaks of its children. Stages run on other
+    threads are recorded too when they run in a copy of the context (as the profiling
+    scheduler does); CPU time and memory are process-wide, so they include the work of
+    the stages running concurrently.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name, column=None):
+        """Record the stage run in the block; yield a dict in which the block may set 'rows' and 'column'."""
+        stack = self._stack()
+        frame = {'rows': None, 'column': column, 'peak': 0}
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['memory'] = current
+        parent = stack[-1]['name'] if stack else None
+        frame['name'] = name
+        stack.append(frame)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        error = None
+        try:
+            yield frame
+        except BaseException as exception:
+            error = f"{type(exception).__name__}: {exception}"
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+            stack.pop()
+            peak_bytes = None
+            if tracing and tracemalloc.is_tracing():
+                peak = max(tracemalloc.get_traced_memory()[1], frame['peak'])
+                peak_bytes = max(peak - frame['memory'], 0)
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            record = {
+                'stage': name,
+                'column': frame['column'],
+                'parent': parent,
+                'depth': len(stack),
+                'thread': threading.current_thread().name,
+                'start_seconds': start - self._origin,
+                'wall_seconds': wall,
+                'cpu_seconds': cpu,
+                'peak_bytes': peak_bytes,
+                'rows': frame['rows'],
+                'error': error,
+            }
+            with self._lock:
+                self.records.append(record)
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+
+    def to_frame(self, prefixes=None):
+        """Records as a DataFrame, only the stages whose name starts with one of prefixes when given."""
+        with self._lock:
+            records = list(self.records)
+        if prefixes is not None:
+            records = [record for record in records if record['stage'].startswith(tuple(prefixes))]
+        frame = pd.DataFrame(records, columns=['stage', 'column', 'parent', 'depth', 'thread', 'start_seconds',
+                                               'wall_seconds', 'cpu_seconds', 'peak_bytes', 'rows', 'error'])
+        return frame.astype({'peak_bytes': 'Int64', 'rows': 'Int64'})
+
+    def to_json_lines(self, prefixes=None):
+        """Records as JSON lines (one JSON object per stage), for log processing tools."""
+        records = self.to_frame(prefixes).astype(object).where(lambda df: df.notna(), None).to_dict(orient='records')
+        return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def current_recorder():
+    return _CURRENT.get()
+
+
+@contextmanager
+def recording(recorder):
+    """Record the stages run in the block (and in the contexts copied from it) into recorder."""
+    token = _CURRENT.set(recorder)
+    started_tracing = False
+    if recorder is not None and recorder.trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    try:
+        yield recorder
+    finally:
+        _CURRENT.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name, column=None):
+    """Record the block as a stage when instrumentation is on; yield a dict to set 'rows' (or None when off)."""
+    recorder = _CURRENT.get()
+    if recorder is None:
+        yield None
+        return
+    with recorder.stage(name, column) as frame:
+        yield frame
+
+
+def instrumented(name, rows=None, column=None):
+    """
+    Decorator recording every call of a function as the stage name when instrumentation
+    is on (a context variable lookup otherwise). column(*args) and rows(*args), called
+    with the arguments of the function (self first for methods), give the analysed
+    column and, once the function returned, the rows it processed.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _CURRENT.get()
+            if recorder is None:
+                return func(*args, **kwargs)
+            with recorder.stage(name, None if column is None else column(*args, **kwargs)) as frame:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    frame['rows'] = rows(*args, **kwargs)
+            return result
+        return wrapper
+    return decorator
+
+
+def df_rows(obj, *args, **kwargs):
+    """Rows of the DataFrame of a Dataset or column analysis."""
+    return None if obj.df is None else len(obj.df)
+
+
+def serie_rows(obj, *args, **kwargs):
+    """Rows of the analysed column of a column analysis."""
+    return None if obj.serie is None else len(obj.serie)
+
+
+def column_name(obj, col_name, *args, **kwargs):
+    return col_name
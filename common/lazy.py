@@ -0,0 +1,131 @@
+import copy
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from common.cache import IngestionCache
+
+# Number of analysis results kept by the process-wide store
+DEFAULT_MAX_RESULTS = 512
+
+# Memory budget of the results kept by the process-wide store (256 MB)
+DEFAULT_MAX_RESULT_BYTES = 256 * 1024 ** 2
+
+# Attributes of the column analyses that are not kept with their results: the data
+# (attached again to analyze a column) and the intermediate results only needed while computing
+TRANSIENT_ATTRIBUTES = ('file_path', 'df', 'profile', 'serie', 'stats', 'distinct', 'frequent_sketch', 'counts')
+
+
+def detach(analysis):
+    """Copy of an analysis (or column finder) without its transient attributes: only its results are kept."""
+    if not hasattr(analysis, '__dict__'):
+        return analysis
+    detached = copy.copy(analysis)
+    for name in TRANSIENT_ATTRIBUTES:
+        if name in vars(detached):
+            setattr(detached, name, None)
+    return detached
+
+
+def attach(finder, df=None, profile=None):
+    """Copy of a detached column finder given back the dataset its columns are analysed from."""
+    attached = copy.copy(finder)
+    attached.df = df
+    attached.profile = profile
+    return attached
+
+
+def is_expired(result, now=None):
+    """Whether a result depending on the current time is out of date (see the 'expires' attribute of DateColumn)."""
+    expires = getattr(result, 'expires', None)
+    return expires is not None and (pd.Timestamp.now() if now is None else now) >= expires
+
+
+def size_of(value, depth=0):
+    """Approximate size in bytes of a result: its frames, arrays, charts and nested attributes."""
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if depth > 3 or isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sum(size_of(item, depth + 1) for item in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sum(size_of(item, depth + 1) for item in value)
+    if hasattr(value, '__dict__'):
+        # Charts hold their data in their 'data' attribute
+        return sum(size_of(item, depth + 1) for item in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class ComputationStore:
+    """
+    Memoized analysis results, keyed by (dataset fingerprint, kind, column, parameters).
+
+    A result is computed the first time it is asked for and returned from memory
+    afterwards, so a rerun only pays for the analyses whose inputs changed. The
+    results are kept in a least-recently-used cache bounded by a number of results
+    and a memory budget; computations of different keys run concurrently while a key
+    being computed is computed only once. Results are stored detached (see detach()):
+    they never keep alive a DataFrame evicted from the ingestion cache. Results past
+    their expiry time (see is_expired()) are computed again.
+    """
+
+    def __init__(self, max_results=DEFAULT_MAX_RESULTS, max_bytes=DEFAULT_MAX_RESULT_BYTES):
+        self._results = IngestionCache(max_bytes=max_bytes, max_entries=max_results)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def make_key(fingerprint, kind, column=None, params=None):
+        return (fingerprint, kind, column, tuple(sorted((params or {}).items())))
+
+    def __contains__(self, key):
+        return key in self._results
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, fingerprint, kind, column=None, params=None, compute=None):
+        """
+        Return the result for the key, calling compute() only if it is not stored yet.
+
+        Parameters:
+            fingerprint (str): Fingerprint of the dataset (content hash and loading options).
+            kind (str): Name of the analysis, e.g. 'num_cols' or 'num'.
+            column (str): Analysed column (optional).
+            params (dict): Parameters of the analysis (optional).
+            compute (callable): Function without arguments computing the result.
+
+        Returns:
+            The detached result (see detach()); column finders are given their data back with attach().
+        """
+        key = self.make_key(fingerprint, kind, column, params)
+        result = self._results.get(key)
+        if (result is not None and not is_expired(result)) or compute is None:
+            return result
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            result = self._results.get(key)
+            if result is None or is_expired(result):
+                result = detach(compute())
+                self._results.put(key, result, size_of(result))
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return result
+
+    def put(self, fingerprint, kind, column=None, params=None, result=None):
+        """Store a result computed elsewhere."""
+        result = detach(result)
+        self._results.put(self.make_key(fingerprint, kind, column, params), result, size_of(result))
+
+    def clear(self):
+        self._results.clear()
+
+
+# Process-wide store shared by every Streamlit session and rerun
+COMPUTATIONS = ComputationStore()
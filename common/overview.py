@@ -0,0 +1,283 @@
+import numpy as np
+import pandas as pd
+
+from common.ingest import is_text_dtype
+from tab_date.logics import DateColumn
+from tab_date.stats import NAT, to_nanoseconds
+from tab_num.stats import to_numpy_values
+
+# Memory budget of the block of a group of numeric or datetime columns: small blocks
+# reuse the same memory from group to group, larger ones are slower to fill and sort
+BLOCK_BYTES = 16 * 1024 ** 2
+
+# Statistics of a ProfileTable, one array of one value per column each
+PROFILE_FIELDS = ('kinds', 'dtypes', 'n_missing', 'n_unique', 'col_mean', 'col_std', 'col_min', 'col_median',
+                  'col_max', 'n_zeros', 'n_negatives', 'n_empty', 'n_mode')
+
+# Headers of ProfileTable.to_frame()
+PROFILE_HEADERS = {
+    'names': 'Column Name',
+    'kinds': 'Kind',
+    'dtypes': 'Data Type',
+    'n_missing': 'Missing',
+    'n_unique': 'Unique',
+    'col_mean': 'Mean',
+    'col_std': 'Std',
+    'col_min': 'Min',
+    'col_median': 'Median',
+    'col_max': 'Max',
+    'n_zeros': 'Zeros',
+    'n_negatives': 'Negatives',
+    'n_empty': 'Empty',
+    'n_mode': 'Mode',
+}
+
+
+class ProfileTable:
+    """
+    Statistics of every column of a dataset, stored column-wise: one NumPy array per
+    statistic (named as the NumericColumn and TextColumn attributes, n_mode being
+    the most frequent value) holding the value of every column, NaN or None where a
+    statistic does not apply to the kind of the column ('num', 'text', 'date' or
+    'other'). col_min, col_max and n_mode hold Python values (numbers, timestamps or
+    strings). estimated is True when the unique counts and modes come from sketches.
+    """
+
+    __slots__ = ('names', 'n_rows', 'estimated', '_positions') + PROFILE_FIELDS
+
+    def __init__(self, names, n_rows, estimated=False):
+        n_cols = len(names)
+        self.names = np.array(names, dtype=object)
+        self.n_rows = n_rows
+        self.estimated = estimated
+        self._positions = {name: i for i, name in enumerate(names)}
+        for field in ('kinds', 'dtypes', 'col_min', 'col_max', 'n_mode'):
+            setattr(self, field, np.full(n_cols, None, dtype=object))
+        for field in ('n_missing', 'n_unique'):
+            setattr(self, field, np.zeros(n_cols, dtype='int64'))
+        for field in ('col_mean', 'col_std', 'col_median', 'n_zeros', 'n_negatives', 'n_empty'):
+            setattr(self, field, np.full(n_cols, np.nan))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __setstate__(self, state):
+        for field, value in state.items():
+            setattr(self, field, value)
+
+    def positions(self, names):
+        return np.array([self._positions[name] for name in names], dtype='int64')
+
+    def row(self, name):
+        """Statistics of one column as a dict."""
+        i = self._positions[name]
+        return {field: getattr(self, field)[i] for field in ('names',) + PROFILE_FIELDS}
+
+    def to_frame(self):
+        """Statistics as a DataFrame with one row per column (counts as nullable integers)."""
+        frame = pd.DataFrame({header: getattr(self, field) for field, header in PROFILE_HEADERS.items()})
+        frame.insert(4, 'Missing (%)', (100 * self.n_missing / max(self.n_rows, 1)).round(2))
+        return frame.astype({'Zeros': 'Int64', 'Negatives': 'Int64', 'Empty': 'Int64'})
+
+    @classmethod
+    def from_profile(cls, profile):
+        """ProfileTable of an out-of-core common.chunked.ChunkedProfile, from its accumulators."""
+        table = cls(profile.cols_list, profile.n_rows, estimated=True)
+        table.dtypes[:] = [profile.dtypes[col] for col in profile.cols_list]
+        table.kinds[:] = 'other'
+        for col in profile.cols_list:
+            i = table._positions[col]
+            if col in profile.numeric:
+                accumulator = profile.numeric[col]
+                table.kinds[i] = 'num'
+                table.col_mean[i], table.col_std[i] = accumulator.col_mean, accumulator.col_std
+                table.col_median[i] = accumulator.quantiles.quantiles([50])[50]
+                table.n_zeros[i], table.n_negatives[i] = accumulator.n_zeros, accumulator.n_negatives
+            elif col in profile.dates:
+                accumulator = profile.dates[col]
+                table.kinds[i] = 'date'
+            elif col in profile.text:
+                accumulator = profile.text[col]
+                table.kinds[i] = 'text'
+                table.n_empty[i] = accumulator.n_empty
+                top = accumulator.frequent.top(1)
+                table.n_mode[i] = top.index[0] if len(top) else None
+            else:
+                continue
+            table.n_missing[i] = accumulator.n_missing
+            table.n_unique[i] = accumulator.distinct.estimate()
+            if table.kinds[i] != 'text':
+                table.col_min[i], table.col_max[i] = accumulator.col_min, accumulator.col_max
+        return table
+
+
+def column_groups(n_rows, n_cols, itemsize=8, block_bytes=BLOCK_BYTES):
+    """Ranges of columns whose (n_rows, columns) block of itemsize values fits in block_bytes."""
+    per_group = max(block_bytes // max(n_rows * itemsize, 1), 1)
+    return [range(start, min(start + per_group, n_cols)) for start in range(0, n_cols, per_group)]
+
+
+def sorted_block_stats(block, n_valid, fill):
+    """
+    Unique count, extrema and the two middle values of every column of a block sorted
+    along axis 0, the n_valid values of each column first and its missing values last,
+    replaced by fill (the changes of value into that tail are not counted).
+    """
+    cols = np.arange(block.shape[1])
+    last = np.maximum(n_valid - 1, 0)
+    changes = (block[1:] != block[:-1]).sum(axis=0)
+    has_tail = (n_valid > 0) & (n_valid < block.shape[0])
+    return {
+        'n_unique': changes - (has_tail & (block[last, cols] != fill)) + (n_valid > 0),
+        'col_min': block[0, cols],
+        'col_max': block[last, cols],
+        'low': block[last // 2, cols],
+        'high': block[np.minimum(n_valid // 2, last), cols],
+    }
+
+
+def numeric_block_stats(block):
+    """
+    Statistics of a block of float64 columns (missing values as NaN) with 2D reductions
+    along axis 0. The block is sorted in place (Fortran order keeps each column
+    contiguous), which moves the missing values to the end of each column; they are
+    then replaced by zeros so that every reduction runs without a mask, their share
+    being subtracted from the zero count and the sum of squares.
+    """
+    n_rows = block.shape[0]
+    n_missing = np.isnan(block).sum(axis=0)
+    n_valid = n_rows - n_missing
+    block.sort(axis=0)
+    for j, start in enumerate(n_valid):
+        block[start:, j] = 0.0
+    stats = sorted_block_stats(block, n_valid, 0.0)
+    stats['n_zeros'] = (block == 0).sum(axis=0) - n_missing
+    stats['n_negatives'] = (block < 0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = block.sum(axis=0) / n_valid
+        shift = np.where(n_valid > 0, mean, 0.0)
+        # Centered in place: the block is not needed afterwards
+        np.subtract(block, shift, out=block)
+        squares = np.square(block, out=block).sum(axis=0) - n_missing * shift ** 2
+        stats.update({
+            'col_mean': mean,
+            'col_std': np.where(n_valid > 1, np.sqrt(np.maximum(squares, 0) / (n_valid - 1)), np.nan),
+            'col_median': np.where(n_valid > 0, (stats.pop('low') + stats.pop('high')) / 2, np.nan),
+            'has_values': n_valid > 0,
+        })
+    return stats
+
+
+def date_block_stats(block):
+    """Unique count and extrema of a block of int64 nanosecond columns (NaT as NAT), sorted in place."""
+    missing = block == NAT
+    n_valid = block.shape[0] - missing.sum(axis=0)
+    # Missing values sort last as the largest int64
+    fill = np.iinfo('int64').max
+    block[missing] = fill
+    del missing
+    block.sort(axis=0)
+    stats = sorted_block_stats(block, n_valid, fill)
+    del stats['low'], stats['high']
+    stats['has_values'] = n_valid > 0
+    return stats
+
+
+def numeric_block(df, positions):
+    """Fortran-ordered float64 copy of the numeric columns at positions (missing values as NaN)."""
+    block = np.empty((len(df), len(positions)), dtype='float64', order='F')
+    for j, i in enumerate(positions):
+        block[:, j] = to_numpy_values(df.iloc[:, i])
+    return block
+
+
+def fill_blocks(df, positions, to_block, block_stats, block_bytes=BLOCK_BYTES):
+    """
+    Compute the statistics of the columns at positions group by group, each group
+    stacked by to_block(df, group positions) into one 8-byte block reduced by block_stats().
+    """
+    results = {}
+    if not len(df):
+        return results
+    for group in column_groups(len(df), len(positions), 8, block_bytes):
+        block = to_block(df, positions[group.start:group.stop])
+        stats = block_stats(block)
+        del block
+        for name, values in stats.items():
+            results.setdefault(name, []).append(values)
+    if not results:
+        return {}
+    return {name: np.concatenate(values) for name, values in results.items()}
+
+
+def profile_columns(df, block_bytes=BLOCK_BYTES):
+    """
+    Compute the statistics of every column of a DataFrame at once, as a ProfileTable.
+
+    Missing values are counted for the whole frame in one call. Numeric columns are
+    stacked into contiguous float64 blocks (groups of columns of at most block_bytes)
+    sorted once along axis 0: unique counts, extrema, medians, means, standard
+    deviations, zeros and negatives are then 2D reductions of the block. Datetime
+    columns (and text columns holding dates, parsed with their detected format) are
+    stacked the same way as int64 nanoseconds. Text columns get one value_counts()
+    each, giving their unique count, mode and empty strings.
+
+    Parameters:
+        df (pd.DataFrame): DataFrame to profile.
+        block_bytes (int): Memory budget of a block of columns.
+
+    Returns:
+        ProfileTable: Statistics of the columns, in the order of the DataFrame.
+    """
+    names = df.columns.tolist()
+    table = ProfileTable(names, len(df))
+    dtypes = df.dtypes.tolist()
+    table.dtypes[:] = [str(dtype) for dtype in dtypes]
+    table.kinds[:] = 'other'
+    table.n_missing[:] = df.isna().sum().to_numpy()
+
+    num_positions = [i for i, dtype in enumerate(dtypes)
+                     if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+    date_finder = DateColumn.finder(df)
+    date_names = set(date_finder.cols_list)
+    date_positions = [i for i, name in enumerate(names) if name in date_names]
+    text_positions = [i for i, dtype in enumerate(dtypes) if is_text_dtype(dtype) and names[i] not in date_names]
+
+    # Numeric columns: 2D reductions of float64 blocks
+    stats = fill_blocks(df, num_positions, numeric_block, numeric_block_stats, block_bytes)
+    table.kinds[num_positions] = 'num'
+    if stats:
+        for field in ('n_unique', 'col_mean', 'col_std', 'col_median', 'n_zeros', 'n_negatives'):
+            getattr(table, field)[num_positions] = stats[field]
+        for field in ('col_min', 'col_max'):
+            getattr(table, field)[num_positions] = np.where(stats['has_values'], stats[field], np.nan).tolist()
+
+    # Datetime columns: the same reductions on int64 nanosecond blocks
+    def date_block(df, positions):
+        # Text columns holding dates are parsed with the format detected by the finder
+        return np.column_stack([to_nanoseconds(date_finder.parse_column(names[i])) for i in positions]).copy(order='F')
+
+    stats = fill_blocks(df, date_positions, date_block, date_block_stats, block_bytes)
+    table.kinds[date_positions] = 'date'
+    if stats:
+        table.n_unique[date_positions] = stats['n_unique']
+        for field in ('col_min', 'col_max'):
+            getattr(table, field)[date_positions] = [pd.Timestamp(value) if has else pd.NaT
+                                                     for value, has in zip(stats[field], stats['has_values'])]
+
+    # Text columns: one hash-based value_counts() each
+    for i in text_positions:
+        counts = df.iloc[:, i].value_counts(sort=False)
+        counts = counts[counts > 0]
+        table.kinds[i] = 'text'
+        table.n_unique[i] = len(counts)
+        # Same tie-breaking as TextColumn: smallest of the most frequent values
+        table.n_mode[i] = min(counts.index[counts == counts.max()]) if len(counts) else None
+        table.n_empty[i] = counts.get('', 0)
+
+    for i in np.flatnonzero(table.kinds == 'other'):
+        table.n_unique[i] = df.iloc[:, i].nunique()
+    return table
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from common.cache import IngestionCache
+from common.ingest import rewind
+
+# Memory budget of the cached row orders (argsorts and seeded permutations), 8 or 4 bytes per row each
+ORDER_CACHE_BYTES = 512 * 1024 ** 2
+
+# Row orders shared by every session, keyed by (dataset fingerprint, sort column, ascending) or seed
+ORDER_CACHE = IngestionCache(max_bytes=ORDER_CACHE_BYTES)
+
+
+def position_dtype(n_rows):
+    return 'int32' if n_rows < 2 ** 31 else 'int64'
+
+
+def sort_positions(serie, ascending=True):
+    """
+    Positions of the rows of a column in sorted order (stable, missing values last).
+    Columns mixing types that do not compare (numbers and strings) are sorted as text.
+    """
+    serie = serie.reset_index(drop=True)
+    try:
+        ordered = serie.sort_values(ascending=ascending, kind='stable', na_position='last')
+    except TypeError:
+        ordered = serie.map(str, na_action='ignore').sort_values(ascending=ascending, kind='stable',
+                                                                  na_position='last')
+    return ordered.index.to_numpy().astype(position_dtype(len(serie)))
+
+
+def sample_positions(n_rows, size, seed=0):
+    """Positions of size distinct rows drawn uniformly at random, reproducible for a seed."""
+    rng = np.random.default_rng(seed)
+    return rng.choice(n_rows, size=min(size, n_rows), replace=False)
+
+
+def read_rows(file_path, offset, limit):
+    """Rows offset to offset + limit of a CSV file, without loading the rows before them."""
+    rewind(file_path)
+    rows = pd.read_csv(file_path, skiprows=range(1, offset + 1), nrows=limit)
+    rows.index = pd.RangeIndex(offset, offset + len(rows))
+    return rows
+
+
+class RowPager:
+    """
+    Pages of the rows of a dataset, in file order, sorted by a column or in a seeded
+    random order. A page is fetched by position from the loaded (memory-resident or
+    memory-mapped) DataFrame, so it costs O(limit) whatever the offset; the order of
+    the rows is computed once per column and direction (an argsort) or seed (a
+    permutation) and kept in ORDER_CACHE. Datasets profiled out-of-core have no
+    DataFrame: their pages are read from the file, in file order only.
+    """
+
+    def __init__(self, dataset, cache=ORDER_CACHE):
+        self.dataset = dataset
+        self.cache = cache
+
+    @property
+    def n_rows(self):
+        return self.dataset.n_rows
+
+    @property
+    def can_reorder(self):
+        return self.dataset.df is not None
+
+    def n_pages(self, limit):
+        return max((self.n_rows + limit - 1) // limit, 1)
+
+    def order(self, sort_by=None, ascending=True, seed=None):
+        """
+        Positions of the rows in the requested order (None for the file order): sorted
+        by the sort_by column, or shuffled with seed.
+        """
+        if sort_by is None and seed is None:
+            return None
+        if sort_by is not None:
+            key, compute = (sort_by, ascending), lambda: sort_positions(self.dataset.df[sort_by], ascending)
+        else:
+            key, compute = ('__random__', seed), lambda: np.random.default_rng(seed).permutation(
+                self.n_rows).astype(position_dtype(self.n_rows))
+        if self.dataset.fingerprint is None:
+            return compute()
+        return self.cache.get_or_create((self.dataset.fingerprint, *key), compute, size_of=lambda order: order.nbytes)
+
+    def get_page(self, offset, limit, sort_by=None, ascending=True, seed=None):
+        """
+        Rows offset to offset + limit in the requested order (see order()), indexed by
+        their position in the file.
+        """
+        offset = min(max(offset, 0), max(self.n_rows - 1, 0))
+        if not self.can_reorder:
+            if sort_by is not None or seed is not None:
+                raise ValueError("Sorted and random pages need the loaded DataFrame.")
+            return read_rows(self.dataset.file_path, offset, limit)
+        order = self.order(sort_by, ascending, seed)
+        if order is None:
+            return self.dataset.df.iloc[offset:offset + limit]
+        return self.dataset.df.iloc[order[offset:offset + limit]]
@@ -0,0 +1,302 @@
+import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype, is_bool_dtype, is_numeric_dtype
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pc = None
+    pa_csv = None
+
+# Files smaller than this are parsed by pandas (the other backends do not pay off)
+PANDAS_MAX_BYTES = 16 * 1024 ** 2
+
+# Strings read as missing values, as in pd.read_csv
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+             '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Bytes parsed by each task of the parallel backend
+PARALLEL_RANGE_BYTES = 64 * 1024 ** 2
+
+# Bytes read to find the header and infer the column types
+SNIFF_BYTES = 1024 ** 2
+
+# Integers outside [INT64_MIN, INT64_MAX] are read by pandas as uint64 or text, by pyarrow as double
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def file_size(file_path):
+    if hasattr(file_path, "getbuffer"):
+        return file_path.getbuffer().nbytes
+    if hasattr(file_path, "seek"):
+        position = file_path.tell()
+        size = file_path.seek(0, os.SEEK_END)
+        file_path.seek(position)
+        return size
+    return os.path.getsize(file_path)
+
+
+def apply_dtypes(df, dtype):
+    """Convert the columns of a parsed frame to the requested dtypes (see parse_csv())."""
+    if dtype:
+        df = df.astype({col: value for col, value in dtype.items() if col in df.columns})
+    return df
+
+
+def parse_pandas(file_path, dtype=None):
+    """Parse with pandas' single-threaded C engine (the reference for the dtype contract)."""
+    if hasattr(file_path, "seek"):
+        file_path.seek(0)
+    return pd.read_csv(file_path, dtype=dtype)
+
+
+def parse_pandas_columns(file_path, columns, dtype=None):
+    """Parse some columns of a file with pandas, for the columns other backends do not read the way pandas does."""
+    if hasattr(file_path, "seek"):
+        file_path.seek(0)
+    return pd.read_csv(file_path, usecols=columns, dtype={col: value for col, value in (dtype or {}).items()
+                                                           if col in columns} or None)
+
+
+def arrow_convert_options(column_types=None):
+    """Conversion options of pyarrow matching pd.read_csv: same missing values, missing strings are null."""
+    return pa_csv.ConvertOptions(null_values=NA_VALUES, strings_can_be_null=True, column_types=column_types or {})
+
+
+def is_text_like(arrow_type):
+    """Arrow types inferred by pyarrow but kept as text by pandas."""
+    return (pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type) or pa.types.is_time(arrow_type)
+            or pa.types.is_decimal(arrow_type) or pa.types.is_duration(arrow_type))
+
+
+def arrow_text_column(values, dtype):
+    """Convert an Arrow column to one of the text dtypes of pd.read_csv(dtype=...)."""
+    values = values.cast(pa.string())
+    if dtype == 'category':
+        # pandas sorts the categories it reads
+        values = values.dictionary_encode().to_pandas()
+        return values.cat.reorder_categories(sorted(values.cat.categories))
+    if str(dtype) == "string[pyarrow]":
+        return pd.arrays.ArrowStringArray(values)
+    return values.to_pandas().astype(dtype)
+
+
+def is_wide_integer(values):
+    """Whether an Arrow column may hold integers outside the int64 range (pyarrow reads them as double)."""
+    if not (pa.types.is_floating(values.type) or pa.types.is_unsigned_integer(values.type)):
+        return False
+    extrema = pc.min_max(values).as_py()
+    return extrema['min'] is not None and (extrema['min'] < INT64_MIN or extrema['max'] > INT64_MAX)
+
+
+def parse_pyarrow(file_path, dtype=None):
+    """
+    Parse with pyarrow's multi-threaded reader, then follow pandas' dtype contract:
+    Arrow dates, times and timestamps are read back as the original strings (pandas does
+    not infer them), null columns become float64 and missing strings NaN. Numbers outside
+    the int64 range, which pandas reads as uint64 or text, are read again by pandas.
+    """
+    if pa_csv is None or not (isinstance(file_path, str) or hasattr(file_path, "getbuffer")):
+        return parse_pandas(file_path, dtype)
+    if isinstance(file_path, str):
+        with open(file_path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    else:
+        head = file_path.getbuffer()[:SNIFF_BYTES].tobytes()
+    header = pd.read_csv(io.BytesIO(head), nrows=0).columns
+    if len(set(header)) != len(header):
+        # Duplicated column names are renamed by pandas only
+        return parse_pandas(file_path, dtype)
+
+    def read(column_types):
+        source = file_path if isinstance(file_path, str) else pa.BufferReader(pa.py_buffer(file_path.getbuffer()))
+        return pa_csv.read_csv(source, convert_options=arrow_convert_options(column_types))
+
+    # Columns pandas keeps as text are read as strings: found on the head of the file, then
+    # checked on the whole table since a column may only hold dates past the head
+    if len(head) == SNIFF_BYTES:
+        head = head[:head.rfind(b"\n") + 1]
+    try:
+        head_schema = pa_csv.read_csv(pa.BufferReader(head), convert_options=arrow_convert_options()).schema
+        column_types = {field.name: pa.string() for field in head_schema
+                        if is_text_like(field.type) or field.name in (dtype or {})}
+        table = read(column_types)
+        missed = {field.name: pa.string() for field in table.schema if is_text_like(field.type)}
+        if missed:
+            table = read({**column_types, **missed})
+    except pa.ArrowInvalid:
+        # Layouts pyarrow rejects (line breaks inside quoted values, ragged rows) are left to pandas
+        return parse_pandas(file_path, dtype)
+
+    columns = table.column_names
+    text = {col: arrow_text_column(table.column(col), value)
+            for col, value in (dtype or {}).items() if col in columns}
+    wide = [col for col in columns if col not in text and is_wide_integer(table.column(col))]
+    df = table.drop(list(text) + wide).to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    if wide:
+        text.update(parse_pandas_columns(file_path, wide, dtype).items())
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            # Arrow nulls come back as None, pandas reads NaN (and float64 for empty columns)
+            df[col] = df[col].astype('float64') if df[col].isna().all() else df[col].fillna(np.nan)
+    for col, values in text.items():
+        df[col] = values
+    return df[columns]
+
+
+def byte_ranges(path, range_bytes=None):
+    """Split a file after its header into ranges of about range_bytes (PARALLEL_RANGE_BYTES) ending on line breaks."""
+    range_bytes = range_bytes or PARALLEL_RANGE_BYTES
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        ranges, start = [], len(header)
+        while start < size:
+            f.seek(min(start + range_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def has_quotes(path, block_bytes=None):
+    block_bytes = block_bytes or SNIFF_BYTES
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_bytes), b""):
+            if b'"' in block:
+                return True
+    return False
+
+
+def parse_range(path, header, start, end, dtype=None):
+    """Parse the lines of a byte range of a CSV file (run in a worker process)."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), dtype=dtype)
+
+
+def column_kind(serie):
+    """Kind of a column parsed from one byte range (None when all values are missing)."""
+    if serie.dtype == 'object':
+        # Types of the values inferred in one pass, missing values skipped
+        inferred = infer_dtype(serie, skipna=True)
+        return None if inferred == 'empty' else 'bool' if inferred == 'boolean' else 'object'
+    if serie.isna().all():
+        return None
+    if is_bool_dtype(serie.dtype):
+        return 'bool'
+    if is_numeric_dtype(serie.dtype):
+        return 'number'
+    return str(serie.dtype)
+
+
+def needs_text_reparse(columns):
+    """
+    Whether a column parsed from several byte ranges must be parsed again as text.
+    Ranges holding only missing values adapt to the others, integer and float ranges
+    combine into float64 and booleans with missing values into objects, as pandas
+    does; numbers or booleans mixed with text do not combine.
+    """
+    return len({column_kind(serie) for serie in columns} - {None}) > 1
+
+
+def needs_pandas_reparse(columns):
+    """
+    Whether a numeric column parsed from several byte ranges must be parsed again by pandas
+    over the whole file: ranges read as uint64 (integers above INT64_MAX) combine with the
+    other numbers into float64, where pandas reads uint64, or text with negative integers.
+    """
+    dtypes = {serie.dtype for serie in columns if column_kind(serie) is not None}
+    return np.dtype('uint64') in dtypes and len(dtypes) > 1
+
+
+def parse_parallel(file_path, dtype=None, max_workers=None):
+    """
+    Split the file into byte ranges on line breaks and parse them with pandas on a
+    process pool. Ranges are combined with pandas' dtype contract: numbers become
+    float64 when any range is float; a column read as text in some ranges and as
+    numbers in others is parsed again as text, and one read as uint64 in some ranges
+    only is parsed again by pandas. Quoted fields may contain line breaks, so files
+    with quotes are parsed by pandas instead.
+    """
+    if hasattr(file_path, "getbuffer") or hasattr(file_path, "read"):
+        # Uploads are written to a temporary file the workers can read ranges of
+        if hasattr(file_path, "seek"):
+            file_path.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp:
+            tmp.write(file_path.getbuffer() if hasattr(file_path, "getbuffer") else file_path.read())
+        try:
+            return parse_parallel(tmp.name, dtype, max_workers)
+        finally:
+            os.remove(tmp.name)
+
+    if has_quotes(file_path):
+        return parse_pandas(file_path, dtype)
+    header, ranges = byte_ranges(file_path)
+    if len(ranges) <= 1:
+        return parse_pandas(file_path, dtype)
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers or os.cpu_count(), mp_context=context) as pool:
+        futures = [pool.submit(parse_range, file_path, header, start, end, dtype) for start, end in ranges]
+        frames = [future.result() for future in futures]
+        mixed = [col for col in frames[0].columns if needs_text_reparse([frame[col] for frame in frames])]
+        if mixed:
+            text = {col: str for col in mixed}
+            futures = [pool.submit(parse_range, file_path, header, start, end, text) for start, end in ranges]
+            for frame, future in zip(frames, futures):
+                reparsed = future.result()
+                for col in mixed:
+                    frame[col] = reparsed[col]
+    wide = [col for col in frames[0].columns if needs_pandas_reparse([frame[col] for frame in frames])]
+    df = pd.concat(frames, ignore_index=True)
+    if wide:
+        for col, values in parse_pandas_columns(file_path, wide, dtype).items():
+            df[col] = values
+    return apply_dtypes(df, dtype)
+
+
+# Parser backends, by name
+PARSERS = {
+    'pandas': parse_pandas,
+    'pyarrow': parse_pyarrow,
+    'parallel': parse_parallel,
+}
+
+
+def select_parser(file_path):
+    """Pick a backend from the file size: pandas for small files, pyarrow (or parallel pandas) otherwise."""
+    if file_size(file_path) < PANDAS_MAX_BYTES:
+        return 'pandas'
+    if pa_csv is not None:
+        return 'pyarrow'
+    return 'parallel' if (os.cpu_count() or 1) > 1 else 'pandas'
+
+
+def parse_csv(file_path, dtype=None, parser='auto'):
+    """
+    Parse a whole CSV file with one of the backends, into the same dtypes as pd.read_csv().
+
+    Parameters:
+        file_path (str or file-like): File path to uploaded CSV file.
+        dtype (dict): Dtype of some columns ('category' or a string dtype), as in pd.read_csv (optional).
+        parser (str): 'pandas', 'pyarrow', 'parallel' or 'auto' to choose from the file size.
+
+    Returns:
+        pd.DataFrame: Parsed file.
+    """
+    if parser == 'auto':
+        parser = select_parser(file_path)
+    return PARSERS[parser](file_path, dtype=dtype)
@@ -0,0 +1,366 @@
+import contextvars
+import io
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from common.memory import Z_95
+from common.sketches import Reservoir
+from tab_date.logics import DateColumn
+from tab_df.logics import Dataset
+from tab_num.logics import NumericColumn
+from tab_num.stats import to_numpy_values
+from tab_text.logics import TextColumn
+
+# Number of rows of the random sample the estimates are computed on
+SAMPLE_ROWS = 20_000
+
+# Bytes of the blocks of lines read while sampling (the first estimate is ready after the first block)
+BLOCK_BYTES = 4 * 1024 ** 2
+
+# Kind of every row of the summary tables, to scale it from the sample to the file:
+# 'count' rows count sampled rows and are scaled with a binomial margin, 'total' rows
+# sum a value over the rows, 'mean' rows get the margin of a mean, 'quantile' rows
+# (median, percentiles) the margin of an order statistic, 'distinct' rows and
+# 'lower_bound' rows (maxima) are lower bounds, 'upper_bound' rows (minima) upper
+# bounds, 'sample' rows hold for the sample only and 'value' rows (standard
+# deviation, mode) are the sample's. Rows past the listed kinds have the last one.
+SUMMARY_KINDS = {
+    'df': ['rows', 'exact', 'sample', 'total'],
+    'num': ['distinct', 'count', 'count', 'count', 'mean', 'value', 'upper_bound', 'lower_bound', 'quantile'],
+    'text': ['distinct', 'count', 'count', 'count', 'count', 'count', 'count', 'count', 'value'],
+    'date': ['distinct', 'count', 'count', 'count', 'count', 'count', 'count', 'upper_bound', 'lower_bound'],
+}
+
+# Column analysis class and name of its chart attribute, by kind of column
+COLUMN_CLASSES = {
+    'num': (NumericColumn, 'histogram'),
+    'text': (TextColumn, 'barchart'),
+    'date': (DateColumn, 'barchart'),
+}
+
+MARGIN_COLUMN = 'Margin 95% (±)'
+
+
+def finite_population_correction(k, n_rows):
+    return (n_rows - k) / max(n_rows - 1, 1)
+
+
+def count_margin(count, k, n_rows):
+    """95% margin of a count observed on k sampled rows and scaled to n_rows (binomial proportion)."""
+    if k == 0 or k >= n_rows:
+        return 0.0
+    p = count / k
+    return Z_95 * n_rows * np.sqrt(p * (1 - p) / k * finite_population_correction(k, n_rows))
+
+
+def mean_margin(std, k, n_rows):
+    """95% margin of a mean computed on k sampled rows out of n_rows."""
+    if k == 0 or k >= n_rows or std is None or pd.isna(std):
+        return 0.0
+    return Z_95 * std / np.sqrt(k) * np.sqrt(finite_population_correction(k, n_rows))
+
+
+def quantile_interval(values, p, n_rows):
+    """
+    95% confidence interval of the p-th percentile of n_rows values, from the sorted values
+    of a uniform sample of them (distribution-free): the order statistics whose ranks are
+    k * p / 100 minus and plus the binomial margin of the number of sampled values below
+    the percentile.
+
+    Returns:
+        tuple: (lower, upper) bounds (NaN without values).
+    """
+    k = len(values)
+    if k == 0:
+        return np.nan, np.nan
+    q = p / 100
+    half = Z_95 * np.sqrt(k * q * (1 - q) * finite_population_correction(k, n_rows))
+    low = int(np.clip(np.floor(k * q - half), 0, k - 1))
+    high = int(np.clip(np.ceil(k * q + half), 0, k - 1))
+    return values[low], values[high]
+
+
+def format_value(value):
+    if isinstance(value, (float, np.floating)) and not pd.isna(value):
+        return f"{value:,.4g}"
+    return str(value)
+
+
+def scale_summary(summary, kinds, k, n_rows, std=None, values=None, percentiles=()):
+    """
+    Scale a summary table computed on a sample of k rows to n_rows, adding the 95% margin
+    of every estimated value (values are formatted as text, as they mix types). std is
+    the standard deviation of the column ('mean' rows) or of the per-row values ('total'
+    rows); values are the sorted sampled values of the column and percentiles the
+    percentile of each 'quantile' row, in order (the margin of a quantile is the largest
+    distance from the value to the bounds of its interval, see quantile_interval()).
+    """
+    descriptions, margins = [], []
+    scaled = []
+    kinds = list(kinds) + kinds[-1:] * (len(summary) - len(kinds))
+    percentiles = iter(percentiles)
+    for description, value, kind in zip(summary['Description'], summary['Value'], kinds):
+        margin = ""
+        if kind == 'count':
+            count = float(pd.to_numeric(value, errors='coerce'))
+            value = int(round(count * n_rows / max(k, 1)))
+            margin = f"{count_margin(count, k, n_rows):,.0f}"
+        elif kind == 'total':
+            value = int(round(float(value) * n_rows / max(k, 1)))
+            margin = f"{n_rows * mean_margin(std, k, n_rows):,.0f}"
+        elif kind == 'mean':
+            margin = format_value(mean_margin(std, k, n_rows))
+        elif kind == 'quantile' and k < n_rows and values is not None:
+            low, high = quantile_interval(values, next(percentiles), n_rows)
+            margin = format_value(max(float(value) - low, high - float(value)))
+        elif kind == 'rows':
+            value = n_rows
+        elif kind in ('distinct', 'lower_bound') and k < n_rows:
+            description += " (at least)"
+        elif kind == 'upper_bound' and k < n_rows:
+            description += " (at most)"
+        elif kind == 'sample' and k < n_rows:
+            description += f" (in the sample of {k:,} rows)"
+        elif kind == 'value' and k < n_rows:
+            description += " (in the sample)"
+        descriptions.append(description)
+        scaled.append(format_value(value))
+        margins.append(margin)
+    return pd.DataFrame({'Description': descriptions, 'Value': scaled, MARGIN_COLUMN: margins})
+
+
+def scale_frequent(frequent, k, n_rows):
+    """Scale the occurrences of a frequent values table computed on k sampled rows to n_rows."""
+    frequent = frequent.copy()
+    counts = frequent['occurrence'].to_numpy(dtype='float64')
+    frequent['occurrence'] = np.round(counts * n_rows / max(k, 1)).astype('int64')
+    frequent[MARGIN_COLUMN] = np.round([count_margin(count, k, n_rows) for count in counts]).astype('int64')
+    return frequent
+
+
+def scale_chart(chart, k, n_rows):
+    """Copy of a chart built on k sampled rows with its counts scaled to n_rows."""
+    if not isinstance(getattr(chart, 'data', None), pd.DataFrame) or 'count' not in chart.data:
+        return chart
+    data = chart.data.copy()
+    data['count'] = np.round(data['count'] * n_rows / max(k, 1)).astype('int64')
+    scaled = chart.copy(deep=False)
+    scaled.data = data
+    return scaled
+
+
+class SampleEstimate:
+    """
+    Summary tables of a dataset estimated from a uniform random sample of its rows:
+    the tabs' own analyses are run on the sample, then counts are scaled to the
+    (estimated) number of rows of the file with 95% margins.
+    """
+
+    def __init__(self, sample, n_rows, fraction=1.0):
+        self.sample = sample
+        self.k = len(sample)
+        self.n_rows = max(int(round(n_rows)), self.k)
+        self.fraction = fraction
+        self.dataset = Dataset(None)
+        self.dataset.df = sample
+        self.dataset.load_data()
+        self.finders = {}
+        self.analyses = {}
+
+    def dataset_summary(self):
+        missing_per_row = self.sample.isnull().sum(axis=1)
+        return scale_summary(self.dataset.generate_summary(), SUMMARY_KINDS['df'], self.k, self.n_rows,
+                             std=missing_per_row.std())
+
+    def columns_table(self):
+        return self.dataset.table[['Column Name', 'Data Type']]
+
+    def finder(self, kind):
+        if kind not in self.finders:
+            self.finders[kind] = COLUMN_CLASSES[kind][0].finder(self.sample)
+        return self.finders[kind]
+
+    def columns(self, kind):
+        return self.finder(kind).cols_list
+
+    def column(self, kind, col_name):
+        """
+        Estimated analysis of a column.
+
+        Returns:
+            tuple: (summary table with margins, chart with scaled counts, frequent values table with margins).
+        """
+        if (kind, col_name) not in self.analyses:
+            column = self.finder(kind).analyze(col_name)
+            values, percentiles = None, ()
+            if kind == 'num':
+                values = to_numpy_values(column.serie)
+                values = np.sort(values[~np.isnan(values)] if values.dtype.kind == 'f' else values)
+                percentiles = [50, *column.quantiles]
+            summary = scale_summary(column.get_summary(), SUMMARY_KINDS[kind], self.k, self.n_rows,
+                                    std=getattr(column, 'col_std', None), values=values, percentiles=percentiles)
+            chart = scale_chart(getattr(column, COLUMN_CLASSES[kind][1]), self.k, self.n_rows)
+            self.analyses[kind, col_name] = summary, chart, scale_frequent(column.frequent, self.k, self.n_rows)
+        return self.analyses[kind, col_name]
+
+
+def line_blocks(data, block_bytes=BLOCK_BYTES):
+    """
+    Split the bytes of a CSV file (a NumPy uint8 view) into its header line and
+    (start, end) blocks of about block_bytes, each ending on a line break.
+    """
+    def next_line(position):
+        while position < len(data):
+            breaks = np.flatnonzero(data[position:position + 65536] == ord("\n"))
+            if len(breaks):
+                return position + int(breaks[0]) + 1
+            position += 65536
+        return len(data)
+
+    header_end = next_line(0)
+    blocks, start = [], header_end
+    while start < len(data):
+        end = next_line(start + block_bytes - 1)
+        blocks.append((start, end))
+        start = end
+    return header_end, blocks
+
+
+class ProgressiveLoad:
+    """
+    Load a dataset in the background while a second thread samples it: the file is
+    split into blocks of lines that are parsed in random order and folded into a
+    reservoir sample, so the first estimate (after one block) already covers a
+    random part of the whole file, and estimates improve with every block until the
+    exact load is done. Lines broken by quoted line breaks at block ends are skipped.
+    """
+
+    def __init__(self, file_path, load, sample_rows=SAMPLE_ROWS, block_bytes=BLOCK_BYTES, seed=0):
+        self.file_path = file_path
+        self.load = load
+        self.block_bytes = block_bytes
+        self.seed = seed
+        self.reservoir = Reservoir(sample_rows, seed)
+        self.fraction = 0.0
+        self.finished = False
+        self.exception = None
+        self._lock = threading.Lock()
+        self._threads = []
+        self._estimate = None
+
+    @property
+    def done(self):
+        return self.finished
+
+    def start(self):
+        # The full load runs in a copy of the caller's context, so that its instrumentation records it
+        context = contextvars.copy_context()
+        for target in (lambda: context.run(self.run_load), self.run_sampling):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def run_load(self):
+        try:
+            self.load()
+        except Exception as exception:
+            self.exception = exception
+        finally:
+            # Only the outcome is kept: the dataset is in the caches, the upload and the sample are released
+            with self._lock:
+                self.finished = True
+                self.load = None
+                self.file_path = None
+                self.reservoir = None
+                self._estimate = None
+
+    def file_bytes(self):
+        """Bytes of the file without copy: a memory map of a file path, the buffer of an upload."""
+        if isinstance(self.file_path, str):
+            with open(self.file_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return np.empty(0, dtype='uint8')
+                return np.frombuffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), dtype='uint8')
+        return np.frombuffer(self.file_path.getbuffer(), dtype='uint8')
+
+    def run_sampling(self):
+        with self._lock:
+            if self.done:
+                return
+            data = self.file_bytes()
+        header_end, blocks = line_blocks(data, self.block_bytes)
+        header = data[:header_end].tobytes()
+        n_bytes = max(len(data) - header_end, 1)
+        read = 0
+        for i in np.random.default_rng(self.seed).permutation(len(blocks)):
+            if self.done:
+                return
+            start, end = blocks[i]
+            try:
+                chunk = pd.read_csv(io.BytesIO(header + data[start:end].tobytes()), on_bad_lines='skip')
+            except (ValueError, pd.errors.ParserError):
+                chunk = None
+            read += end - start
+            with self._lock:
+                if self.done:
+                    return
+                if chunk is not None:
+                    self.reservoir.update(chunk)
+                self.fraction = min(read / n_bytes, 1.0)
+
+    def estimate(self):
+        """
+        SampleEstimate of the rows read so far, computed once per chunk (None before the
+        first chunk and once the load is done).
+        """
+        with self._lock:
+            if self.done:
+                return None
+            sample, n, fraction = self.reservoir.rows, self.reservoir.n, self.fraction
+        if sample is None:
+            return None
+        if self._estimate is None or self._estimate[0] != (n, fraction):
+            n_rows = n if fraction >= 1.0 else n / max(fraction, 1e-9)
+            self._estimate = ((n, fraction), SampleEstimate(sample.reset_index(drop=True), n_rows, fraction))
+        return self._estimate[1]
+
+    def wait(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+        return self
+
+
+# Progressive loads running, by dataset fingerprint, and the fingerprints of the last
+# FINISHED_LOADS finished ones: a finished load holds neither its upload nor its sample
+FINISHED_LOADS = 256
+_loads = {}
+_finished = OrderedDict()
+_loads_lock = threading.Lock()
+
+
+def start_progressive_load(fingerprint, file_path, load):
+    """
+    Return the ProgressiveLoad of a dataset, starting it on the first call, or None once
+    it is done: the dataset is then served by the caches, or loaded again when evicted.
+    """
+    with _loads_lock:
+        if fingerprint in _finished:
+            _finished.move_to_end(fingerprint)
+            return None
+        progress = _loads.get(fingerprint)
+        if progress is None:
+            progress = ProgressiveLoad(file_path, load).start()
+            _loads[fingerprint] = progress
+        elif progress.done:
+            del _loads[fingerprint]
+            _finished[fingerprint] = True
+            while len(_finished) > FINISHED_LOADS:
+                _finished.popitem(last=False)
+            return None
+    return progress
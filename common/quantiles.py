@@ -0,0 +1,163 @@
+import math
+
+import numpy as np
+
+# Percentiles shown in the numeric summaries
+DEFAULT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# Default number of items kept by the top level of a KLL sketch (about 1.3% rank error)
+DEFAULT_K = 200
+
+
+def quantile_positions(n, percentiles):
+    """Fractional positions in the sorted values of each percentile (linear interpolation, as np.quantile)."""
+    return [(n - 1) * p / 100 for p in percentiles]
+
+
+def exact_quantiles(values, percentiles=DEFAULT_PERCENTILES, is_sorted=False):
+    """
+    Exact percentiles of an array without missing values, interpolated like np.quantile
+    and Series.quantile. Unless the values are already sorted, one np.partition call
+    places every needed rank (linear time), instead of sorting a copy of the column.
+
+    Returns:
+        dict: Value of each percentile (NaN for an empty array).
+    """
+    n = len(values)
+    if n == 0:
+        return {p: np.nan for p in percentiles}
+    positions = quantile_positions(n, percentiles)
+    ranks = sorted({int(math.floor(x)) for x in positions} | {int(math.ceil(x)) for x in positions})
+    ordered = values if is_sorted else np.partition(values, ranks)
+    result = {}
+    for p, x in zip(percentiles, positions):
+        low, high = float(ordered[int(math.floor(x))]), float(ordered[int(math.ceil(x))])
+        result[p] = low + (high - low) * (x - math.floor(x))
+    return result
+
+
+class KLLSketch:
+    """
+    KLL sketch of the distribution of a numeric column (Karnin, Lang and Liberty).
+
+    Values go to level 0; a level holding more than its capacity is sorted and every
+    other item (from a random offset) moves up one level, where it counts twice.
+    Capacities shrink by 2/3 per level below the top one (k items), so the sketch
+    keeps O(k) items whatever the number of values. Sketches with the same k are
+    merged level by level. Any quantile has a rank error of at most error (the
+    fraction of the values) with 99% probability.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.col_min = None
+        self.col_max = None
+
+    @classmethod
+    def from_error(cls, error, seed=0):
+        """Create the smallest sketch with a rank error of at most error."""
+        return cls(max(int(math.ceil((2.296 / error) ** (1 / 0.9723))), 8), seed)
+
+    @property
+    def error(self):
+        """Normalized rank error bound with 99% confidence (empirical constants of the KLL paper's analysis)."""
+        return 2.296 / self.k ** 0.9723
+
+    @property
+    def exact(self):
+        """Whether no value was compacted yet (quantiles are then exact)."""
+        return len(self.levels) == 1
+
+    def to_state(self):
+        """State of the sketch as JSON values and arrays (see common.disk_cache.StateWriter)."""
+        return {'k': self.k, 'rng': self.rng.bit_generator.state, 'levels': list(self.levels), 'n': self.n,
+                'col_min': self.col_min, 'col_max': self.col_max}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['k'])
+        sketch.rng.bit_generator.state = state['rng']
+        sketch.levels = [np.array(items, dtype='float64') for items in state['levels']]
+        sketch.n = state['n']
+        sketch.col_min = state['col_min']
+        sketch.col_max = state['col_max']
+        return sketch
+
+    def capacity(self, level):
+        return max(int(math.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))), 2)
+
+    def update(self, values):
+        """Add values (missing values are ignored) to the sketch."""
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.col_min = min(self.col_min, values.min()) if self.col_min is not None else values.min()
+            self.col_max = max(self.col_max, values.max()) if self.col_max is not None else values.max()
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.compress()
+        return self
+
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError("Cannot merge KLL sketches with different k.")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        if other.n:
+            self.col_min = other.col_min if self.col_min is None else min(self.col_min, other.col_min)
+            self.col_max = other.col_max if self.col_max is None else max(self.col_max, other.col_max)
+        self.n += other.n
+        self.compress()
+        return self
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # With an odd count, the smallest item stays at its level
+                odd = len(items) % 2
+                promoted = items[odd + self.rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:odd]
+            level += 1
+
+    def weighted_items(self):
+        """Sorted items of the sketch and the number of values each one stands for (2 ** its level)."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantiles(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        Estimated percentiles, interpolated like exact_quantiles() while no value was
+        compacted, otherwise the item at the requested weighted rank.
+
+        Returns:
+            dict: Value of each percentile (NaN for an empty sketch).
+        """
+        if self.n == 0:
+            return {p: np.nan for p in percentiles}
+        if self.exact:
+            return exact_quantiles(self.levels[0], percentiles)
+        items, weights = self.weighted_items()
+        cumulative = np.cumsum(weights)
+        result = {}
+        for p in percentiles:
+            if p <= 0:
+                result[p] = float(self.col_min)
+            elif p >= 100:
+                result[p] = float(self.col_max)
+            else:
+                index = np.searchsorted(cumulative, p / 100 * cumulative[-1], side='left')
+                result[p] = float(items[min(index, len(items) - 1)])
+        return result
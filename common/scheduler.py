@@ -0,0 +1,188 @@
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import pyarrow as pa
+
+from common.cache import IngestionCache
+from common.disk_cache import analyze_cached
+from common.ingest import ARROW_CONVERSION_ERRORS
+from common.lazy import COMPUTATIONS, attach, detach
+from common.sketches import DEFAULT_ERROR
+from tab_date.logics import DateColumn
+from tab_num.logics import NumericColumn
+from tab_text.logics import TextColumn
+
+# Analyses run for every dataset: (kind of the column analysis, kind of the column list, class)
+PROFILE_KINDS = [
+    ('num', 'num_cols', NumericColumn),
+    ('text', 'text_cols', TextColumn),
+    ('date', 'date_cols', DateColumn),
+]
+
+# Number of workers of the background pools
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(processes=False, max_workers=DEFAULT_WORKERS):
+    """Return the process-wide thread pool (or process pool), created on first use."""
+    with _pools_lock:
+        if processes not in _pools:
+            if processes:
+                # Spawned workers do not inherit the locks and threads of the Streamlit server
+                _pools[processes] = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                _pools[processes] = ThreadPoolExecutor(max_workers, thread_name_prefix="profile")
+        return _pools[processes]
+
+
+def share_column(df, col_name):
+    """
+    Write a column of a DataFrame to a new shared memory block as an Arrow IPC stream
+    (numbers, strings, categories and dates as Arrow buffers, with the pandas dtype in
+    the schema), sized beforehand so the column is written once.
+
+    Returns:
+        shared_memory.SharedMemory: The block, to close and unlink once read.
+    """
+    table = pa.Table.from_pandas(df[[col_name]], preserve_index=False)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    shm = shared_memory.SharedMemory(create=True, size=max(sink.size(), 1))
+    try:
+        with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+            writer.write_table(table)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return shm
+
+
+def analyze_shared(finder, col_name, name):
+    """
+    Analyse a column written to shared memory by share_column() (run in a worker process)
+    with the detached column finder of its kind. The Arrow buffers are mapped, not
+    copied (strings become Python objects once, as read_csv gives them); the analysis
+    is returned without its data.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        df = pa.ipc.open_stream(pa.py_buffer(shm.buf)).read_all().to_pandas(split_blocks=True)
+        column = detach(attach(finder, df).analyze(col_name))
+        del df
+    finally:
+        shm.close()
+    return column
+
+
+class ProfileScheduler:
+    """
+    Precompute in the background the analysis of every column of a dataset, as soon
+    as it is loaded, and store it in common.lazy.COMPUTATIONS under the keys the tabs
+    read. Columns are analysed on a thread pool, sharing the loaded DataFrame
+    without copy. With processes=True, the columns of a loaded DataFrame are analysed
+    on a process pool instead: each column is placed once in shared memory as Arrow
+    buffers that the workers map, rather than pickled (columns Arrow cannot hold,
+    such as objects mixing numbers and text, stay on the thread pool). With a
+    disk_cache, analyses persisted by an earlier session are reloaded instead of computed.
+    """
+
+    def __init__(self, dataset, approximate=False, error=DEFAULT_ERROR, processes=False, store=COMPUTATIONS,
+                 disk_cache=None):
+        self.dataset = dataset
+        self.disk_cache = disk_cache
+        self.params = {'approximate': approximate, 'error': error}
+        self.processes = processes and dataset.df is not None
+        self.store = store
+        self.futures = []
+        self._lock = threading.Lock()
+
+    @property
+    def n_total(self):
+        with self._lock:
+            return len(self.futures)
+
+    @property
+    def n_done(self):
+        with self._lock:
+            return sum(future.done() for future in self.futures)
+
+    @property
+    def progress(self):
+        """Fraction of the scheduled analyses that are finished."""
+        total = self.n_total
+        return self.n_done / total if total else 0.0
+
+    def submit(self, fn, *args):
+        # Run in a copy of the caller's context, so that its instrumentation records the analyses
+        future = get_pool().submit(contextvars.copy_context().run, fn, *args)
+        with self._lock:
+            self.futures.append(future)
+        return future
+
+    def start(self):
+        """Schedule the discovery of each kind of column, which schedules the analysis of every column found."""
+        for kind, cols_kind, column_class in PROFILE_KINDS:
+            self.submit(self.find_columns, kind, cols_kind, column_class)
+        return self
+
+    def wait(self):
+        """Block until every scheduled analysis is finished (futures scheduled meanwhile included)."""
+        while True:
+            with self._lock:
+                pending = [future for future in self.futures if not future.done()]
+            if not pending:
+                break
+            for future in pending:
+                future.result()
+        return self
+
+    def find_columns(self, kind, cols_kind, column_class):
+        dataset = self.dataset
+        finder = attach(self.store.get(dataset.fingerprint, cols_kind, params=self.params,
+                                       compute=lambda: column_class.finder(dataset.df, dataset.profile, **self.params)),
+                        dataset.df, dataset.profile)
+        for col_name in finder.cols_list:
+            self.submit(self.analyze, kind, finder, col_name)
+
+    def analyze(self, kind, finder, col_name):
+        fingerprint = self.dataset.fingerprint
+        in_process = (lambda: self.analyze_in_process(finder, col_name)) if self.processes else None
+        compute = lambda: analyze_cached(finder, col_name, fingerprint, kind, self.params, self.disk_cache, in_process)
+        return self.store.get(fingerprint, kind, col_name, self.params, compute)
+
+    def analyze_in_process(self, finder, col_name):
+        """Analyse a column on the process pool, handing its values over through shared memory."""
+        try:
+            shm = share_column(self.dataset.df, col_name)
+        except ARROW_CONVERSION_ERRORS:
+            return finder.analyze(col_name)
+        try:
+            return get_pool(processes=True).submit(analyze_shared, detach(finder), col_name, shm.name).result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+# Schedulers started for each (dataset fingerprint, analysis parameters)
+_schedulers = IngestionCache(max_entries=32)
+_schedulers_lock = threading.Lock()
+
+
+def start_profiling(dataset, approximate=False, error=DEFAULT_ERROR, processes=False, disk_cache=None):
+    """Return the ProfileScheduler of a dataset and parameters, starting it on the first call."""
+    key = (dataset.fingerprint, approximate, error, processes)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None or scheduler.dataset is not dataset:
+            scheduler = ProfileScheduler(dataset, approximate, error, processes, disk_cache=disk_cache).start()
+            _schedulers.put(key, scheduler)
+    return scheduler
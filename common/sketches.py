@@ -0,0 +1,211 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Default relative error of the approximate mode
+DEFAULT_ERROR = 0.01
+
+
+def hash_values(values):
+    """Return a 64-bit hash of every value (as np.uint64), consistent across chunks and processes."""
+    return pd.util.hash_array(np.asarray(values))
+
+
+def bit_length(x):
+    """Vectorized int.bit_length() of an array of np.uint64."""
+    x = x.copy()
+    n = np.zeros(len(x), dtype='uint8')
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= np.uint64(1 << shift)
+        n[high] += shift
+        x[high] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog estimator of the number of distinct values, with a relative
+    standard error of 1.04 / sqrt(2 ** precision). Two sketches with the same
+    precision are merged by taking the maximum of their registers.
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18.")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype='uint8')
+
+    @classmethod
+    def from_error(cls, error=DEFAULT_ERROR):
+        """Create the smallest sketch with a relative standard error of at most error."""
+        return cls(int(np.clip(math.ceil(math.log2((1.04 / error) ** 2)), 4, 18)))
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_state(self):
+        """State of the sketch as JSON values and arrays (see common.disk_cache.StateWriter)."""
+        return {'precision': self.precision, 'registers': self.registers}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['precision'])
+        sketch.registers = np.array(state['registers'], dtype='uint8')
+        return sketch
+
+    def update(self, values, hashed=False):
+        """Add values (or their 64-bit hashes when hashed=True) to the sketch."""
+        hashes = np.asarray(values, dtype='uint64') if hashed else hash_values(values)
+        if len(hashes) == 0:
+            return self
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype('int64')
+        remainder = hashes << p
+        # Position of the leftmost 1-bit in the remaining 64 - p bits
+        rank = np.minimum(np.uint8(64) - bit_length(remainder), 64 - self.precision).astype('uint8') + 1
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precisions.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        """Estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype('int64')))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the most frequent values. Counts are upper bounds,
+    over-estimated by at most n_rows / capacity each; two summaries are merged
+    with the algorithm of Cafaro et al. (each side's minimum count stands in
+    for the values it does not track).
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.n = 0
+        self.counts = pd.Series(dtype='int64')
+        self.errors = pd.Series(dtype='int64')
+        self.exact = True
+
+    @classmethod
+    def from_error(cls, error=DEFAULT_ERROR):
+        """Create a summary whose counts are over-estimated by at most error * n_rows."""
+        return cls(max(int(math.ceil(1 / error)), 1))
+
+    def to_state(self):
+        """State of the summary as JSON values and arrays (see common.disk_cache.StateWriter)."""
+        return {'capacity': self.capacity, 'n': self.n, 'exact': self.exact,
+                'values': self.counts.index.to_numpy(), 'counts': self.counts.to_numpy(),
+                'errors': self.errors.to_numpy()}
+
+    @classmethod
+    def from_state(cls, state):
+        summary = cls(state['capacity'])
+        index = pd.Index(state['values']) if len(state['values']) else summary.counts.index
+        summary.counts = pd.Series(state['counts'], index=index, dtype='int64')
+        summary.errors = pd.Series(state['errors'], index=index, dtype='int64')
+        summary.n = state['n']
+        summary.exact = state['exact']
+        return summary
+
+    @property
+    def is_full(self):
+        return len(self.counts) >= self.capacity
+
+    @property
+    def max_error(self):
+        """Upper bound on the over-estimation of any count."""
+        return 0 if self.exact else int(math.ceil(self.n / self.capacity))
+
+    def update(self, values):
+        """Add values (missing values are ignored) to the summary."""
+        counts = pd.Series(values).value_counts()
+        if len(counts):
+            self.merge_counts(counts, pd.Series(0, index=counts.index), int(counts.sum()), 0)
+        return self
+
+    def merge(self, other):
+        other_min = int(other.counts.min()) if other.is_full else 0
+        self.merge_counts(other.counts, other.errors, other.n, other_min, exact=other.exact)
+        return self
+
+    def merge_counts(self, counts, errors, n, other_min, exact=True):
+        own_min = int(self.counts.min()) if self.is_full else 0
+        index = self.counts.index.union(counts.index, sort=False)
+        merged = self.counts.reindex(index, fill_value=own_min) + counts.reindex(index, fill_value=other_min)
+        merged_errors = self.errors.reindex(index, fill_value=own_min) + errors.reindex(index, fill_value=other_min)
+        self.exact = self.exact and exact and len(merged) <= self.capacity
+        if len(merged) > self.capacity:
+            merged = merged.nlargest(self.capacity, keep='first')
+        self.counts = merged.astype('int64')
+        self.errors = merged_errors.reindex(merged.index).astype('int64')
+        self.n += n
+
+    def top(self, k=20):
+        """Return the k values with the largest estimated counts, as a Series sorted in descending order."""
+        return self.counts.sort_values(ascending=False, kind='stable').head(k)
+
+
+class Reservoir:
+    """
+    Uniform random sample of at most size rows among the rows seen so far. Every row
+    draws a random key and the rows with the smallest keys are kept (bottom-k
+    sampling), so the sample can grow chunk by chunk and two reservoirs are merged
+    by keeping the smallest keys of both.
+    """
+
+    def __init__(self, size=1000, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.n = 0
+        self.keys = np.empty(0)
+        self.rows = None
+
+    def to_state(self):
+        """State of the sample as JSON values, arrays and its rows (see common.disk_cache.StateWriter)."""
+        return {'size': self.size, 'rng': self.rng.bit_generator.state, 'n': self.n, 'keys': self.keys,
+                'rows': self.rows}
+
+    @classmethod
+    def from_state(cls, state):
+        reservoir = cls(state['size'])
+        reservoir.rng.bit_generator.state = state['rng']
+        reservoir.n = state['n']
+        reservoir.keys = np.array(state['keys'], dtype='float64')
+        reservoir.rows = state['rows']
+        return reservoir
+
+    def update(self, chunk):
+        """Add the rows of a DataFrame chunk to the sample."""
+        chunk_keys = self.rng.random(len(chunk))
+        candidates = np.argsort(chunk_keys)[:self.size]
+        self.n += len(chunk)
+        return self.merge_rows(chunk_keys[candidates], chunk.iloc[candidates])
+
+    def merge(self, other):
+        self.n += other.n
+        if other.rows is not None:
+            self.merge_rows(other.keys, other.rows)
+        return self
+
+    def merge_rows(self, keys, rows):
+        keys = np.concatenate([self.keys, keys])
+        rows = rows if self.rows is None else pd.concat([self.rows, rows])
+        keep = np.argsort(keys)[:self.size]
+        self.keys = keys[keep]
+        self.rows = rows.iloc[keep]
+        return self
@@ -1,7 +1,11 @@
 import streamlit as st
+from common.disk_cache import analyze_cached
+from common.instrument import stage
+from common.lazy import COMPUTATIONS, attach
+from common.sketches import DEFAULT_ERROR
 from tab_date.logics import DateColumn
 
-def display_tab_date_content(file_path=None, df=None):
+def display_tab_date_content(file_path=None, df=None, profile=None, approximate=False, error=DEFAULT_ERROR, key=None, disk_cache=None):
     """
     --------------------
     Description
@@ -10,32 +14,48 @@ def display_tab_date_content(file_path=None, df=None):
     It identifies datetime columns, displays a dropdown to select one, and then shows:
        - A summary table of the column's statistics
        - A bar chart of date occurrences by year
+       - Bar charts of date occurrences by month, weekday and hour (when the dates have times)
        - A table of the most frequent dates
 
     Parameters:
     - file_path (str): Optional file path to a CSV file.
     - df (pd.DataFrame): Optional loaded DataFrame.
+    - profile (common.chunked.ChunkedProfile): Optional out-of-core profile, used when no DataFrame is loaded.
+    - approximate (bool): Optional, estimate the unique count and frequent dates with sketches.
+    - error (float): Optional relative error of the sketches in approximate mode.
+    - key (str): Optional fingerprint of the loaded dataset; when given, the column list and each column analysis are computed once and then served from common.lazy.COMPUTATIONS.
+    - disk_cache (common.disk_cache.DiskCache): Optional persistent cache of the column analyses (used with key).
 
     Returns:
     - None
     """
     
-    # Instantiate DateColumn in Streamlit session state
-    if file_path or (df is not None):
-        if file_path:
-            st.session_state.date_column = DateColumn(file_path=file_path)
-        else:
-            st.session_state.date_column = DateColumn(df=df)
-            
-    # Find datetime columns
-    st.session_state.date_column.find_date_cols()
-    
+    params = {'approximate': approximate, 'error': error}
+    if key is not None:
+        # Find datetime columns once per dataset
+        st.session_state.date_column = COMPUTATIONS.get(key, 'date_cols', params=params, compute=lambda: DateColumn.finder(df, profile, **params))
+    else:
+        # Instantiate DateColumn in Streamlit session state
+        if file_path or (df is not None) or (profile is not None):
+            if file_path:
+                st.session_state.date_column = DateColumn(file_path=file_path, **params)
+            else:
+                st.session_state.date_column = DateColumn(df=df, profile=profile, **params)
+
+        # Find datetime columns
+        st.session_state.date_column.find_date_cols()
+
     # Create a select box to choose a datetime column
     selected_column = st.selectbox("Which datetime column do you want to explore?", st.session_state.date_column.cols_list)
-    
+
     if selected_column:
-        # Set data for the selected column
-        st.session_state.date_column.set_data(selected_column)
+        # Set data for the selected column (only the first time it is selected when key is given)
+        if key is not None:
+            finder = attach(st.session_state.date_column, df, profile)
+            st.session_state.date_column = COMPUTATIONS.get(key, 'date', selected_column, params,
+                                                            lambda: analyze_cached(finder, selected_column, key, 'date', params, disk_cache))
+        else:
+            st.session_state.date_column.set_data(selected_column)
 
         # Create an expander container to show information
         with st.expander("Date Column Summary"):
@@ -48,7 +68,16 @@ def display_tab_date_content(file_path=None, df=None):
             st.write("### Bar Chart")
             chart = st.session_state.date_column.barchart
             if chart is not None:
-                st.altair_chart(chart, use_container_width=True)
+                with stage("DateColumn.altair_chart", column=selected_column):
+                    st.altair_chart(chart, use_container_width=True)
+
+            # Display the month, weekday and hour histograms in tabs
+            histograms = getattr(st.session_state.date_column, 'histograms', None)
+            if histograms:
+                st.write("### Seasonality")
+                for tab, histogram in zip(st.tabs(list(histograms)), histograms.values()):
+                    with tab, stage("DateColumn.altair_chart", column=selected_column):
+                        st.altair_chart(histogram, use_container_width=True)
 
             # Display the most frequent values
             st.write("### Most Frequent Values")
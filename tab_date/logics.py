@@ -1,57 +1,164 @@
 import pandas as pd
 import altair as alt
 
+from common.dates import detect_date_format, parse_dates
+from common.ingest import is_text_dtype, read_csv
+from common.instrument import column_name, df_rows, instrumented, serie_rows
+from common.sketches import DEFAULT_ERROR, HyperLogLog, SpaceSaving
+from tab_date.stats import MONTH_NAMES, NAT, WEEKDAY_NAMES, compute_date_stats, to_nanoseconds
+
 class DateColumn:
-    def __init__(self, file_path=None, df=None):
+    def __init__(self, file_path=None, df=None, profile=None, approximate=False, error=DEFAULT_ERROR):
         self.file_path = file_path
-        self.df = pd.read_csv(file_path) if file_path else df
+        self.df = read_csv(file_path)[0] if file_path else df
+        self.profile = profile
+        self.approximate = approximate
+        self.error = error
+        self.estimated = set()
         self.cols_list = []
+        self.formats = {}
         self.serie = None
+        self.stats = None
         self.summary_data = {}
+        # First date in the future: the summary is out of date from then on (see common.lazy.is_expired())
+        self.expires = None
         self.barchart = None
+        self.histograms = {}
         self.frequent = pd.DataFrame(columns=['value', 'occurrence', 'percentage'])
 
+    @instrumented("DateColumn.find_date_cols", rows=df_rows)
     def find_date_cols(self):
+        if self.df is None and self.profile is not None:
+            self.cols_list = list(self.profile.date_cols)
         if self.df is not None:
             date_cols = self.df.select_dtypes(include=['datetime64']).columns.tolist()
             if not date_cols:
-                object_columns = self.df.select_dtypes(include=['object'])
-                self.cols_list = [col for col in object_columns.columns if pd.to_datetime(self.df[col], errors='coerce').notnull().any()]
+                # Decide on a sample of each text column and keep the inferred format for set_data()
+                self.cols_list = []
+                for col in [col for col, dtype in self.df.dtypes.items() if is_text_dtype(dtype)]:
+                    is_date, self.formats[col] = detect_date_format(self.df[col])
+                    if is_date:
+                        self.cols_list.append(col)
             else:
                 self.cols_list = date_cols
 
+    @classmethod
+    def finder(cls, df=None, profile=None, approximate=False, error=DEFAULT_ERROR):
+        """Return a DateColumn with the datetime columns of the dataset (and their formats) found, to analyze() them."""
+        column = cls(df=df, profile=profile, approximate=approximate, error=error)
+        column.find_date_cols()
+        return column
+
+    def analyze(self, col_name):
+        """Return a new DateColumn holding the analysis of col_name, leaving this one unchanged."""
+        column = DateColumn(df=self.df, profile=self.profile, approximate=self.approximate, error=self.error)
+        column.cols_list = self.cols_list
+        column.formats = self.formats
+        column.set_data(col_name)
+        return column
+
+    @instrumented("DateColumn.set_data", rows=serie_rows, column=column_name)
     def set_data(self, col_name):
-        if col_name in self.df.columns:
-            self.serie = pd.to_datetime(self.df[col_name], errors='coerce')
+        if self.df is None and self.profile is not None:
+            self.set_accumulator(self.profile.dates[col_name])
+        elif col_name in self.df.columns:
+            self.serie = self.parse_column(col_name)
             self._calculate_summary()
             self._generate_barchart()
             self._calculate_frequent_values()
         else:
             raise ValueError(f"Column '{col_name}' not found in the DataFrame.")
 
+    @instrumented("DateColumn.parse_column", rows=df_rows, column=column_name)
+    def parse_column(self, col_name):
+        # Parse once with the format inferred from the sample (vectorized fast path)
+        serie = self.df[col_name]
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+            return serie
+        if col_name not in self.formats:
+            self.formats[col_name] = detect_date_format(serie)[1]
+        return parse_dates(serie, self.formats[col_name])
+
+    def set_accumulator(self, accumulator):
+        # Out-of-core mode: unique count and frequent values are estimated by the sketches
+        self.error = accumulator.error
+        self.estimated = {"Number of Unique Values", "frequent"}
+        n_future, exact, self.expires = accumulator.future_dates()
+        if not exact:
+            self.estimated.add("Number of Dates in Future")
+        self._set_frequent_from_sketch(accumulator.frequent)
+        self._set_charts(accumulator.years, accumulator.months, accumulator.weekdays, accumulator.hours)
+        self.summary_data = {
+            "Number of Unique Values": accumulator.distinct.estimate(),
+            "Number of Rows with Missing Values": accumulator.n_missing,
+            "Number of Weekend Dates": accumulator.n_weekend,
+            "Number of Weekday Dates": accumulator.n_weekday,
+            "Number of Dates in Future": n_future,
+            "Number of Rows with 1900-01-01": accumulator.n_1900,
+            "Number of Rows with 1970-01-01": accumulator.n_1970,
+            "Minimum Value": accumulator.col_min,
+            "Maximum Value": accumulator.col_max
+        }
+
+    @instrumented("DateColumn._calculate_summary", rows=serie_rows)
     def _calculate_summary(self):
-        # Setting the order of the descriptions as per the display in the screenshot
+        # Every count, the extrema and the histograms in one pass over the int64 nanoseconds
+        self.stats = compute_date_stats(to_nanoseconds(self.serie))
+        self.expires = None if pd.isna(self.stats['next_future']) else self.stats['next_future']
+        if self.approximate:
+            self.estimated = {"Number of Unique Values", "frequent"}
+            n_unique = HyperLogLog.from_error(self.error).update(self._valid_nanoseconds()).estimate()
+        else:
+            n_unique = self.serie.nunique()
         self.summary_data = {
-            "Number of Unique Values": self.serie.nunique(),
-            "Number of Rows with Missing Values": self.serie.isna().sum(),
-            "Number of Weekend Dates": self.serie.dt.dayofweek.isin([5, 6]).sum(),
-            "Number of Weekday Dates": (~self.serie.dt.dayofweek.isin([5, 6])).sum(),
-            "Number of Dates in Future": (self.serie > pd.Timestamp.now()).sum(),
-            "Number of Rows with 1900-01-01": (self.serie == pd.Timestamp("1900-01-01")).sum(),
-            "Number of Rows with 1970-01-01": (self.serie == pd.Timestamp("1970-01-01")).sum(),
-            "Minimum Value": self.serie.min(),
-            "Maximum Value": self.serie.max()
+            "Number of Unique Values": n_unique,
+            "Number of Rows with Missing Values": self.stats['n_missing'],
+            "Number of Weekend Dates": self.stats['n_weekend'],
+            "Number of Weekday Dates": self.stats['n_weekday'],
+            "Number of Dates in Future": self.stats['n_future'],
+            "Number of Rows with 1900-01-01": self.stats['n_1900'],
+            "Number of Rows with 1970-01-01": self.stats['n_1970'],
+            "Minimum Value": self.stats['col_min'],
+            "Maximum Value": self.stats['col_max']
         }
 
+    @instrumented("DateColumn._generate_barchart")
     def _generate_barchart(self):
-        year_counts = self.serie.dt.year.value_counts().reset_index()
-        year_counts.columns = ['year', 'count']
+        self._set_charts(self.stats['years'], self.stats['months'], self.stats['weekdays'], self.stats['hours'])
+
+    def _set_charts(self, years, months, weekdays, hours):
+        # Charts are built from the pre-aggregated counts: at most one row per year, month, weekday or hour
+        year_counts = years.rename_axis('year').reset_index(name='count')
         self.barchart = alt.Chart(year_counts).mark_bar().encode(
-            x=alt.X('year:T', title='Year'),
+            x=alt.X('year:O', title='Year'),
+            y=alt.Y('count:Q', title='Count of Records')
+        )
+        self.histograms = {
+            'Month': self._histogram(MONTH_NAMES, months, 'month'),
+            'Weekday': self._histogram(WEEKDAY_NAMES, weekdays, 'weekday'),
+        }
+        # Dates without a time of day all fall at midnight: the hour histogram is only shown with times
+        if hours[1:].any():
+            self.histograms['Hour'] = self._histogram(list(range(24)), hours, 'hour')
+
+    @staticmethod
+    def _histogram(labels, counts, field):
+        table = pd.DataFrame({field: labels, 'count': counts})
+        return alt.Chart(table).mark_bar().encode(
+            x=alt.X(f'{field}:O', title=field.capitalize(), sort=list(labels)),
             y=alt.Y('count:Q', title='Count of Records')
         )
 
+    def _valid_nanoseconds(self):
+        # Non-missing dates as int64 nanoseconds since the epoch
+        nanoseconds = to_nanoseconds(self.serie)
+        return nanoseconds[nanoseconds != NAT]
+
+    @instrumented("DateColumn._calculate_frequent_values", rows=serie_rows)
     def _calculate_frequent_values(self, end=20):
+        if self.approximate:
+            self._set_frequent_from_sketch(SpaceSaving.from_error(self.error).update(self._valid_nanoseconds()), end)
+            return
         counts = self.serie.value_counts().head(end)
         self.frequent = pd.DataFrame({
             'value': counts.index,
@@ -59,6 +166,16 @@ class DateColumn:
             'percentage': (counts / counts.sum()).round(4)
         })
 
+    def _set_frequent_from_sketch(self, sketch, end=20):
+        # Occurrences from a Space-Saving summary are upper bounds, over-estimated by at most max_error
+        counts = sketch.top(end)
+        self.frequent = pd.DataFrame({
+            'value': pd.to_datetime(counts.index.to_numpy(dtype='int64')),
+            'occurrence': counts.to_numpy(),
+            'percentage': (counts / max(counts.sum(), 1)).round(4).to_numpy(),
+            'max_error': sketch.max_error
+        })
+
     def get_summary(self):
         # Creating a DataFrame from the summary dictionary in the specified order
         ordered_summary = [
@@ -73,7 +190,8 @@ class DateColumn:
             "Maximum Value"
         ]
         summary_df = pd.DataFrame(
-            [(desc, self.summary_data[desc]) for desc in ordered_summary],
+            [(desc + (f" (estimated, ±{self.error:.1%})" if desc in self.estimated else ""), self.summary_data[desc])
+             for desc in ordered_summary],
             columns=["Description", "Value"]
         )
         return summary_df
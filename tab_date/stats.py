@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# Missing datetimes (NaT) in the int64 view of a datetime64[ns] array
+NAT = np.iinfo('int64').min
+
+NS_PER_HOUR = 3_600 * 10 ** 9
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+# Sentinel dates counted in the summary, as nanoseconds since the epoch
+NS_1900 = pd.Timestamp("1900-01-01").value
+NS_1970 = 0
+
+# Number of values processed at once, bounding the size of the temporary arrays
+DATE_BLOCK_SIZE = 1_000_000
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def to_nanoseconds(serie):
+    """
+    int64 view of a datetime Series in nanoseconds since the epoch (NaT as NAT); time
+    zone aware dates are taken in their local wall time, as the .dt accessors do.
+    """
+    if getattr(serie.dt, 'tz', None) is not None:
+        serie = serie.dt.tz_localize(None)
+    return serie.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def civil_from_days(days):
+    """
+    Year and month (1-12) of days since 1970-01-01, with integer arithmetic only
+    (the proleptic Gregorian algorithm of Howard Hinnant, counting eras of 400 years
+    from March 1st so that leap days fall at the end of a year).
+    """
+    z = days + 719_468
+    era = np.floor_divide(z, 146_097)
+    doe = z - era * 146_097
+    yoe = (doe - doe // 1_460 + doe // 36_524 - doe // 146_096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month
+
+
+def compute_date_stats(nanoseconds, now=None, block_size=DATE_BLOCK_SIZE):
+    """
+    Compute every summary count, the extrema and the histograms of a datetime column at once.
+
+    Values are read block by block from their int64 nanosecond view: each block adds
+    its hours to a 24-bin histogram and its days since the epoch to a histogram of
+    the days between the first and the last date seen (extended as blocks widen the
+    range), from which weekdays ((days + 3) % 7, 1970-01-01 being a Thursday), years
+    and months are derived once at the end, on the days present only.
+
+    Parameters:
+        nanoseconds (np.ndarray): int64 nanoseconds since the epoch (see to_nanoseconds()).
+        now (pd.Timestamp): Reference of the dates in the future (optional, now by default).
+        block_size (int): Number of values processed at once.
+
+    Returns:
+        dict: Counts keyed by the matching DateAccumulator attribute names, extrema as
+        pd.Timestamp in 'col_min' and 'col_max' (NaT without dates), the first date after
+        now in 'next_future' (NaT without any), histograms in
+        'years' (pd.Series of counts by year) and 'months', 'weekdays', 'hours'
+        (int64 arrays of 12, 7 and 24 counts).
+    """
+    now_ns = (pd.Timestamp.now() if now is None else pd.Timestamp(now)).value
+    # Histogram of the days from first_day on
+    days, first_day = np.zeros(0, dtype='int64'), 0
+    hours = np.zeros(24, dtype='int64')
+    stats = {'n_rows': len(nanoseconds), 'n_missing': 0, 'n_future': 0, 'n_1900': 0, 'n_1970': 0}
+    col_min, col_max, next_future = None, None, None
+    for start in range(0, len(nanoseconds), block_size):
+        block = nanoseconds[start:start + block_size]
+        valid = block[block != NAT]
+        stats['n_missing'] += len(block) - len(valid)
+        if len(valid) == 0:
+            continue
+        future = valid[valid > now_ns]
+        if len(future):
+            stats['n_future'] += len(future)
+            next_future = int(future.min()) if next_future is None else min(next_future, int(future.min()))
+        stats['n_1900'] += int(np.count_nonzero(valid == NS_1900))
+        stats['n_1970'] += int(np.count_nonzero(valid == NS_1970))
+        block_min, block_max = int(valid.min()), int(valid.max())
+        col_min = block_min if col_min is None else min(col_min, block_min)
+        col_max = block_max if col_max is None else max(col_max, block_max)
+        block_days, remainder = np.divmod(valid, NS_PER_DAY)
+        low, high = block_min // NS_PER_DAY, block_max // NS_PER_DAY
+        if len(days) == 0:
+            days, first_day = np.zeros(high - low + 1, dtype='int64'), low
+        elif low < first_day or high >= first_day + len(days):
+            last_day = max(first_day + len(days) - 1, high)
+            days = np.pad(days, (first_day - min(first_day, low), last_day - (first_day + len(days) - 1)))
+            first_day = min(first_day, low)
+        days[low - first_day:high - first_day + 1] += np.bincount(block_days - low, minlength=high - low + 1)
+        hours += np.bincount(remainder // NS_PER_HOUR, minlength=24)
+
+    present = np.flatnonzero(days)
+    counts = days[present]
+    present = present + first_day
+    weekdays = np.bincount((present + 3) % 7, weights=counts, minlength=7).astype('int64')
+    year, month = civil_from_days(present)
+    years = pd.Series(counts).groupby(year).sum() if len(present) else pd.Series(dtype='int64')
+    stats.update({
+        'n_weekend': int(weekdays[5] + weekdays[6]),
+        'n_weekday': int(weekdays[:5].sum()),
+        'col_min': pd.Timestamp(col_min) if col_min is not None else pd.NaT,
+        'col_max': pd.Timestamp(col_max) if col_max is not None else pd.NaT,
+        'next_future': pd.Timestamp(next_future) if next_future is not None else pd.NaT,
+        'years': years.rename_axis('year').astype('int64'),
+        'months': np.bincount(month - 1, weights=counts, minlength=12).astype('int64'),
+        'weekdays': weekdays,
+        'hours': hours,
+    })
+    return stats
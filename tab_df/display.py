@@ -1,39 +1,240 @@
+import time
+
+import pandas as pd
 import streamlit as st
-from tab_df.logics import Dataset
+from common.cache import INGESTION_CACHE, content_hash
+from common.instrument import StageRecorder
+from common.pager import RowPager
+from common.progressive import start_progressive_load
+from common.scheduler import start_profiling
+from common.sketches import DEFAULT_ERROR
+from tab_df.logics import dataset_fingerprint, load_dataset
+
+# Seconds between two refreshes of the progressive estimates
+REFRESH_SECONDS = 0.5
+
+# Orders of the rows in the row browser (out-of-core datasets are browsed in file order only)
+ROW_ORDERS = ["File Order", "Sorted by Column", "Random Order (Seeded)"]
+
+# Number of rows per page of the row browser
+PAGE_SIZES = [10, 25, 50, 100, 500]
+
+# Select box label and title of the analysis of each kind of column (as in the tabs)
+COLUMN_TABS = {
+    'num': ("Select Numeric Column", "Numeric Column Analysis"),
+    'text': ("Select Text Column", "Text Column Summary"),
+    'date': ("Which datetime column do you want to explore?", "Date Column Summary"),
+}
 
-def display_tab_df_content(file_path):
+# Stages shown in the Performance panel of each tab (prefixes of the stage names)
+PERFORMANCE_STAGES = {
+    'df': ("Dataset.",),
+    'num': ("NumericColumn.", "NumericCorrelation."),
+    'text': ("TextColumn.",),
+    'date': ("DateColumn.",),
+}
+
+def hash_upload(file_path):
+    """Hash the upload only once per uploaded file (kept in st.session_state.file_hash)."""
+    file_key = (getattr(file_path, "id", None), getattr(file_path, "name", file_path))
+    if file_key[0] is None or st.session_state.get("file_key") != file_key:
+        st.session_state.file_key = file_key
+        st.session_state.file_hash = content_hash(file_path)
+    return st.session_state.file_hash
+
+
+def display_tab_df_content(file_path, chunksize=None, error=DEFAULT_ERROR, optimize_dtypes=False, disk_cache=None,
+                           parser='auto'):
     """
     Display the content of a DataFrame from an uploaded CSV file.
    
     Parameters:
         file_path (str): File path to uploaded CSV file.
+        chunksize (int): Number of rows per chunk to profile the file out-of-core (optional).
+        error (float): Relative error of the out-of-core sketches (optional).
+        optimize_dtypes (bool): Load the DataFrame with memory-optimized dtypes (optional).
+        disk_cache (common.disk_cache.DiskCache): Persistent cache of loaded files (optional).
+        parser (str): CSV parser backend: 'auto', 'pandas', 'pyarrow' or 'parallel' (optional).
     """
-    # Create an instance of the Dataset class
-    dataset = Dataset(file_path)
+    hash_upload(file_path)
+
+    # Get the Dataset for this upload from the ingestion cache (parsed and summarised once)
+    dataset = load_dataset(file_path, key=st.session_state.file_hash, chunksize=chunksize, error=error,
+                           optimize_dtypes=optimize_dtypes, disk_cache=disk_cache, parser=parser)
     st.session_state.dataset = dataset
    
-    # Compute summary and table information
-    st.session_state.dataset.load_data()
-   
     # Display summary in an expander container
     with st.expander("Summary"):
         # Display the results of get_summary() as a Streamlit Table
         st.table(st.session_state.dataset.generate_summary())
         # Display the results of table using Streamlit.write()
         st.write(st.session_state.dataset.table)
+
+    # Display the statistics of every column, computed at once
+    with st.expander("Column Overview"):
+        overview = dataset.profile_columns()
+        if overview is not None:
+            if overview.estimated:
+                st.caption("Unique counts, medians and modes are estimated from the out-of-core sketches.")
+            # Minimum, maximum and mode mix numbers, dates and text: shown as text
+            table = overview.to_frame()
+            for col in ['Min', 'Max', 'Mode']:
+                table[col] = [None if pd.isna(value) else str(value) for value in table[col]]
+            st.dataframe(table)
+
+    # Display the memory saved by the optimized dtypes
+    if dataset.memory_report is not None:
+        with st.expander("Memory Optimization"):
+            before = dataset.memory_report['Memory Before (KB, estimated)'].sum()
+            after = dataset.memory_report['Memory After (KB)'].sum()
+            st.write(f"Memory usage: {before / 1024:.2f} MB (estimated with default dtypes) -> {after / 1024:.2f} MB "
+                     f"({before / max(after, 1e-9):.1f}x smaller)")
+            st.write(dataset.memory_report)
    
-    # Display rows in an expander container
+    # Browse the rows page by page in an expander container
     with st.expander("Display Rows"):
-        # Slider to select the number of rows to display
-        num_rows_to_display = st.slider("Number of Rows to Display", 5, 50, 5)
-        # Radio button to choose the logic for displaying rows
-        display_logic = st.radio("Display Logic", ["Head (First Rows)", "Tail (Last Rows)", "Sample (Random Sample)"])
-       
-        st.write("Displayed Data:")
-        if display_logic == "Head (First Rows)":
-            st.dataframe(dataset.show_head(num_rows_to_display))
-        elif display_logic == "Tail (Last Rows)":
-            st.dataframe(st.session_state.dataset.show_tail(num_rows_to_display))
-        else:
-            st.dataframe(st.session_state.dataset.show_sample(num_rows_to_display))
+        pager = RowPager(dataset)
+        orders = list(ROW_ORDERS) if pager.can_reorder else ROW_ORDERS[:1]
+        display_logic = st.radio("Row Order", orders, horizontal=True)
+        sort_by, ascending, seed = None, True, None
+        if display_logic == "Sorted by Column":
+            left, right = st.columns(2)
+            sort_by = left.selectbox("Sort by", dataset.cols_list)
+            ascending = right.radio("Direction", ["Ascending", "Descending"], horizontal=True) == "Ascending"
+        elif display_logic == "Random Order (Seeded)":
+            seed = int(st.number_input("Random Seed", min_value=0, value=0, step=1))
+
+        left, right = st.columns(2)
+        page_size = left.selectbox("Rows per Page", PAGE_SIZES, index=1)
+        page = int(right.number_input("Page", min_value=1, max_value=pager.n_pages(page_size), value=1, step=1))
+        offset = (page - 1) * page_size
+        rows = pager.get_page(offset, page_size, sort_by=sort_by, ascending=ascending, seed=seed)
+
+        st.caption(f"Rows {min(offset + 1, pager.n_rows):,} to {offset + len(rows):,} of {pager.n_rows:,} "
+                   f"(the index is the position of the row in the file)")
+        st.dataframe(rows)
+
+
+def display_profiling_progress(dataset, approximate=False, error=DEFAULT_ERROR, processes=False, disk_cache=None):
+    """
+    Start the background profiling of every column of the dataset (once per dataset
+    and settings) and display its progress.
+
+    Parameters:
+        dataset (tab_df.logics.Dataset): Loaded dataset.
+        approximate (bool): Profile in approximate mode (optional).
+        error (float): Relative error of the sketches (optional).
+        processes (bool): Analyse the columns on worker processes (optional).
+        disk_cache (common.disk_cache.DiskCache): Persistent cache of the column analyses (optional).
+    """
+    scheduler = start_profiling(dataset, approximate=approximate, error=error, processes=processes, disk_cache=disk_cache)
+    st.progress(scheduler.progress)
+    st.caption(f"Column profiles computed in the background: {scheduler.n_done}/{scheduler.n_total}")
+
+
+def display_progressive_load(file_path, tabs, error=DEFAULT_ERROR, optimize_dtypes=False, disk_cache=None, parser='auto'):
+    """
+    Load the dataset in the background and meanwhile display estimates of the summary
+    tables of every tab, computed from a growing random sample of the rows with 95%
+    margins and refreshed in place as more of the file is read.
+
+    Parameters:
+        file_path (str or file-like): File path to uploaded CSV file.
+        tabs (dict): Streamlit containers of the 'df', 'num', 'text' and 'date' tabs.
+        error, optimize_dtypes, disk_cache, parser: Loading settings, see display_tab_df_content().
+
+    Returns:
+        bool: Whether estimates were displayed; the script should then run again to display
+        the exact results, found in the caches. False when the dataset is already loaded, or
+        was loaded in the background on an earlier run.
+    """
+    key = hash_upload(file_path)
+    fingerprint = dataset_fingerprint(key, optimize_dtypes=optimize_dtypes)
+    if fingerprint in INGESTION_CACHE or (disk_cache is not None and disk_cache.has_dataset(fingerprint)):
+        return False
+    progress = start_progressive_load(fingerprint, file_path, lambda: load_dataset(
+        file_path, key=key, error=error, optimize_dtypes=optimize_dtypes, disk_cache=disk_cache, parser=parser))
+    if progress is None:
+        # Loaded in the background on an earlier run: the exact load reads the caches (or parses again if evicted)
+        return False
+    estimate = progress.estimate()
+    while estimate is None and not progress.done:
+        time.sleep(0.05)
+        estimate = progress.estimate()
+    if estimate is None or progress.exception is not None:
+        return False
 
+    # Placeholders are created once and their content replaced by every refresh
+    with tabs['df']:
+        progress_bar = st.progress(0.0)
+        caption = st.empty()
+        placeholders = {'df': st.empty()}
+    selected = {}
+    for kind, (label, _) in COLUMN_TABS.items():
+        with tabs[kind]:
+            selected[kind] = st.selectbox(label, estimate.columns(kind))
+            placeholders[kind] = st.empty()
+
+    while True:
+        progress_bar.progress(estimate.fraction)
+        caption.caption(f"Estimated from a random sample of {estimate.k:,} of about {estimate.n_rows:,} rows "
+                        f"({estimate.fraction:.0%} of the file read); exact results replace them once loaded.")
+        with placeholders['df'].container():
+            with st.expander("Summary (estimated)", expanded=True):
+                st.table(estimate.dataset_summary())
+                st.write(estimate.columns_table())
+        for kind, (_, title) in COLUMN_TABS.items():
+            if selected[kind] in estimate.columns(kind):
+                summary, chart, frequent = estimate.column(kind, selected[kind])
+                with placeholders[kind].container():
+                    with st.expander(f"{title} (estimated)", expanded=True):
+                        st.table(summary)
+                        if chart is not None:
+                            st.altair_chart(chart, use_container_width=True)
+                        st.write("Top 20 Most Frequent Values:")
+                        st.table(frequent)
+        if progress.done:
+            return True
+        time.sleep(REFRESH_SECONDS)
+        estimate = progress.estimate() or estimate
+
+
+def get_recorder(enabled, trace_memory=True):
+    """StageRecorder of the session (kept across reruns), or None when the instrumentation is off."""
+    if not enabled:
+        return None
+    recorder = st.session_state.get("recorder")
+    if recorder is None or recorder.trace_memory != trace_memory:
+        recorder = StageRecorder(trace_memory=trace_memory)
+        st.session_state.recorder = recorder
+    return recorder
+
+
+def display_performance(recorder, tab):
+    """
+    Display the stages of a tab recorded by the session's StageRecorder in a
+    "Performance" expander: every run of a stage, the total time by stage, and a
+    download of the records as JSON lines. Analyses served from the caches are not
+    run again, so they are only recorded the first time they are computed.
+
+    Parameters:
+        recorder (common.instrument.StageRecorder): Recorder of the session.
+        tab (str): Key of the tab in PERFORMANCE_STAGES.
+    """
+    with st.expander("Performance"):
+        records = recorder.to_frame(PERFORMANCE_STAGES[tab])
+        if records.empty:
+            st.caption("No stage recorded yet: results served from the caches are not computed again.")
+            return
+        records['peak_mb'] = records['peak_bytes'] / 1024 ** 2
+        st.write("Stages (wall and CPU time in seconds, peak of the memory allocated in MB):")
+        st.dataframe(records[['stage', 'column', 'wall_seconds', 'cpu_seconds', 'peak_mb', 'rows', 'thread', 'error']])
+        st.write("Total time by stage:")
+        st.table(records.groupby('stage')[['wall_seconds', 'cpu_seconds']].sum()
+                 .sort_values('wall_seconds', ascending=False))
+        left, right = st.columns(2)
+        left.download_button("Download as JSON lines", recorder.to_json_lines(PERFORMANCE_STAGES[tab]),
+                             file_name=f"performance_{tab}.jsonl", mime="application/json", key=f"performance_{tab}")
+        if right.button("Clear the records", key=f"clear_performance_{tab}"):
+            recorder.clear()
+            st.experimental_rerun()
@@ -1,19 +1,47 @@
+import numpy as np
 import pandas as pd
 
+from common.cache import INGESTION_CACHE, content_hash
+from common.chunked import ChunkedProfile
+from common.duplicates import count_appended_duplicates, count_duplicates, row_hashes, same_hash_dtypes
+from common.incremental import append_rows, read_tail
+from common.instrument import df_rows, instrumented
+from common.ingest import SAMPLE_ROWS, is_text_dtype, load_csv, rescale_memory_report, working_copy_path
+from common.memory import column_memory_usage
+from common.overview import ProfileTable, profile_columns
+from common.pager import sample_positions
+from common.sketches import DEFAULT_ERROR
+
 class Dataset:
-    def __init__(self, file_path):
+    def __init__(self, file_path, chunksize=None, error=DEFAULT_ERROR, optimize_dtypes=False, parser='auto'):
         self.file_path = file_path
+        self.chunksize = chunksize
+        self.error = error
+        self.optimize_dtypes = optimize_dtypes
+        self.parser = parser
+        self.memory_report = None
+        self.memory = None
+        self.working_copy = None
+        self.content_hash = None
+        self.fingerprint = None
         self.df = None
+        self.profile = None
         self.cols_list = []
         self.n_rows = 0
         self.n_cols = 0
         self.n_duplicates = 0
+        self.row_hashes = None
         self.n_missing = 0
         self.n_num_cols = 0
         self.n_text_cols = 0
         self.table = None
+        self.overview = None
 
+    @instrumented("Dataset.load_data", rows=df_rows)
     def load_data(self):
+        if self.chunksize:
+            self.load_profile()
+            return
         self.load_df()
         if not self.is_df_empty():
             self.extract_columns()
@@ -24,59 +52,163 @@ class Dataset:
             self.identify_text()
             self.create_summary_table()
 
+    @instrumented("Dataset.load_appended", rows=df_rows)
+    def load_appended(self, previous, offset):
+        """
+        Load the dataset from the Dataset of the first offset bytes of its file, parsing
+        only the rows appended after them: the accumulators of an out-of-core profile
+        are updated with the new rows; an in-memory DataFrame gets them appended, and
+        its duplicate and missing value counts are updated from the new rows (only the
+        fingerprint groups holding a new row are verified).
+
+        Returns:
+            bool: False when the dataset must be loaded in full: the new rows change the type
+            of a column, or the optimized text dtypes were chosen on fewer rows than a full
+            load samples.
+        """
+        tail = read_tail(self.file_path, offset)
+        if self.chunksize:
+            self.profile = previous.profile.extend(self.file_path, tail)
+            self.load_profile()
+            return True
+        if self.optimize_dtypes and (previous.n_rows < SAMPLE_ROWS or previous.memory_report is None):
+            return False
+        self.df = append_rows(previous.df, tail, optimize_dtypes=self.optimize_dtypes)
+        if self.df is None:
+            return False
+        added = self.df.iloc[previous.n_rows:]
+        self.extract_columns()
+        self.calculate_dimensions()
+        hashes = getattr(previous, 'row_hashes', None)
+        if hashes is not None and same_hash_dtypes(previous.df.dtypes, self.df.dtypes):
+            self.row_hashes = np.concatenate([hashes, row_hashes(added)])
+            self.n_duplicates = previous.n_duplicates + count_appended_duplicates(self.df, self.row_hashes,
+                                                                                  previous.n_rows)
+        else:
+            self.find_duplicates()
+        self.n_missing = previous.n_missing + int(added.isnull().sum().sum())
+        self.identify_numeric()
+        self.identify_text()
+        self.create_summary_table()
+        if self.optimize_dtypes:
+            self.memory_report = rescale_memory_report(previous.memory_report, previous.n_rows, self.df)
+        return True
+
+    @instrumented("Dataset.load_df", rows=df_rows)
     def load_df(self):
         if self.df is None:
-            self.df = pd.read_csv(self.file_path)
+            # With a content hash, the CSV is parsed once into a shared memory-mapped working copy
+            key = None
+            if self.content_hash is not None:
+                key = f"{self.content_hash}_optimized" if self.optimize_dtypes else self.content_hash
+                self.working_copy = working_copy_path(key)
+            self.df, self.memory_report = load_csv(self.file_path, key=key, optimize_dtypes=self.optimize_dtypes,
+                                                     parser=self.parser)
+
+    @instrumented("Dataset.load_profile", rows=lambda self: self.n_rows)
+    def load_profile(self):
+        """Compute the dataset metadata out-of-core, reading the file chunk by chunk."""
+        if self.profile is None:
+            self.profile = ChunkedProfile(self.file_path, chunksize=self.chunksize, error=self.error).run()
+        self.cols_list = self.profile.cols_list
+        self.n_rows = self.profile.n_rows
+        self.n_cols = len(self.profile.cols_list)
+        self.n_duplicates = self.profile.n_duplicates
+        self.n_missing = self.profile.n_missing
+        self.n_num_cols = len(self.profile.num_cols)
+        self.n_text_cols = len(self.profile.text_cols)
+        self.table = pd.DataFrame({
+            'Column Name': self.cols_list,
+            'Data Type': [self.profile.dtypes[col] for col in self.cols_list],
+            'Memory Usage (KB)': [round(self.profile.memory[col] / 1024, 2) for col in self.cols_list]
+        })
 
     def is_df_empty(self):
         return self.df is None
 
+    @instrumented("Dataset.extract_columns")
     def extract_columns(self):
         if not self.is_df_empty():
             self.cols_list = self.df.columns.tolist()
 
+    @instrumented("Dataset.calculate_dimensions")
     def calculate_dimensions(self):
         if not self.is_df_empty():
             self.n_rows, self.n_cols = self.df.shape
 
+    @instrumented("Dataset.find_duplicates", rows=df_rows)
     def find_duplicates(self):
         if not self.is_df_empty():
-            self.n_duplicates = self.df.duplicated().sum()
+            # The row fingerprints are kept to count the duplicates of rows appended later
+            self.row_hashes = row_hashes(self.df)
+            self.n_duplicates = count_duplicates(self.df, hashes=self.row_hashes)
 
+    @instrumented("Dataset.find_missing", rows=df_rows)
     def find_missing(self):
         if not self.is_df_empty():
             self.n_missing = self.df.isnull().sum().sum()
 
+    @instrumented("Dataset.identify_numeric")
     def identify_numeric(self):
         if not self.is_df_empty():
             self.n_num_cols = len(self.df.select_dtypes(include=['number']).columns)
 
+    @instrumented("Dataset.identify_text")
     def identify_text(self):
         if not self.is_df_empty():
-            self.n_text_cols = len(self.df.select_dtypes(include=['object']).columns)
+            self.n_text_cols = sum(is_text_dtype(dtype) for dtype in self.df.dtypes)
 
     def show_head(self, n=5):
         if not self.is_df_empty():
             return self.df.head(n)
+        if self.profile is not None:
+            return self.profile.head.head(n)
 
     def show_tail(self, n=5):
         if not self.is_df_empty():
             return self.df.tail(n)
+        if self.profile is not None:
+            return self.profile.tail.tail(n)
 
-    def show_sample(self, n=5):
+    def show_sample(self, n=5, seed=0):
         if not self.is_df_empty():
-            return self.df.sample(n)
+            # Draws n positions only (reproducible for a seed) instead of shuffling the whole frame
+            return self.df.iloc[sample_positions(len(self.df), n, seed)]
+        if self.profile is not None:
+            return self.profile.sample.head(n)
+
+    def column_memory(self):
+        """Estimated memory usage per column, computed once per dataset (see column_memory_usage())."""
+        if self.memory is None and not self.is_df_empty():
+            self.memory = column_memory_usage(self.df)
+        return self.memory
 
+    @instrumented("Dataset.create_summary_table")
     def create_summary_table(self):
         if not self.is_df_empty():
-            col_info = []
-            for col in self.df.columns:
-                col_info.append({
-                    'Column Name': col,
-                    'Data Type': str(self.df[col].dtype),
-                    'Memory Usage (KB)': round(self.df[col].memory_usage(deep=True) / 1024, 2)
-                })
-            self.table = pd.DataFrame(col_info)
+            memory = self.column_memory()
+            self.table = pd.DataFrame({
+                'Column Name': self.df.columns,
+                'Data Type': [str(dtype) for dtype in self.df.dtypes],
+                'Memory Usage (KB)': (memory['bytes'].to_numpy() / 1024).round(2),
+                'Margin 95% (± KB)': (memory['margin'].to_numpy() / 1024).round(2)
+            })
+
+    @instrumented("Dataset.profile_columns", rows=lambda self: self.n_rows)
+    def profile_columns(self):
+        """Statistics of every column at once as a common.overview.ProfileTable, computed once per dataset."""
+        if self.overview is None:
+            if not self.is_df_empty():
+                self.overview = profile_columns(self.df)
+            elif self.profile is not None:
+                self.overview = ProfileTable.from_profile(self.profile)
+        return self.overview
+
+    def memory_bytes(self):
+        if self.is_df_empty():
+            return 0
+        hashes = self.row_hashes.nbytes if self.row_hashes is not None else 0
+        return int(self.column_memory()['bytes'].sum()) + hashes
 
     def generate_summary(self):
         summary = {
@@ -95,3 +227,60 @@ class Dataset:
         }
         summary_df = pd.DataFrame(summary)
         return summary_df
+
+
+
+def dataset_fingerprint(key, chunksize=None, error=DEFAULT_ERROR, optimize_dtypes=False):
+    """Fingerprint of a loaded dataset: content hash of the file and the loading options changing the results."""
+    if chunksize:
+        return f"{key}:chunks={chunksize}:error={error}"
+    return f"{key}:optimized" if optimize_dtypes else key
+
+
+def load_dataset(file_path, key=None, cache=INGESTION_CACHE, chunksize=None, error=DEFAULT_ERROR,
+                 optimize_dtypes=False, disk_cache=None, parser='auto'):
+    """
+    Return the loaded Dataset for a CSV file, parsing it only once per file content.
+
+    Parameters:
+        file_path (str or file-like): File path to uploaded CSV file.
+        key (str): Precomputed content hash of the file (optional).
+        cache (IngestionCache): Cache holding the parsed datasets.
+        chunksize (int): Number of rows per chunk to profile the file out-of-core (optional).
+        error (float): Relative error of the out-of-core sketches (optional).
+        optimize_dtypes (bool): Load the DataFrame with downcast numbers and categorical/Arrow text (optional).
+        disk_cache (common.disk_cache.DiskCache): Persistent cache reloading the dataset without parsing
+            the file when it was loaded before, even by another session, and only parsing the new
+            rows when the file is a cached file with rows appended (optional).
+        parser (str): CSV parser backend, see common.parsers.parse_csv(); every backend gives the
+            same DataFrame, so it is not part of the cache key (optional).
+
+    Returns:
+        Dataset: Dataset with its DataFrame and metadata already computed.
+    """
+    if key is None:
+        key = content_hash(file_path)
+
+    cache_key = dataset_fingerprint(key, chunksize, error, optimize_dtypes)
+
+    def build():
+        previous = None
+        if disk_cache is not None:
+            dataset = disk_cache.load_dataset(cache_key, file_path)
+            if dataset is not None:
+                return dataset
+            # A cached file re-uploaded with rows appended: only the new rows are parsed
+            prefix = disk_cache.find_prefix(
+                file_path, lambda prefix_key: dataset_fingerprint(prefix_key, chunksize, error, optimize_dtypes))
+            if prefix is not None:
+                previous = disk_cache.load_dataset(prefix[0], file_path)
+        dataset = Dataset(file_path, chunksize=chunksize, error=error, optimize_dtypes=optimize_dtypes, parser=parser)
+        dataset.content_hash = key
+        dataset.fingerprint = cache_key
+        if previous is None or not dataset.load_appended(previous, prefix[1]):
+            dataset.load_data()
+        if disk_cache is not None:
+            disk_cache.save_dataset(cache_key, dataset)
+        return dataset
+
+    return cache.get_or_create(cache_key, build, size_of=Dataset.memory_bytes)
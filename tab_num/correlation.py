@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+import altair as alt
+
+from common.accumulators import CoMomentAccumulator
+from common.ingest import read_csv_chunks
+from common.instrument import instrumented
+from common.quantiles import KLLSketch
+from common.sketches import DEFAULT_ERROR
+from tab_num.stats import to_numpy_values
+
+# Memory budget of a block of rows of every numeric column (the block and the temporaries of its products)
+CORRELATION_BLOCK_BYTES = 64 * 1024 ** 2
+
+# Memory budget of the exact ranks of the numeric columns (for Spearman's correlation);
+# larger datasets are ranked with a KLL sketch of each column
+EXACT_RANK_BYTES = 1024 ** 3
+
+# Columns shown at once in a heatmap (the chart holds one row per pair of them)
+MAX_HEATMAP_COLUMNS = 50
+
+# Matrices of a NumericCorrelation: (title, attribute, color scale domain)
+CORRELATION_MATRICES = [
+    ("Pearson", 'pearson', [-1, 1]),
+    ("Spearman", 'spearman', [-1, 1]),
+    ("Pairwise Missingness", 'missing', [0, 1]),
+]
+
+
+def block_rows(n_cols, block_bytes=CORRELATION_BLOCK_BYTES):
+    """Rows per block so that the float64 block of n_cols columns and its temporaries fit in block_bytes."""
+    return max(block_bytes // (8 * max(n_cols, 1) * 4), 1_000)
+
+
+class Ranker:
+    """
+    Mid-ranks of values among the values of a column, as fractions (the weight of the
+    values below plus half the weight of the equal ones), from the weighted items of
+    the KLL sketch of the column: ranks within the rank error of the sketch.
+    """
+
+    def __init__(self, items, weights):
+        self.items = items
+        self.cumulative = np.concatenate(([0.0], np.cumsum(weights)))
+
+    @classmethod
+    def from_sketch(cls, sketch):
+        return cls(*sketch.weighted_items())
+
+    def ranks(self, values):
+        """Fraction mid-ranks of values (NaN stays NaN)."""
+        total = max(self.cumulative[-1], 1.0)
+        below = self.cumulative[np.searchsorted(self.items, values, side='left')]
+        upto = self.cumulative[np.searchsorted(self.items, values, side='right')]
+        return np.where(np.isnan(values), np.nan, (below + upto) / (2 * total))
+
+
+def fraction_ranks(serie):
+    """Exact fraction mid-ranks of a column, ties averaged as by Series.rank() (on the same scale as Ranker)."""
+    return (serie.rank() - 0.5) / max(serie.count(), 1)
+
+
+def frame_blocks(df, cols, rows):
+    """Float64 blocks of rows of the columns of a DataFrame (missing values as NaN)."""
+    series = [df[col] for col in cols]
+    for start in range(0, len(df), rows):
+        yield np.column_stack([to_numpy_values(serie.iloc[start:start + rows]).astype('float64', copy=False)
+                               for serie in series])
+
+
+def file_blocks(profile, cols, rows):
+    """Float64 blocks of rows of numeric columns read again from the file of an out-of-core profile."""
+    for chunk in read_csv_chunks(profile.file_path, rows, usecols=cols):
+        yield np.column_stack([pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+                               for col in cols])
+
+
+def ranked_blocks(blocks, rankers):
+    """Blocks of values paired with the blocks of their ranks given by rankers (one per column)."""
+    for block in blocks:
+        yield block, np.column_stack([ranker.ranks(block[:, j]) for j, ranker in enumerate(rankers)])
+
+
+def compute_correlations(blocks, n_cols, shift=None):
+    """
+    Fold (values, ranks) blocks of rows into the co-moments of the values and of their ranks.
+
+    Returns:
+        tuple: (CoMomentAccumulator of the values, CoMomentAccumulator of the ranks).
+    """
+    values = CoMomentAccumulator(n_cols, shift)
+    ranks = CoMomentAccumulator(n_cols, np.full(n_cols, 0.5))
+    for value_block, rank_block in blocks:
+        values.update(value_block)
+        ranks.update(rank_block)
+    return values, ranks
+
+
+class NumericCorrelation:
+    """
+    Pearson and Spearman correlation matrices and pairwise missingness of the numeric
+    columns of a dataset, computed in one blockwise pass with CoMomentAccumulator:
+    memory is bounded by the block of rows and the O(columns²) co-moments, whatever
+    the number of rows. Correlations are pairwise-complete (each pair over the rows
+    where both columns are present). Spearman's correlation is Pearson's on the ranks
+    of each column among its own values: exact in memory (within EXACT_RANK_BYTES),
+    estimated from KLL sketches of the columns otherwise and out-of-core, where the
+    file is read again for the numeric columns only.
+    """
+
+    def __init__(self, df=None, profile=None, error=DEFAULT_ERROR, block_bytes=CORRELATION_BLOCK_BYTES):
+        self.df = df
+        self.profile = profile
+        self.error = error
+        self.block_bytes = block_bytes
+        self.estimated = set()
+        self.cols_list = []
+        self.n_rows = 0
+        self.pearson = None
+        self.spearman = None
+        self.missing = None
+        self.n_pairs = None
+
+    def find_num_cols(self):
+        """Find numeric columns in the dataset."""
+        if self.df is None:
+            self.cols_list = list(self.profile.num_cols)
+            return
+        self.cols_list = self.df.select_dtypes(include=['number']).columns.tolist()
+
+    def sketch_rankers(self):
+        """Ranker of every numeric column from its KLL sketch (the one of the out-of-core profile, if any)."""
+        if self.df is None:
+            sketches = [self.profile.numeric[col].quantiles for col in self.cols_list]
+        else:
+            sketches = [KLLSketch.from_error(self.error).update(to_numpy_values(self.df[col]))
+                        for col in self.cols_list]
+        if not all(sketch.exact for sketch in sketches):
+            self.estimated.add('spearman')
+        return [Ranker.from_sketch(sketch) for sketch in sketches]
+
+    @instrumented("NumericCorrelation.set_data", rows=lambda self: self.n_rows)
+    def set_data(self):
+        """Find the numeric columns and compute every matrix."""
+        self.find_num_cols()
+        if not self.cols_list:
+            return
+        rows = block_rows(len(self.cols_list), self.block_bytes)
+        shift = None
+        if self.df is None:
+            # The means of the profile are known before reading: shift the values by them
+            shift = np.nan_to_num([self.profile.numeric[col].col_mean for col in self.cols_list])
+            blocks = ranked_blocks(file_blocks(self.profile, self.cols_list, rows), self.sketch_rankers())
+        elif len(self.df) * len(self.cols_list) * 8 <= EXACT_RANK_BYTES:
+            ranks = pd.DataFrame({col: fraction_ranks(self.df[col]).to_numpy() for col in self.cols_list})
+            blocks = zip(frame_blocks(self.df, self.cols_list, rows), frame_blocks(ranks, self.cols_list, rows))
+        else:
+            blocks = ranked_blocks(frame_blocks(self.df, self.cols_list, rows), self.sketch_rankers())
+        values, ranks = compute_correlations(blocks, len(self.cols_list), shift)
+        self.n_rows = values.n_rows
+        matrix = lambda array: pd.DataFrame(array, index=self.cols_list, columns=self.cols_list)
+        self.pearson = matrix(values.correlation())
+        self.spearman = matrix(ranks.correlation())
+        self.missing = matrix(values.missingness())
+        self.n_pairs = matrix(values.n.astype('int64'))
+
+    def top_pairs(self, method='pearson', n=20):
+        """The n pairs of distinct columns with the strongest correlation (largest absolute value)."""
+        matrix = getattr(self, method)
+        if matrix is None or len(matrix) < 2:
+            return pd.DataFrame(columns=['column 1', 'column 2', method, 'rows'])
+        upper = np.triu_indices(len(matrix), k=1)
+        pairs = pd.DataFrame({
+            'column 1': matrix.index[upper[0]],
+            'column 2': matrix.columns[upper[1]],
+            method: matrix.to_numpy()[upper],
+            'rows': self.n_pairs.to_numpy()[upper],
+        }).dropna(subset=[method])
+        return pairs.iloc[np.argsort(-pairs[method].abs().to_numpy(), kind='stable')[:n]].reset_index(drop=True)
+
+    def heatmap(self, method='pearson', columns=None):
+        """
+        Heatmap of a matrix for some columns (at most MAX_HEATMAP_COLUMNS): the chart
+        holds one row per pair of these columns, never the values of the dataset.
+        """
+        title, _, domain = next(matrix for matrix in CORRELATION_MATRICES if matrix[1] == method)
+        columns = list(columns if columns is not None else self.cols_list)[:MAX_HEATMAP_COLUMNS]
+        matrix = getattr(self, method).loc[columns, columns]
+        cells = matrix.rename_axis('row').reset_index().melt(id_vars='row', var_name='column', value_name='value')
+        cells['rows'] = self.n_pairs.loc[columns, columns].to_numpy().ravel()
+        scale = alt.Scale(domain=domain, scheme='redblue' if domain[0] < 0 else 'greys', reverse=domain[0] < 0)
+        return alt.Chart(cells).mark_rect().encode(
+            x=alt.X('column:N', sort=columns, title=None),
+            y=alt.Y('row:N', sort=columns, title=None),
+            color=alt.Color('value:Q', scale=scale, title=title),
+            tooltip=['row', 'column', alt.Tooltip('value:Q', format='.3f'), 'rows'],
+        )
@@ -1,8 +1,13 @@
 import streamlit as st
 
+from common.disk_cache import analyze_cached
+from common.instrument import stage
+from common.lazy import COMPUTATIONS, attach
+from common.sketches import DEFAULT_ERROR
+from tab_num.correlation import CORRELATION_MATRICES, MAX_HEATMAP_COLUMNS, NumericCorrelation
 from tab_num.logics import NumericColumn
 
-def display_tab_num_content(file_path=None, df=None):
+def display_tab_num_content(file_path=None, df=None, profile=None, approximate=False, error=DEFAULT_ERROR, key=None, disk_cache=None):
     """
     --------------------
     Description
@@ -14,12 +19,18 @@ def display_tab_num_content(file_path=None, df=None):
     - the results of tab_num.logics.NumericColumn.get_summary() as a Streamlit Table
     - the graph from tab_num.logics.NumericColumn.histogram using Streamlit.altair_chart()
     - the results of tab_num.logics.NumericColumn.frequent using Streamlit.write
+    Finally it will display the correlations of the numeric columns with display_correlations().
  
     --------------------
     Parameters
     --------------------
     -> file_path (str): File path to uploaded CSV file (optional)
     -> df (pd.DataFrame): Loaded dataframe (optional)
+    -> profile (common.chunked.ChunkedProfile): Out-of-core profile used when no dataframe is loaded (optional)
+    -> approximate (bool): Estimate the unique count and frequent values with sketches (optional)
+    -> error (float): Relative error of the sketches in approximate mode (optional)
+    -> key (str): Fingerprint of the loaded dataset; when given, the column list and each column analysis are computed once and then served from common.lazy.COMPUTATIONS (optional)
+    -> disk_cache (common.disk_cache.DiskCache): Persistent cache of the column analyses, used with key (optional)
 
     --------------------
     Returns
@@ -28,31 +39,111 @@ def display_tab_num_content(file_path=None, df=None):
 
     """
 
-    if file_path or (df is not None):
-        # Instantiate DateColumn in Streamlit session state
-        if file_path:
-            st.session_state.num_column = NumericColumn(file_path=file_path)
-        else:
-            st.session_state.num_column = NumericColumn(df=df)
-            
-    # Find datetime columns
-    st.session_state.num_column.find_num_cols()
+    params = {'approximate': approximate, 'error': error}
+    if key is not None:
+        # Find numeric columns once per dataset
+        st.session_state.num_column = COMPUTATIONS.get(key, 'num_cols', params=params, compute=lambda: NumericColumn.finder(df, profile, **params))
+    else:
+        if file_path or (df is not None) or (profile is not None):
+            # Instantiate DateColumn in Streamlit session state
+            if file_path:
+                st.session_state.num_column = NumericColumn(file_path=file_path, **params)
+            else:
+                st.session_state.num_column = NumericColumn(df=df, profile=profile, **params)
+
+        # Find datetime columns
+        st.session_state.num_column.find_num_cols()
 
     # Display a Streamlit select box with the list of numeric columns found
     selected_numeric_column = st.selectbox("Select Numeric Column", st.session_state.num_column.cols_list)
 
     # Once the user selects a numeric column, compute and display the information
     if selected_numeric_column:
-        st.session_state.num_column.set_data(selected_numeric_column)
+        if key is not None:
+            # Analyse the selected column only the first time it is selected
+            finder = attach(st.session_state.num_column, df, profile)
+            st.session_state.num_column = COMPUTATIONS.get(key, 'num', selected_numeric_column, params,
+                                                           lambda: analyze_cached(finder, selected_numeric_column, key, 'num', params, disk_cache))
+        else:
+            st.session_state.num_column.set_data(selected_numeric_column)
 
         # Display results in a Streamlit Expander container
         with st.expander("Numeric Column Analysis"):
             # Display results of get_summary() as a Streamlit Table
             st.table(st.session_state.num_column.get_summary())
 
-            # Display graph from histogram using Streamlit.altair_chart()
-            st.altair_chart(st.session_state.num_column.histogram, use_container_width=True)
+            # Display graph from histogram using Streamlit.altair_chart() (needs the column data, not available out-of-core)
+            if st.session_state.num_column.histogram is not None:
+                with stage("NumericColumn.altair_chart", column=selected_numeric_column):
+                    st.altair_chart(st.session_state.num_column.histogram, use_container_width=True)
 
             # Display results of frequent using Streamlit.write
             st.write("Top 20 Most Frequent Values:")
             st.write(st.session_state.num_column.frequent)
+
+    display_correlations(df, profile, error, key, disk_cache)
+
+
+def display_correlations(df=None, profile=None, error=DEFAULT_ERROR, key=None, disk_cache=None):
+    """
+    --------------------
+    Description
+    --------------------
+    -> display_correlations (function): Function that will display a Streamlit Expander container with the correlations of the numeric columns, once the user asks for them (the computation reads every numeric value).
+    It will instantiate tab_num.correlation.NumericCorrelation and call its tab_num.correlation.NumericCorrelation.set_data() method, then display:
+    - a Streamlit radio to choose the matrix (Pearson, Spearman or pairwise missingness) and a multiselect of the columns to show
+    - the graph from tab_num.correlation.NumericCorrelation.heatmap() using Streamlit.altair_chart() (one cell per pair of selected columns)
+    - the results of tab_num.correlation.NumericCorrelation.top_pairs() as a Streamlit DataFrame
+
+    --------------------
+    Parameters
+    --------------------
+    -> df (pd.DataFrame): Loaded dataframe (optional)
+    -> profile (common.chunked.ChunkedProfile): Out-of-core profile used when no dataframe is loaded (optional)
+    -> error (float): Relative error of the sketches ranking the values for Spearman's correlation when they cannot be ranked exactly (optional)
+    -> key (str): Fingerprint of the loaded dataset; when given, the correlations are computed once and then served from common.lazy.COMPUTATIONS (optional)
+    -> disk_cache (common.disk_cache.DiskCache): Persistent cache of the correlations, used with key (optional)
+
+    --------------------
+    Returns
+    --------------------
+    -> None
+
+    """
+
+    with st.expander("Correlations"):
+        if not st.checkbox("Compute the correlations of the numeric columns", key="num_correlations"):
+            return
+
+        def compute():
+            correlation = NumericCorrelation(df=df, profile=profile, error=error)
+            correlation.set_data()
+            return correlation
+
+        params = {'error': error}
+        if key is not None:
+            # Compute the matrices once per dataset
+            correlation = COMPUTATIONS.get(key, 'correlation', params=params,
+                                           compute=lambda: analyze_cached(NumericCorrelation(df=df, profile=profile), None, key, 'correlation', params, disk_cache, compute))
+        else:
+            correlation = compute()
+
+        if len(correlation.cols_list) < 2:
+            st.write("At least two numeric columns are needed.")
+            return
+
+        titles = {title: method for title, method, _ in CORRELATION_MATRICES}
+        title = st.radio("Matrix", list(titles), horizontal=True)
+        method = titles[title]
+        if method in correlation.estimated:
+            st.caption("Estimated from sketches of the columns")
+        columns = st.multiselect(f"Columns (at most {MAX_HEATMAP_COLUMNS})", correlation.cols_list,
+                                 default=correlation.cols_list[:MAX_HEATMAP_COLUMNS])
+        if len(columns) > MAX_HEATMAP_COLUMNS:
+            st.caption(f"Only the first {MAX_HEATMAP_COLUMNS} columns are shown")
+        if columns:
+            with stage("NumericCorrelation.altair_chart"):
+                st.altair_chart(correlation.heatmap(method, columns), use_container_width=True)
+
+        st.write("Strongest Correlations:" if method != 'missing' else "Pairs Most Often Incomplete:")
+        st.dataframe(correlation.top_pairs(method))
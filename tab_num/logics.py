@@ -1,14 +1,29 @@
+import numpy as np
 import pandas as pd
 import altair as alt
 
+from common.charts import MAX_DISCRETE_VALUES, histogram_table, value_count_table
+from common.ingest import read_csv
+from common.instrument import column_name, df_rows, instrumented, serie_rows
+from common.quantiles import DEFAULT_PERCENTILES
+from common.sketches import DEFAULT_ERROR
+from tab_num.stats import N_FREQUENT, compute_approximate_numeric_stats, compute_numeric_stats, to_numpy_values
+
 class NumericColumn:
     """
     Class to analyze a numeric column in a DataFrame.
     """
 
-    def __init__(self, file_path=None, df=None):
+    def __init__(self, file_path=None, df=None, profile=None, approximate=False, error=DEFAULT_ERROR,
+                 percentiles=DEFAULT_PERCENTILES):
         self.file_path = file_path
         self.df = df
+        self.profile = profile
+        self.approximate = approximate
+        self.error = error
+        self.percentiles = percentiles
+        self.quantile_error = None
+        self.estimated = set()
         self.cols_list = []
         self.serie = None
         self.n_unique = None
@@ -18,33 +33,86 @@ class NumericColumn:
         self.col_min = None
         self.col_max = None
         self.col_median = None
+        self.quantiles = {}
         self.n_zeros = None
         self.n_negatives = None
-        self.histogram = alt.Chart()
+        self.stats = None
+        self.histogram = None
         self.frequent = pd.DataFrame(columns=['value', 'occurrence', 'percentage'])
 
+    @instrumented("NumericColumn.find_num_cols", rows=df_rows)
     def find_num_cols(self):
         """Find numeric columns in the dataset."""
+        if self.df is None and self.profile is not None:
+            self.cols_list = list(self.profile.num_cols)
+            return
         if self.df is None:
-            self.df = pd.read_csv(self.file_path)
+            self.df = read_csv(self.file_path)[0]
         self.cols_list = self.df.select_dtypes(include=['number']).columns.tolist()
 
+    @classmethod
+    def finder(cls, df=None, profile=None, approximate=False, error=DEFAULT_ERROR):
+        """Return a NumericColumn with the numeric columns of the dataset found, to analyze() them."""
+        column = cls(df=df, profile=profile, approximate=approximate, error=error)
+        column.find_num_cols()
+        return column
+
+    def analyze(self, col_name):
+        """Return a new NumericColumn holding the analysis of col_name, leaving this one unchanged."""
+        column = NumericColumn(df=self.df, profile=self.profile, approximate=self.approximate, error=self.error,
+                               percentiles=self.percentiles)
+        column.cols_list = self.cols_list
+        column.set_data(col_name)
+        return column
+
+    @instrumented("NumericColumn.set_data", rows=serie_rows, column=column_name)
     def set_data(self, col_name):
         """Set data for analysis by selecting a column and computing stats."""
+        if self.df is None and self.profile is not None:
+            self.set_accumulator(self.profile.numeric[col_name])
+            return
         self.serie = self.df[col_name]
         self.convert_serie_to_num()
-        self.is_serie_none()
-        self.set_unique()
-        self.set_missing()
-        self.set_zeros()
-        self.set_negatives()
-        self.set_mean()
-        self.set_std()
-        self.set_min()
-        self.set_max()
-        self.set_median()
+        self.set_stats()
         self.set_histogram()
         self.set_frequent()
+        # The sorted copy of the column is only needed to build the histogram
+        if self.stats is not None:
+            self.stats.pop('sorted', None)
+
+    @instrumented("NumericColumn.set_stats", rows=serie_rows)
+    def set_stats(self):
+        """Compute all the summary statistics in one pass with tab_num.stats.compute_numeric_stats()."""
+        if not self.is_serie_none():
+            if self.approximate:
+                self.stats = compute_approximate_numeric_stats(to_numpy_values(self.serie), error=self.error,
+                                                               percentiles=self.percentiles)
+                self.estimated = self.stats['estimated']
+            else:
+                self.stats = compute_numeric_stats(to_numpy_values(self.serie), percentiles=self.percentiles)
+            for name in ['n_unique', 'n_missing', 'n_zeros', 'n_negatives', 'col_mean',
+                         'col_std', 'col_min', 'col_max', 'col_median', 'quantiles']:
+                setattr(self, name, self.stats[name])
+
+    def set_accumulator(self, accumulator):
+        """Set the stats from an out-of-core NumericAccumulator (median and percentiles from its KLL sketch)."""
+        self.error = accumulator.error
+        self.n_unique = accumulator.distinct.estimate()
+        self.estimated = {'n_unique', 'frequent'}
+        if not accumulator.quantiles.exact:
+            self.estimated.add('quantiles')
+            self.quantile_error = accumulator.quantiles.error
+        quantiles = accumulator.quantiles.quantiles(sorted(set(self.percentiles) | {50}))
+        self.col_median = quantiles[50]
+        self.quantiles = {p: quantiles[p] for p in self.percentiles}
+        self.set_frequent_sketch(accumulator.frequent, accumulator.n_rows)
+        self.n_missing = accumulator.n_missing
+        self.n_zeros = accumulator.n_zeros
+        self.n_negatives = accumulator.n_negatives
+        self.col_mean = accumulator.col_mean
+        self.col_std = accumulator.col_std
+        self.col_min = accumulator.col_min
+        self.col_max = accumulator.col_max
 
     def convert_serie_to_num(self):
         """Convert the column to numeric, handling errors."""
@@ -54,73 +122,71 @@ class NumericColumn:
         """Check if the series is empty or None."""
         return self.serie is None or self.serie.empty
 
-    def set_unique(self):
-        """Count unique values in the series."""
-        if not self.is_serie_none():
-            self.n_unique = self.serie.nunique()
-
-    def set_missing(self):
-        """Count missing values in the series."""
-        if not self.is_serie_none():
-            self.n_missing = self.serie.isnull().sum()
-
-    def set_zeros(self):
-        """Count occurrences of 0 in the series."""
-        if not self.is_serie_none():
-            self.n_zeros = (self.serie == 0).sum()
-
-    def set_negatives(self):
-        """Count negative values in the series."""
-        if not self.is_serie_none():
-            self.n_negatives = (self.serie < 0).sum()
-
-    def set_mean(self):
-        """Calculate the mean of the series."""
-        if not self.is_serie_none():
-            self.col_mean = self.serie.mean()
-
-    def set_std(self):
-        """Calculate the standard deviation of the series."""
-        if not self.is_serie_none():
-            self.col_std = self.serie.std()
-
-    def set_min(self):
-        """Find the minimum value of the series."""
-        if not self.is_serie_none():
-            self.col_min = self.serie.min()
-
-    def set_max(self):
-        """Find the maximum value of the series."""
-        if not self.is_serie_none():
-            self.col_max = self.serie.max()
-
-    def set_median(self):
-        """Find the median value of the series."""
-        if not self.is_serie_none():
-            self.col_median = self.serie.median()
-
+    @instrumented("NumericColumn.set_histogram", rows=serie_rows)
     def set_histogram(self):
-        """Create a histogram for the series values."""
+        """Create a histogram for the series values, aggregated into bins before charting."""
         if not self.is_serie_none():
-            chart = alt.Chart(self.serie.reset_index()).mark_bar().encode(
-                alt.X(f"{self.serie.name}:O", title="Values", sort=alt.EncodingSortField(field="count", order="descending")),
-                alt.Y("count():Q", title="Count")
-            ).properties(title=f"Histogram Plot: Distribution of Values in {self.serie.name}")
-            self.histogram = chart
-
+            stats = self.stats or {}
+            if 'sorted' in stats:
+                values, is_sorted = stats['sorted'], True
+            else:
+                values, is_sorted = to_numpy_values(self.serie), False
+                if values.dtype.kind == 'f':
+                    values = values[~np.isnan(values)]
+            n_unique = self.n_unique if self.n_unique is not None else len(np.unique(values))
+
+            if n_unique <= MAX_DISCRETE_VALUES:
+                # Few distinct values: one bar per value
+                if 'frequent' in stats and stats['frequent'].exact:
+                    # Approximate mode: the Space-Saving summary holds the exact count of every value
+                    table = stats['frequent'].counts.sort_index().rename_axis('value').reset_index(name='count')
+                else:
+                    table = value_count_table(values if is_sorted else np.sort(values))
+                chart = alt.Chart(table).mark_bar().encode(
+                    alt.X("value:O", title="Values", sort=alt.EncodingSortField(field="count", order="descending")),
+                    alt.Y("count:Q", title="Count")
+                )
+            else:
+                chart = alt.Chart(histogram_table(values, is_sorted=is_sorted)).mark_bar().encode(
+                    alt.X("bin_start:Q", bin="binned", title="Values"),
+                    alt.X2("bin_end:Q"),
+                    alt.Y("count:Q", title="Count")
+                )
+            self.histogram = chart.properties(title=f"Histogram Plot: Distribution of Values in {self.serie.name}")
+
+    @instrumented("NumericColumn.set_frequent", rows=serie_rows)
     def set_frequent(self, end=20):
         """Get the most frequent values in the series."""
         if not self.is_serie_none():
-            frequent_values = self.serie.value_counts().head(end).reset_index()
-            frequent_values.columns = ['value', 'occurrence']
+            if self.stats is not None and end <= N_FREQUENT:
+                frequent_values = pd.DataFrame({
+                    'value': self.stats['frequent_values'][:end],
+                    'occurrence': self.stats['frequent_counts'][:end]
+                })
+            else:
+                frequent_values = self.serie.value_counts().head(end).reset_index()
+                frequent_values.columns = ['value', 'occurrence']
             frequent_values['percentage'] = (
                 (frequent_values['occurrence'] / len(self.serie)) * 100
             ).round(2).astype(str)
+            if 'frequent' in self.estimated:
+                # Occurrences are upper bounds, over-estimated by at most max_error
+                frequent_values['max_error'] = self.stats['frequent'].max_error
 
             self.frequent = frequent_values
 
+    def set_frequent_sketch(self, sketch, n_rows, end=20):
+        """Get the most frequent values from a Space-Saving summary (occurrences are estimates)."""
+        top = sketch.top(end)
+        self.frequent = pd.DataFrame({
+            'value': top.index.to_numpy(),
+            'occurrence': top.to_numpy(),
+            'percentage': ((top.to_numpy() / max(n_rows, 1)) * 100).round(2).astype(str),
+            'max_error': sketch.max_error
+        })
+
     def get_summary(self):
-        """Generate a summary of the series statistics."""
+        """Generate a summary of the series statistics (estimated values are flagged)."""
         summary_df = pd.DataFrame({
             'Description': [
                 'Number of Unique Values', 
@@ -131,7 +197,8 @@ class NumericColumn:
                 'Standard Deviation',    
                 'Minimum Value',  
                 'Maximum Value', 
-                'Median Value'
+                'Median Value',
+                *[f"Percentile p{p}" for p in self.quantiles]
             ],
             'Value': [
                 self.n_unique, 
@@ -142,7 +209,14 @@ class NumericColumn:
                 self.col_std, 
                 self.col_min, 
                 self.col_max, 
-                self.col_median
+                self.col_median,
+                *self.quantiles.values()
             ]
         })
+        if 'n_unique' in self.estimated:
+            summary_df.loc[0, 'Description'] += f" (estimated, ±{self.error:.1%})"
+        if 'quantiles' in self.estimated:
+            # KLL sketch: each value lies between the exact percentiles at ± quantile_error of the rank
+            rows = summary_df.index >= 8
+            summary_df.loc[rows, 'Description'] += f" (estimated, rank ±{self.quantile_error:.1%})"
         return summary_df
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+from common.quantiles import DEFAULT_PERCENTILES, exact_quantiles
+from common.sketches import DEFAULT_ERROR, HyperLogLog, SpaceSaving
+
+# Number of most frequent values kept by compute_numeric_stats()
+N_FREQUENT = 20
+
+# Number of values hashed at once into the sketches in approximate mode
+SKETCH_BLOCK_SIZE = 1_000_000
+
+
+def to_numpy_values(serie):
+    """Return the values of a numeric Series as a NumPy array (without copy when possible)."""
+    if pd.api.types.is_extension_array_dtype(serie.dtype):
+        return serie.to_numpy(dtype='float64', na_value=np.nan)
+    return serie.to_numpy()
+
+
+def compute_numeric_stats(values, n_frequent=N_FREQUENT, percentiles=DEFAULT_PERCENTILES):
+    """
+    Compute every summary statistic of a numeric column at once.
+
+    Missing values are dropped with a single mask, then one shared sort of the
+    remaining values gives the extrema, median, percentiles, unique count, zeros
+    and negatives (by binary search) and the value frequencies (from the run lengths).
+
+    Parameters:
+        values (np.ndarray): Values of the column.
+        n_frequent (int): Number of most frequent values to return.
+        percentiles (tuple): Percentiles to compute.
+
+    Returns:
+        dict: Statistics keyed by the matching NumericColumn attribute names, plus
+        'frequent_values', 'frequent_counts' and the sorted non-missing values in 'sorted'.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        n_missing = int(np.count_nonzero(missing))
+        valid = values[~missing] if n_missing else values
+    else:
+        n_missing = 0
+        valid = values
+
+    ordered = np.sort(valid)
+    n = len(ordered)
+    stats = {
+        'n_missing': n_missing,
+        'n_unique': 0,
+        'n_zeros': 0,
+        'n_negatives': 0,
+        'col_mean': np.nan,
+        'col_std': np.nan,
+        'col_min': np.nan,
+        'col_max': np.nan,
+        'col_median': np.nan,
+        'quantiles': exact_quantiles(ordered, percentiles, is_sorted=True),
+        'frequent_values': ordered[:0],
+        'frequent_counts': np.empty(0, dtype='int64'),
+        'sorted': ordered,
+    }
+    if n == 0:
+        return stats
+
+    # Start position of each run of equal values in the sorted array
+    starts = np.concatenate(([0], np.flatnonzero(ordered[1:] != ordered[:-1]) + 1))
+    counts = np.diff(np.append(starts, n))
+    zeros_start = np.searchsorted(ordered, 0, side='left')
+    zeros_end = np.searchsorted(ordered, 0, side='right')
+
+    # Most frequent values: ties on the last count are broken by smallest value
+    if len(counts) > n_frequent:
+        threshold = np.partition(counts, len(counts) - n_frequent)[len(counts) - n_frequent]
+        above = np.flatnonzero(counts > threshold)
+        ties = np.flatnonzero(counts == threshold)[:n_frequent - len(above)]
+        top = np.concatenate((above, ties))
+    else:
+        top = np.arange(len(counts))
+    top = top[np.lexsort((top, -counts[top]))]
+
+    stats.update({
+        'n_unique': len(starts),
+        'n_zeros': int(zeros_end - zeros_start),
+        'n_negatives': int(zeros_start),
+        'col_mean': ordered.mean(dtype='float64'),
+        'col_std': ordered.std(ddof=1, dtype='float64') if n > 1 else np.nan,
+        'col_min': ordered[0],
+        'col_max': ordered[-1],
+        'col_median': (float(ordered[(n - 1) // 2]) + float(ordered[n // 2])) / 2,
+        'frequent_values': ordered[starts[top]],
+        'frequent_counts': counts[top],
+    })
+    return stats
+
+
+def compute_approximate_numeric_stats(values, n_frequent=N_FREQUENT, error=DEFAULT_ERROR,
+                                      percentiles=DEFAULT_PERCENTILES):
+    """
+    Compute the summary statistics of a numeric column without building an exact
+    hash table or a sorted copy of it: the unique count comes from a HyperLogLog
+    sketch and the frequent values from a Space-Saving summary, both with a
+    relative error of about error. The median and percentiles are still exact
+    (one np.partition call).
+
+    Returns:
+        dict: Same keys as compute_numeric_stats() (without 'sorted'), plus the
+        sketches in 'distinct' and 'frequent' and the names of the estimated
+        statistics in 'estimated'.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        n_missing = int(np.count_nonzero(missing))
+        valid = values[~missing] if n_missing else values
+    else:
+        n_missing = 0
+        valid = values
+    n = len(valid)
+
+    distinct = HyperLogLog.from_error(error)
+    frequent = SpaceSaving.from_error(error)
+    for start in range(0, n, SKETCH_BLOCK_SIZE):
+        block = valid[start:start + SKETCH_BLOCK_SIZE].astype('float64')
+        distinct.update(block)
+        frequent.update(block)
+    top = frequent.top(n_frequent)
+
+    stats = {
+        'n_missing': n_missing,
+        'n_unique': distinct.estimate(),
+        'n_zeros': int(np.count_nonzero(valid == 0)),
+        'n_negatives': int(np.count_nonzero(valid < 0)),
+        'col_mean': valid.mean(dtype='float64') if n else np.nan,
+        'col_std': valid.std(ddof=1, dtype='float64') if n > 1 else np.nan,
+        'col_min': valid.min() if n else np.nan,
+        'col_max': valid.max() if n else np.nan,
+        'col_median': np.nan,
+        'quantiles': {},
+        'frequent_values': top.index.to_numpy().astype(valid.dtype),
+        'frequent_counts': top.to_numpy(),
+        'distinct': distinct,
+        'frequent': frequent,
+        'estimated': {'n_unique', 'frequent'},
+    }
+    quantiles = exact_quantiles(valid, sorted(set(percentiles) | {50}))
+    stats['col_median'] = quantiles[50]
+    stats['quantiles'] = {p: quantiles[p] for p in percentiles}
+    return stats
@@ -1,8 +1,12 @@
 import streamlit as st
 import altair as alt
+from common.disk_cache import analyze_cached
+from common.instrument import stage
+from common.lazy import COMPUTATIONS, attach
+from common.sketches import DEFAULT_ERROR
 from tab_text.logics import TextColumn
 
-def display_tab_text_content(file_path=None, df=None):
+def display_tab_text_content(file_path=None, df=None, profile=None, approximate=False, error=DEFAULT_ERROR, key=None, disk_cache=None):
     """
     --------------------
     Description
@@ -16,24 +20,38 @@ def display_tab_text_content(file_path=None, df=None):
        - Summary table of the selected column
        - Bar chart of value counts
        - Table of frequent values
+
+    In out-of-core mode (profile given, no DataFrame) the bar chart is not shown.
+    In approximate mode (or out-of-core), the unique count, mode and frequent values are estimated with sketches of relative error `error`.
+    When `key` (fingerprint of the loaded dataset) is given, the column list and each column analysis are computed once and then served from common.lazy.COMPUTATIONS, and with `disk_cache` also persisted across sessions.
     """
     
-    # Create an instance of the TextColumn class
-    if file_path or (df is not None):
-        # Instantiate TextColumn in Streamlit session state
-        if file_path:
-            st.session_state.text_column = TextColumn(file_path=file_path)
-        else:
-            st.session_state.text_column = TextColumn(df=df)
-            
-    # Find all text columns
-    st.session_state.text_column.find_text_cols()
+    params = {'approximate': approximate, 'error': error}
+    if key is not None:
+        # Find all text columns once per dataset
+        st.session_state.text_column = COMPUTATIONS.get(key, 'text_cols', params=params, compute=lambda: TextColumn.finder(df, profile, **params))
+    else:
+        # Create an instance of the TextColumn class
+        if file_path or (df is not None) or (profile is not None):
+            # Instantiate TextColumn in Streamlit session state
+            if file_path:
+                st.session_state.text_column = TextColumn(file_path=file_path, **params)
+            else:
+                st.session_state.text_column = TextColumn(df=df, profile=profile, **params)
+
+        # Find all text columns
+        st.session_state.text_column.find_text_cols()
 
     # Display a selection box for text columns
     selected_text_column = st.selectbox("Select Text Column", st.session_state.text_column.cols_list)
 
-    # Set data for the selected text column
-    st.session_state.text_column.set_data(selected_text_column)
+    # Set data for the selected text column (only the first time it is selected when key is given)
+    if key is not None:
+        finder = attach(st.session_state.text_column, df, profile)
+        st.session_state.text_column = COMPUTATIONS.get(key, 'text', selected_text_column, params,
+                                                        lambda: analyze_cached(finder, selected_text_column, key, 'text', params, disk_cache))
+    else:
+        st.session_state.text_column.set_data(selected_text_column)
 
     # Display an Expander container for the results
     with st.expander("Text Column Summary"):
@@ -42,8 +60,10 @@ def display_tab_text_content(file_path=None, df=None):
         st.table(st.session_state.text_column.get_summary())
 
         # Display bar chart
-        st.write("### Bar Chart")
-        st.altair_chart(st.session_state.text_column.barchart, use_container_width=True)
+        if st.session_state.text_column.barchart is not None:
+            st.write("### Bar Chart")
+            with stage("TextColumn.altair_chart", column=selected_text_column):
+                st.altair_chart(st.session_state.text_column.barchart, use_container_width=True)
 
         # Display frequent values
         st.write("### Frequent Values")
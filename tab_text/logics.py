@@ -1,10 +1,25 @@
 import pandas as pd
 import altair as alt
 
+from common.charts import top_k_table
+from common.ingest import is_text_dtype, read_csv
+from common.instrument import column_name, df_rows, instrumented, serie_rows
+from common.sketches import DEFAULT_ERROR, HyperLogLog, SpaceSaving
+from tab_text.stats import compute_text_class_counts, compute_text_stats
+
+# Number of values hashed at once into the sketches in approximate mode
+SKETCH_BLOCK_SIZE = 1_000_000
+
 class TextColumn:
-    def __init__(self, file_path=None, df=None):
+    def __init__(self, file_path=None, df=None, profile=None, approximate=False, error=DEFAULT_ERROR):
         self.file_path = file_path
         self.df = df
+        self.profile = profile
+        self.approximate = approximate
+        self.error = error
+        self.estimated = set()
+        self.distinct = None
+        self.frequent_sketch = None
         self.cols_list = []
         self.serie = None
         self.n_unique = None
@@ -16,38 +31,107 @@ class TextColumn:
         self.n_upper = None
         self.n_alpha = None
         self.n_digit = None
-        self.barchart = alt.Chart()
+        self.counts = None
+        self.barchart = None
         self.frequent = pd.DataFrame(columns=['value', 'occurrence', 'percentage'])
 
+    @instrumented("TextColumn.find_text_cols", rows=df_rows)
     def find_text_cols(self):
+        if self.df is None and self.profile is not None:
+            self.cols_list = list(self.profile.text_cols)
+            return
         if self.df is None:
-            self.df = pd.read_csv(self.file_path)
+            self.df = read_csv(self.file_path)[0]
+
+        self.cols_list = [col for col, dtype in self.df.dtypes.items() if is_text_dtype(dtype)]
+
+    @classmethod
+    def finder(cls, df=None, profile=None, approximate=False, error=DEFAULT_ERROR):
+        """Return a TextColumn with the text columns of the dataset found, to analyze() them."""
+        column = cls(df=df, profile=profile, approximate=approximate, error=error)
+        column.find_text_cols()
+        return column
 
-        self.cols_list = [col for col in self.df.columns if self.df[col].dtype == 'object']
+    def analyze(self, col_name):
+        """Return a new TextColumn holding the analysis of col_name, leaving this one unchanged."""
+        column = TextColumn(df=self.df, profile=self.profile, approximate=self.approximate, error=self.error)
+        column.cols_list = self.cols_list
+        column.set_data(col_name)
+        return column
 
+    @instrumented("TextColumn.set_data", rows=serie_rows, column=column_name)
     def set_data(self, col_name):
+        if self.df is None and self.profile is not None:
+            self.set_accumulator(self.profile.text[col_name])
+            return
         self.serie = self.df[col_name]
-        self.convert_serie_to_text()
-        self.set_unique()
-        self.set_missing()
-        self.set_empty()
-        self.set_mode()
-        self.set_whitespace()
-        self.set_lowercase()
-        self.set_uppercase()
-        self.set_alphabet()
-        self.set_digit()
+        self.set_stats()
         self.set_barchart()
         self.set_frequent()
 
+    @instrumented("TextColumn.set_stats", rows=serie_rows)
+    def set_stats(self):
+        # All the counts from one scan of the column with tab_text.stats (no converted copy,
+        # missing values stay missing instead of becoming the string 'nan')
+        if self.approximate:
+            self.set_counts()
+            stats = compute_text_class_counts(self.serie)
+            self.set_unique()
+            self.set_mode()
+        else:
+            stats = compute_text_stats(self.serie)
+            self.counts = stats.pop('counts')
+        for name, value in stats.items():
+            setattr(self, name, value)
+
+    def set_accumulator(self, accumulator):
+        # Out-of-core mode: unique count, mode and frequent values are estimated by the sketches
+        self.error = accumulator.error
+        self.distinct = accumulator.distinct
+        self.frequent_sketch = accumulator.frequent
+        self.estimated = {'n_unique', 'n_mode', 'frequent'}
+        self.counts = self.frequent_sketch.top(self.frequent_sketch.capacity)
+        self.n_unique = self.distinct.estimate()
+        self.n_mode = self.counts.index[0] if len(self.counts) else None
+        self.set_frequent_from_counts(accumulator.n_rows)
+        self.n_missing = accumulator.n_missing
+        self.n_empty = accumulator.n_empty
+        self.n_space = accumulator.n_space
+        self.n_lower = accumulator.n_lower
+        self.n_upper = accumulator.n_upper
+        self.n_alpha = accumulator.n_alpha
+        self.n_digit = accumulator.n_digit
+
     def convert_serie_to_text(self):
         self.serie = self.serie.astype(str)
 
     def is_serie_none(self):
         return self.serie is None
 
+    def set_counts(self):
+        # Value counts shared by the bar chart and the frequent values table
+        if self.approximate:
+            self.set_sketches()
+            self.counts = self.frequent_sketch.top(self.frequent_sketch.capacity)
+        else:
+            self.counts = self.serie.value_counts()
+
+    def set_sketches(self):
+        # Approximate mode: HyperLogLog unique count and Space-Saving frequent values
+        self.distinct = HyperLogLog.from_error(self.error)
+        self.frequent_sketch = SpaceSaving.from_error(self.error)
+        values = self.serie.dropna().to_numpy()
+        for start in range(0, len(values), SKETCH_BLOCK_SIZE):
+            block = values[start:start + SKETCH_BLOCK_SIZE]
+            self.distinct.update(block)
+            self.frequent_sketch.update(block)
+        self.estimated = {'n_unique', 'n_mode', 'frequent'}
+
     def set_unique(self):
-        self.n_unique = len(self.serie.unique())
+        if self.approximate:
+            self.n_unique = self.distinct.estimate()
+        else:
+            self.n_unique = len(self.serie.unique())
 
     def set_missing(self):
         self.n_missing = self.serie.isnull().sum()
@@ -56,7 +140,10 @@ class TextColumn:
         self.n_empty = (self.serie == '').sum()
 
     def set_mode(self):
-        self.n_mode = self.serie.mode().iloc[0]
+        if self.approximate:
+            self.n_mode = self.counts.index[0] if len(self.counts) else None
+        else:
+            self.n_mode = self.serie.mode().iloc[0]
 
     def set_whitespace(self):
         self.n_space = (self.serie == ' ').sum()
@@ -73,24 +160,38 @@ class TextColumn:
     def set_digit(self):
         self.n_digit = self.serie.str.isdigit().sum()
 
+    @instrumented("TextColumn.set_barchart", rows=serie_rows)
     def set_barchart(self):
         if not self.is_serie_none():
-            chart = alt.Chart(self.serie.reset_index()).mark_bar().encode(
-                alt.X(f"{self.serie.name}:O", title="AGE_DESC", sort=alt.EncodingSortField(field="count", order="descending")),
-                alt.Y("count():Q", title="Count of Records")
-            ).properties(title=" Chart")
+            if self.counts is None:
+                self.set_counts()
+            # Only the top values and an "Other" bar are sent to the chart
+            n_values = len(self.serie) - (self.n_missing or 0)
+            chart = alt.Chart(top_k_table(self.counts, total=n_values)).mark_bar().encode(
+                alt.X("value:O", title="Values", sort=alt.EncodingSortField(field="count", order="descending")),
+                alt.Y("count:Q", title="Count of Records")
+            ).properties(title=f"Bar Chart: Most Frequent Values in {self.serie.name}")
 
             self.barchart = chart
             
+    @instrumented("TextColumn.set_frequent", rows=serie_rows)
     def set_frequent(self, end=20):
         if not self.is_serie_none():
-            frequent_values = self.serie.value_counts().head(end).reset_index()
-            frequent_values.columns = ['value', 'occurrence']
-            frequent_values['percentage'] = (
-                frequent_values['occurrence'] / len(self.serie)
-            ).round(4)
-
-            self.frequent = frequent_values
+            if self.counts is None:
+                self.set_counts()
+            self.set_frequent_from_counts(len(self.serie), end)
+
+    def set_frequent_from_counts(self, n_rows, end=20):
+        frequent_values = self.counts.head(end).reset_index()
+        frequent_values.columns = ['value', 'occurrence']
+        frequent_values['percentage'] = (
+            frequent_values['occurrence'] / max(n_rows, 1)
+        ).round(4)
+        if 'frequent' in self.estimated:
+            # Occurrences are upper bounds, over-estimated by at most max_error
+            frequent_values['max_error'] = self.frequent_sketch.max_error
+
+        self.frequent = frequent_values
 
     def get_summary(self):
         summary_df = pd.DataFrame({
@@ -106,6 +207,10 @@ class TextColumn:
             ]
         })
         summary_df["Value"] = summary_df["Value"].astype(str)
+        if 'n_unique' in self.estimated:
+            summary_df.loc[0, 'Description'] += f" (estimated, ±{self.error:.1%})"
+        if 'n_mode' in self.estimated:
+            summary_df.loc[8, 'Description'] += " (estimated)"
         return summary_df
 
     def get_frequent_values_table(self):
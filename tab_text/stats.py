@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+# Number of most frequent values kept by compute_text_stats()
+N_FREQUENT = 20
+
+# Character-class counts computed for every text column, keyed by TextColumn attribute name
+CLASS_COUNTS = ['n_empty', 'n_space', 'n_lower', 'n_upper', 'n_alpha', 'n_digit']
+
+
+def to_string_array(values):
+    """
+    Return values (object array, nulls as None/NaN) as an Arrow string array,
+    converting values that are not strings to their string representation.
+    """
+    try:
+        return pa.array(values, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        values = pd.Series(values, dtype=object)
+        return pa.array(values.where(values.isnull(), values.astype(str)), type=pa.string(), from_pandas=True)
+
+
+def arrow_strings(serie):
+    """Arrow string array backing a Series (string[pyarrow] or Arrow string dtype), without copy; None for other dtypes."""
+    if pa is None:
+        return None
+    dtype = serie.dtype
+    if isinstance(dtype, pd.StringDtype) and dtype.storage == 'pyarrow':
+        return serie.array.__arrow_array__()
+    if isinstance(dtype, pd.ArrowDtype) and (pa.types.is_string(dtype.pyarrow_dtype)
+                                             or pa.types.is_large_string(dtype.pyarrow_dtype)):
+        return serie.array.__arrow_array__()
+    return None
+
+
+def string_class_counts(labels, weights=None):
+    """
+    Count strings by character class.
+
+    Parameters:
+        labels (np.ndarray or pa.ChunkedArray): Object array of str (missing values
+            as None or NaN), or Arrow string array.
+        weights (np.ndarray): Occurrences of each label (optional, 1 by default).
+
+    Returns:
+        dict: Count for each name of CLASS_COUNTS.
+    """
+    if pc is not None:
+        array = labels if isinstance(labels, (pa.Array, pa.ChunkedArray)) else to_string_array(labels)
+        masks = [pc.equal(array, ''), pc.equal(array, ' '), pc.utf8_is_lower(array),
+                 pc.utf8_is_upper(array), pc.utf8_is_alpha(array), pc.utf8_is_digit(array)]
+        if weights is None:
+            # Counted by the kernels, missing values being skipped
+            return {name: int(pc.sum(mask).as_py() or 0) for name, mask in zip(CLASS_COUNTS, masks)}
+        masks = [pc.fill_null(mask, False).to_numpy(zero_copy_only=False) for mask in masks]
+    else:
+        text = pd.Series(labels, dtype=object)
+        text = text[text.notnull()].astype(str).reindex(text.index)
+        masks = [text == '', text == ' ', text.str.islower(), text.str.isupper(),
+                 text.str.isalpha(), text.str.isdigit()]
+        masks = [mask.fillna(False).to_numpy(dtype=bool) for mask in masks]
+    if weights is None:
+        return {name: int(np.count_nonzero(mask)) for name, mask in zip(CLASS_COUNTS, masks)}
+    return {name: int(weights[mask].sum()) for name, mask in zip(CLASS_COUNTS, masks)}
+
+
+def compute_text_stats(serie, n_frequent=N_FREQUENT):
+    """
+    Compute every summary statistic of a text column in one scan.
+
+    The column is factorized once (one hash pass over the object or Arrow string
+    buffer, missing values get code -1); occurrences come from a bincount of the
+    codes, and the character classes are evaluated on the distinct values only,
+    then weighted by their occurrences. No converted copy of the column is made.
+
+    Parameters:
+        serie (pd.Series): Text column (object, string or category dtype).
+        n_frequent (int): Number of most frequent values to return.
+
+    Returns:
+        dict: Statistics keyed by the matching TextColumn attribute names, plus the
+        occurrences of the most frequent values in 'counts' (pd.Series sorted in descending order).
+    """
+    codes, uniques = pd.factorize(serie)
+    occurrences = np.bincount(codes + 1, minlength=len(uniques) + 1)
+    n_missing, occurrences = int(occurrences[0]), occurrences[1:]
+
+    # Values that are not strings are described by their string representation (as astype(str) would)
+    labels = pd.Index(uniques, dtype=object).astype(str)
+    if not labels.is_unique:
+        merged = pd.Series(occurrences, index=labels).groupby(level=0, sort=False).sum()
+        labels, occurrences = merged.index, merged.to_numpy()
+    labels = labels.to_numpy(dtype=object)
+
+    stats = {'n_missing': n_missing, 'n_unique': len(labels), 'n_mode': None}
+    stats.update(string_class_counts(labels, occurrences))
+
+    # Most frequent values, ties broken by order of first appearance
+    if len(occurrences) > n_frequent:
+        threshold = np.partition(occurrences, len(occurrences) - n_frequent)[len(occurrences) - n_frequent]
+        above = np.flatnonzero(occurrences > threshold)
+        ties = np.flatnonzero(occurrences == threshold)[:n_frequent - len(above)]
+        top = np.concatenate((above, ties))
+    else:
+        top = np.arange(len(occurrences))
+    top = top[np.lexsort((top, -occurrences[top]))]
+    stats['counts'] = pd.Series(occurrences[top], index=pd.Index(labels[top], dtype=object), name='count')
+
+    if len(occurrences):
+        # Same tie-breaking as Series.mode(): smallest of the most frequent values
+        stats['n_mode'] = min(labels[occurrences == occurrences.max()])
+    return stats
+
+
+def compute_text_class_counts(serie):
+    """
+    Count missing values and character classes row by row, without a hash table
+    of the values (used in approximate mode). Arrow-backed strings are scanned in
+    place by the Arrow kernels and categoricals through their categories (weighted
+    by a bincount of the codes); only object columns are converted.
+    """
+    array = arrow_strings(serie)
+    if array is not None:
+        stats = {'n_missing': array.null_count}
+        stats.update(string_class_counts(array))
+        return stats
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        occurrences = np.bincount(serie.cat.codes.to_numpy() + 1, minlength=len(serie.cat.categories) + 1)
+        labels = pd.Index(serie.cat.categories, dtype=object).astype(str).to_numpy(dtype=object)
+        stats = {'n_missing': int(occurrences[0])}
+        stats.update(string_class_counts(labels, occurrences[1:]))
+        return stats
+    values = serie.to_numpy(dtype=object)
+    stats = {'n_missing': int(serie.isnull().sum())}
+    stats.update(string_class_counts(values))
+    return stats
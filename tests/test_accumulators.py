@@ -0,0 +1,47 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.accumulators import CoMomentAccumulator, NumericAccumulator
+
+
+def test_chan_merge_matches_the_whole_column():
+    rng = np.random.default_rng(0)
+    # Large offset and small spread: a naive sum of squares loses the variance
+    serie = pd.Series(1e9 + rng.normal(size=10_000))
+    serie[rng.random(10_000) < 0.1] = np.nan
+    accumulator = NumericAccumulator()
+    # Uneven chunks, one of them entirely missing
+    for start, end in [(0, 1), (1, 7), (7, 7), (7, 5_000), (5_000, 10_000)]:
+        accumulator.merge(NumericAccumulator().update(serie.iloc[start:end]))
+    accumulator.merge(NumericAccumulator().update(pd.Series([np.nan] * 3)))
+    assert accumulator.n_rows == len(serie) + 3
+    assert accumulator.n_missing == serie.isna().sum() + 3
+    assert accumulator.count == serie.count()
+    assert accumulator.col_mean == pytest.approx(serie.mean(), rel=1e-15)
+    assert accumulator.col_std == pytest.approx(serie.std(), rel=1e-9)
+    assert (accumulator.col_min, accumulator.col_max) == (serie.min(), serie.max())
+
+
+def test_empty_accumulator():
+    accumulator = NumericAccumulator().merge(NumericAccumulator())
+    assert np.isnan(accumulator.col_mean) and np.isnan(accumulator.col_std)
+    assert accumulator.col_min is None
+
+
+def test_co_moments_merge_with_different_shifts():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(3_000, 3)) @ rng.normal(size=(3, 3)) + 1e6, columns=list("abc"))
+    df[df > df.quantile(0.9)] = np.nan
+    blocks = np.array_split(df.to_numpy(), 3)
+    accumulator = CoMomentAccumulator(3).update(blocks[0])
+    for block in blocks[1:]:
+        accumulator.merge(CoMomentAccumulator(3).update(block))
+    np.testing.assert_allclose(accumulator.correlation(), df.corr().to_numpy(), atol=1e-9)
+    np.testing.assert_allclose(np.diag(accumulator.missingness()), df.isna().mean().to_numpy())
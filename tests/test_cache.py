@@ -0,0 +1,69 @@
+import os
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.cache import IngestionCache, content_hash
+
+
+def test_eviction_by_memory_budget():
+    cache = IngestionCache(max_bytes=100)
+    for key in "abc":
+        cache.put(key, key, 40)
+    assert "a" not in cache and "b" in cache and "c" in cache
+    cache.get("b")
+    cache.put("d", "d", 40)
+    # "c" is the least recently used entry
+    assert "c" not in cache and "b" in cache
+    assert cache.n_bytes == 80
+
+
+def test_build_does_not_block_other_keys():
+    cache = IngestionCache()
+    building, release = threading.Event(), threading.Event()
+
+    def slow():
+        building.set()
+        # Times out when the build of "fast" waits for this one
+        return "slow" if release.wait(5) else "blocked"
+
+    thread = threading.Thread(target=cache.get_or_create, args=("slow", slow))
+    thread.start()
+    building.wait(10)
+    # While "slow" is being built, other keys are looked up and built
+    assert "slow" not in cache
+    assert cache.get_or_create("fast", lambda: "fast") == "fast"
+    release.set()
+    thread.join(10)
+    assert cache.get("slow") == "slow"
+
+
+def test_key_is_built_once():
+    cache = IngestionCache()
+    calls = []
+    start = threading.Barrier(4)
+
+    def build():
+        calls.append(1)
+        return "value"
+
+    def get():
+        start.wait(10)
+        assert cache.get_or_create("key", build) == "value"
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(calls) == 1
+
+
+def test_content_hash_of_path_and_upload(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a,b\n1,2\n" * 1000)
+    with open(path, "rb") as f:
+        assert content_hash(str(path)) == content_hash(f)
+    assert content_hash(str(path), n_bytes=8) != content_hash(str(path))
@@ -0,0 +1,82 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.cache import IngestionCache
+from common.chunked import ChunkedProfile
+from tab_date.logics import DateColumn
+from tab_df.logics import load_dataset
+from tab_num.logics import NumericColumn
+from tab_text.logics import TextColumn
+
+
+def test_profile_matches_in_memory(tmp_path):
+    path = tmp_path / "data.csv"
+    rng = np.random.default_rng(0)
+    n_rows = 12_000
+    df = pd.DataFrame({
+        'n': rng.integers(-5, 5, n_rows),
+        'x': rng.normal(size=n_rows),
+        'mixed': rng.integers(0, 9, n_rows).astype(object),
+        't': rng.choice(["a", "b", "c"], n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.1, 'x'] = np.nan
+    # Numbers in most chunks, text in the last one: a text column for read_csv
+    df.loc[n_rows - 10, 'mixed'] = "text"
+    df = pd.concat([df, df.iloc[:500]])
+    df.to_csv(path, index=False)
+    chunked = load_dataset(str(path), cache=IngestionCache(), chunksize=1_000)
+    in_memory = load_dataset(str(path), cache=IngestionCache())
+    for name in ['n_rows', 'n_cols', 'n_duplicates', 'n_missing', 'n_num_cols', 'n_text_cols']:
+        assert getattr(chunked, name) == getattr(in_memory, name)
+    assert chunked.profile.dtypes == {col: str(dtype) for col, dtype in in_memory.df.dtypes.items()}
+    assert NumericColumn.finder(profile=chunked.profile).cols_list == NumericColumn.finder(in_memory.df).cols_list
+    for col in ['n', 'x']:
+        column = NumericColumn(profile=chunked.profile).analyze(col)
+        expected = NumericColumn(df=in_memory.df).analyze(col)
+        for name in ['n_missing', 'n_zeros', 'n_negatives', 'col_min', 'col_max']:
+            assert getattr(column, name) == getattr(expected, name)
+        for name in ['col_mean', 'col_std']:
+            assert getattr(column, name) == pytest.approx(getattr(expected, name), rel=1e-12)
+        assert column.n_unique == pytest.approx(expected.n_unique, rel=0.05)
+
+
+def test_dates_found_after_the_first_chunk(tmp_path):
+    path = tmp_path / "data.csv"
+    dates = pd.Series(pd.date_range("2020-01-01", periods=3_000, freq="h")).dt.strftime("%Y-%m-%d %H:%M:%S")
+    df = pd.DataFrame({
+        # Missing in the first chunk (read as float64 there), then dates
+        'late': dates.where(np.arange(3_000) >= 1_000),
+        # Placeholders without digits in the first chunk, then dates
+        'placeholder': dates.where(np.arange(3_000) >= 1_500, "n/a"),
+        'text': np.resize(["a", "B", "12", " "], 3_000),
+    })
+    df.to_csv(path, index=False)
+    profile = ChunkedProfile(str(path), chunksize=500).run()
+    in_memory = pd.read_csv(path)
+    assert profile.date_cols == DateColumn.finder(in_memory).cols_list == ['late', 'placeholder']
+    for col in profile.date_cols:
+        expected = DateColumn(df=in_memory).analyze(col).summary_data
+        summary = DateColumn(profile=profile).analyze(col).summary_data
+        for name in ["Number of Rows with Missing Values", "Number of Weekend Dates", "Minimum Value", "Maximum Value"]:
+            assert summary[name] == expected[name]
+
+
+def test_text_counts_match_in_memory(tmp_path):
+    path = tmp_path / "data.csv"
+    rng = np.random.default_rng(0)
+    text = pd.Series(rng.choice(["abc", "ABC", "12", " ", "Mixed", "é"], 5_000))
+    text[rng.random(5_000) < 0.1] = np.nan
+    pd.DataFrame({'text': text}).to_csv(path, index=False)
+    profile = ChunkedProfile(str(path), chunksize=700).run()
+    expected = TextColumn(df=pd.read_csv(path)).analyze('text')
+    column = TextColumn(profile=profile).analyze('text')
+    for name in ['n_missing', 'n_empty', 'n_space', 'n_lower', 'n_upper', 'n_alpha', 'n_digit', 'n_mode']:
+        assert getattr(column, name) == getattr(expected, name)
+    assert column.n_unique == pytest.approx(expected.n_unique, abs=1)
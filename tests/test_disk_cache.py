@@ -0,0 +1,130 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.accumulators import DateAccumulator
+from common.cache import IngestionCache
+from common.disk_cache import DiskCache, analyze_cached
+from tab_date.logics import DateColumn
+from tab_df.logics import load_dataset
+from tab_num.correlation import NumericCorrelation
+from tab_num.logics import NumericColumn
+from tab_text.logics import TextColumn
+
+PARAMS = {'approximate': False, 'error': 0.01}
+
+
+def write_csv(path, n_rows=5_000):
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        'x': rng.normal(size=n_rows),
+        'n': rng.integers(0, 50, n_rows),
+        't': rng.choice(["a", "B", "12"], n_rows),
+        'd': (pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 10 ** 6, n_rows), unit='min')).astype(str),
+    }).to_csv(path, index=False)
+
+
+def load(path, disk_cache, **options):
+    return load_dataset(str(path), cache=IngestionCache(), disk_cache=disk_cache, **options)
+
+
+@pytest.mark.parametrize("options", [{}, {'chunksize': 1_000}])
+def test_dataset_round_trip(tmp_path, options):
+    path = tmp_path / "data.csv"
+    write_csv(path)
+    disk_cache = DiskCache(str(tmp_path / "cache"))
+    dataset = load(path, disk_cache, **options)
+    reloaded = disk_cache.load_dataset(dataset.fingerprint, str(path))
+    assert reloaded is not dataset
+    pd.testing.assert_frame_equal(reloaded.generate_summary(), dataset.generate_summary())
+    if options:
+        assert reloaded.profile.to_state().keys() == dataset.profile.to_state().keys()
+        assert reloaded.profile.numeric['x'].col_mean == dataset.profile.numeric['x'].col_mean
+    else:
+        pd.testing.assert_frame_equal(reloaded.df, dataset.df)
+
+
+@pytest.mark.parametrize("column_class, kind, col_name", [
+    (NumericColumn, 'num', 'x'), (TextColumn, 'text', 't'), (DateColumn, 'date', 'd')])
+def test_analysis_round_trip(tmp_path, column_class, kind, col_name):
+    path = tmp_path / "data.csv"
+    write_csv(path)
+    disk_cache = DiskCache(str(tmp_path / "cache"))
+    dataset = load(path, disk_cache)
+    finder = column_class.finder(dataset.df, **PARAMS)
+    analysis = analyze_cached(finder, col_name, dataset.fingerprint, kind, PARAMS, disk_cache)
+    reloaded = analyze_cached(finder, col_name, dataset.fingerprint, kind, PARAMS, disk_cache,
+                              compute=lambda: pytest.fail("the analysis is computed again"))
+    assert type(reloaded) is column_class and reloaded.df is None
+    pd.testing.assert_frame_equal(reloaded.get_summary(), analysis.get_summary())
+    pd.testing.assert_frame_equal(reloaded.frequent, analysis.frequent)
+
+
+def test_correlation_round_trip(tmp_path):
+    path = tmp_path / "data.csv"
+    write_csv(path)
+    disk_cache = DiskCache(str(tmp_path / "cache"))
+    dataset = load(path, disk_cache)
+
+    def compute():
+        correlation = NumericCorrelation(df=dataset.df)
+        correlation.set_data()
+        return correlation
+
+    analysis = analyze_cached(None, None, dataset.fingerprint, 'correlation', PARAMS, disk_cache, compute)
+    reloaded = disk_cache.load_profile(dataset.fingerprint, 'correlation', None, PARAMS)
+    assert type(reloaded) is NumericCorrelation
+    assert reloaded.cols_list == analysis.cols_list == ['x', 'n']
+    pd.testing.assert_frame_equal(reloaded.pearson, analysis.pearson)
+
+
+def test_only_known_classes_are_rebuilt(tmp_path):
+    path = tmp_path / "data.csv"
+    write_csv(path, 100)
+    disk_cache = DiskCache(str(tmp_path / "cache"))
+    dataset = load(path, disk_cache)
+    meta_path = os.path.join(disk_cache.entry_dir(dataset.fingerprint), "dataset", "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['class'] = "tests.planted_module:Planted"
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    assert disk_cache.load_dataset(dataset.fingerprint) is None
+    assert "tests.planted_module" not in sys.modules
+    # Other classes are not persisted
+    disk_cache.save_state(str(tmp_path / "other"), pd.Timestamp("2020-01-01"))
+    assert not os.path.exists(tmp_path / "other")
+
+
+def test_dates_in_future_are_counted_when_reloaded(tmp_path):
+    now = pd.Timestamp("2030-01-01")
+    dates = pd.Series(pd.date_range("2029-12-31", periods=72, freq="h"))
+    accumulator = DateAccumulator(now=now).update(dates)
+    assert accumulator.n_future == 47
+    # Later on, the dates passed since are no longer in the future
+    assert accumulator.future_dates(now) == (47, True, pd.Timestamp("2030-01-01 01:00"))
+    assert accumulator.future_dates(pd.Timestamp("2030-01-02")) == (23, True, pd.Timestamp("2030-01-02 01:00"))
+    assert accumulator.future_dates(pd.Timestamp("2031-01-01")) == (0, True, None)
+    future = pd.Timestamp.now().normalize() + pd.Timedelta(days=2)
+    column = DateColumn(df=pd.DataFrame({'d': [pd.Timestamp("2000-01-01"), future, future + pd.Timedelta(days=1)]}))
+    assert column.analyze('d').expires == future
+
+    path = tmp_path / "data.csv"
+    write_csv(path, 100)
+    disk_cache = DiskCache(str(tmp_path / "cache"))
+    dataset = load(path, disk_cache)
+    analysis = DateColumn.finder(dataset.df).analyze('d')
+    # An analysis past its first future date is computed again
+    analysis.expires = pd.Timestamp("2000-01-01")
+    disk_cache.save_profile(dataset.fingerprint, 'date', 'd', PARAMS, analysis)
+    assert disk_cache.load_profile(dataset.fingerprint, 'date', 'd', PARAMS) is None
+    analysis.expires = pd.Timestamp.now() + pd.Timedelta(days=1)
+    disk_cache.save_profile(dataset.fingerprint, 'date', 'd', PARAMS, analysis)
+    assert disk_cache.load_profile(dataset.fingerprint, 'date', 'd', PARAMS) is not None
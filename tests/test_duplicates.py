@@ -0,0 +1,67 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+import common.duplicates
+from common.duplicates import DuplicateCounter, count_appended_duplicates, count_duplicates, row_hashes
+
+
+def make_frame(n_rows=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'x': rng.integers(0, 10, n_rows),
+        'y': rng.choice([0.5, np.nan], n_rows),
+        't': rng.choice(["a", "b", None], n_rows),
+        'c': pd.Categorical(rng.choice(["u", "v"], n_rows)),
+    })
+
+
+def weak_hashes(df):
+    """Fingerprints colliding for most distinct rows, so the verification of collisions is exercised."""
+    return row_hashes(df) % np.uint64(5)
+
+
+@pytest.mark.parametrize("weak", [False, True])
+def test_count_duplicates_matches_duplicated(monkeypatch, weak):
+    if weak:
+        monkeypatch.setattr(common.duplicates, 'row_hashes', weak_hashes)
+    df = make_frame()
+    expected = int(df.duplicated().sum())
+    # Missing values equal each other, as in duplicated()
+    assert count_duplicates(df, min_columns=0) == expected
+    assert count_duplicates(df, hashes=common.duplicates.row_hashes(df)) == expected
+    assert count_duplicates(df.drop_duplicates(), min_columns=0) == 0
+
+
+def test_count_appended_duplicates():
+    df = make_frame()
+    hashes = weak_hashes(df)
+    counted = 3_000
+    expected = int(df.duplicated().sum() - df.iloc[:counted].duplicated().sum())
+    assert count_appended_duplicates(df, hashes, counted) == expected
+    assert count_appended_duplicates(df, hashes, len(df)) == 0
+
+
+@pytest.mark.parametrize("weak", [False, True])
+def test_duplicate_counter_over_chunks(tmp_path, monkeypatch, weak):
+    if weak:
+        monkeypatch.setattr(common.duplicates, 'row_hashes', weak_hashes)
+    path = tmp_path / "data.csv"
+    make_frame().to_csv(path, index=False)
+    counter = DuplicateCounter()
+
+    def read_chunks():
+        return pd.read_csv(path, chunksize=700)
+
+    for chunk in read_chunks():
+        counter.update(chunk)
+    # Chunks where y is entirely missing are read as float64 like the others
+    assert counter.count(read_chunks) == pd.read_csv(path).duplicated().sum()
+    restored = DuplicateCounter.from_state(counter.to_state())
+    assert restored.count(read_chunks) == counter.count(read_chunks)
@@ -0,0 +1,101 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+import common.duplicates
+import tab_df.logics
+from common.cache import IngestionCache
+from common.chunked import ChunkedProfile
+from common.disk_cache import DiskCache
+from common.incremental import read_tail
+from tab_df.logics import Dataset, load_dataset
+
+
+def make_rows(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'x': rng.integers(0, 20, n_rows),
+        'y': rng.choice([0.5, 1.5, np.nan], n_rows),
+        't': rng.choice(["a", "b", "c", "d"], n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.05, 't'] = np.nan
+    return df
+
+
+def write_appended(path, n_rows, n_appended):
+    """Write a file of n_rows rows, and return a function appending n_appended rows to it
+    (duplicating earlier rows and each other)."""
+    make_rows(n_rows, 0).to_csv(path, index=False)
+
+    def append():
+        make_rows(n_appended, 1).to_csv(path, mode='a', header=False, index=False)
+    return append
+
+
+def load(path, disk_cache, **options):
+    return load_dataset(str(path), cache=IngestionCache(), disk_cache=disk_cache, **options)
+
+
+def weak_hashes(row_hashes):
+    """Fingerprints colliding for most distinct rows, to exercise the verification of collisions."""
+    return lambda df: row_hashes(df) % np.uint64(7)
+
+
+@pytest.mark.parametrize("weak", [False, True])
+@pytest.mark.parametrize("options", [{}, {'optimize_dtypes': True}])
+def test_appended_rows_in_memory(tmp_path, monkeypatch, options, weak):
+    if weak:
+        monkeypatch.setattr(tab_df.logics, 'row_hashes', weak_hashes(tab_df.logics.row_hashes))
+    path = tmp_path / "data.csv"
+    append = write_appended(path, 12_000, 3_000)
+    disk_cache = DiskCache(str(tmp_path / "cache"))
+    load(path, disk_cache, **options)
+    append()
+    expected = load(path, None, **options)
+    # Only the appended rows are parsed and summarized
+    monkeypatch.setattr(Dataset, 'load_df', lambda self: pytest.fail("the whole file is parsed again"))
+    monkeypatch.setattr(Dataset, 'find_duplicates', lambda self: pytest.fail("every row is checked again"))
+    dataset = load(path, disk_cache, **options)
+    pd.testing.assert_frame_equal(dataset.df, expected.df)
+    assert dataset.n_rows == expected.n_rows == 15_000
+    assert dataset.n_duplicates == expected.n_duplicates == expected.df.duplicated().sum()
+    assert dataset.n_missing == expected.n_missing
+    if options:
+        pd.testing.assert_frame_equal(dataset.memory_report, expected.memory_report, atol=0.1)
+
+
+@pytest.mark.parametrize("weak", [False, True])
+def test_appended_rows_out_of_core(tmp_path, monkeypatch, weak):
+    if weak:
+        monkeypatch.setattr(common.duplicates, 'row_hashes', weak_hashes(common.duplicates.row_hashes))
+    path = tmp_path / "data.csv"
+    append = write_appended(path, 12_000, 3_000)
+    disk_cache = DiskCache(str(tmp_path / "cache"))
+    load(path, disk_cache, chunksize=1_000)
+    append()
+    expected = load(path, None, chunksize=1_000)
+    monkeypatch.setattr(ChunkedProfile, 'run', lambda self: pytest.fail("the whole file is profiled again"))
+    dataset = load(path, disk_cache, chunksize=1_000)
+    assert dataset.n_rows == expected.n_rows == 15_000
+    assert dataset.n_duplicates == expected.n_duplicates == pd.read_csv(path).duplicated().sum()
+    assert dataset.n_missing == expected.n_missing
+    assert dataset.profile.numeric['x'].col_mean == pytest.approx(expected.profile.numeric['x'].col_mean)
+
+
+def test_appended_distinct_rows_read_only_the_tail(tmp_path, monkeypatch):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({'x': range(0, 5_000), 'y': 1}).to_csv(path, index=False)
+    profile = ChunkedProfile(str(path), chunksize=1_000).run()
+    offset = os.path.getsize(path)
+    # The appended rows duplicate each other, not the earlier rows
+    pd.DataFrame({'x': [9_000, 9_001, 9_000, 9_001, 9_002], 'y': 1}).to_csv(path, mode='a', header=False, index=False)
+    monkeypatch.setattr(ChunkedProfile, 'read_chunks', lambda self, **kwargs: pytest.fail("the file is read again"))
+    profile.extend(str(path), read_tail(str(path), offset))
+    assert profile.n_rows == 5_005
+    assert profile.n_duplicates == 2
@@ -0,0 +1,51 @@
+import os
+import sys
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.disk_cache import DiskCache
+from common.ingest import load_csv
+from tab_df.logics import load_dataset
+
+# Enough rows for read_csv() to parse the column in several low_memory chunks
+MIXED_ROWS = 600_000
+
+
+def write_mixed_csv(path):
+    """CSV file whose column b holds integers, then strings: read_csv() gives an object column mixing both."""
+    with open(path, "w") as f:
+        f.write("a,b,c\n")
+        f.writelines(f"{i},{i},t{i % 3}\n" for i in range(MIXED_ROWS))
+        f.writelines(f"{i},x{i},u\n" for i in range(10))
+
+
+def test_load_csv_mixed_type_column(tmp_path):
+    path = tmp_path / "mixed.csv"
+    write_mixed_csv(path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", pd.errors.DtypeWarning)
+        for optimize_dtypes in (False, True):
+            df, _ = load_csv(str(path), key=f"mixed_{optimize_dtypes}", optimize_dtypes=optimize_dtypes,
+                             working_dir=str(tmp_path / "working"))
+            assert len(df) == MIXED_ROWS + 10
+            assert df['b'].dtype == 'object'
+            assert df['b'].iloc[-1] == "x9"
+
+            dataset = load_dataset(str(path), key=f"mixed_{optimize_dtypes}", optimize_dtypes=optimize_dtypes,
+                                   disk_cache=DiskCache(str(tmp_path / "cache")))
+            assert dataset.n_rows == MIXED_ROWS + 10
+
+
+def test_working_copy_keeps_object_text_unless_optimized(tmp_path):
+    path = tmp_path / "text.csv"
+    pd.DataFrame({'x': range(5), 's': list("abcde")}).to_csv(path, index=False)
+    for optimize_dtypes, expected in ((False, 'object'), (True, 'string')):
+        # The first load writes the working copy, the second one maps it
+        for _ in range(2):
+            df, _ = load_csv(str(path), key=f"text_{optimize_dtypes}", optimize_dtypes=optimize_dtypes,
+                             working_dir=str(tmp_path / "working"))
+            assert str(df['s'].dtype) == expected
@@ -0,0 +1,73 @@
+import gc
+import os
+import sys
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.cache import IngestionCache
+from common.lazy import ComputationStore, attach, size_of
+from common.scheduler import PROFILE_KINDS, ProfileScheduler
+from tab_df.logics import load_dataset
+
+
+def write_csv(path, n_rows=20_000):
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        'x': rng.normal(size=n_rows),
+        'n': rng.integers(0, 50, n_rows),
+        't': rng.choice(["a", "B", "12", ""], n_rows),
+        'd': pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 10 ** 6, n_rows), unit='min'),
+    }).to_csv(path, index=False)
+
+
+def test_results_do_not_keep_the_frame_alive(tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_csv(path)
+    dataset = load_dataset(path, cache=IngestionCache())
+    df = dataset.df
+    store = ComputationStore()
+    params = {'approximate': False, 'error': 0.01}
+    for kind, cols_kind, column_class in PROFILE_KINDS:
+        finder = store.get(dataset.fingerprint, cols_kind, params=params,
+                           compute=lambda: column_class.finder(df, None, **params))
+        assert finder.df is None and finder.cols_list
+        finder = attach(finder, df)
+        for col_name in finder.cols_list:
+            analysis = store.get(dataset.fingerprint, kind, col_name, params, lambda: finder.analyze(col_name))
+            assert analysis.df is None and analysis.serie is None
+            assert len(analysis.get_summary()) and len(analysis.frequent)
+    # The displayed results are kept, the DataFrame evicted from the ingestion cache is released
+    assert store.get(dataset.fingerprint, 'num', 'x', params).histogram is not None
+    assert store.get(dataset.fingerprint, 'date', 'd', params).barchart is not None
+    reference = weakref.ref(df)
+    del df, finder, dataset
+    gc.collect()
+    assert reference() is None
+
+
+def test_scheduled_results_do_not_keep_the_frame_alive(tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_csv(path)
+    dataset = load_dataset(path, cache=IngestionCache())
+    store = ComputationStore()
+    ProfileScheduler(dataset, store=store).start().wait()
+    # 3 column lists, 2 numeric, 2 text (the unparsed dates included) and 1 date analyses
+    assert len(store) == 3 + 2 + 2 + 1
+    reference = weakref.ref(dataset.df)
+    del dataset
+    gc.collect()
+    assert reference() is None
+
+
+def test_store_is_bounded_by_its_memory_budget():
+    result = pd.DataFrame({'value': np.arange(100_000)})
+    store = ComputationStore(max_bytes=3 * size_of(result))
+    for i in range(10):
+        store.get("fingerprint", 'num', f"column {i}", compute=lambda: result.copy())
+    assert len(store) == 3
+    assert ComputationStore.make_key("fingerprint", 'num', "column 9") in store
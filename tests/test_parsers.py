@@ -0,0 +1,84 @@
+import io
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+import common.parsers
+from common.parsers import PARSERS, byte_ranges, needs_text_reparse, parse_csv, parse_range
+
+CSV = "\n".join([
+    'i,f,t,b,d,empty,missing_int,quoted',
+    '1,0.5,abc,True,2021-01-02,,1,"a, b"',
+    '2,,NA,False,2021-01-03,,,"c"',
+    '3,1.5,,True,,,3,',
+    '-4,2.5,xyz,,2021-01-05 10:00:00,,4,"d ""e"""',
+]) + "\n"
+
+
+@pytest.mark.parametrize("parser", list(PARSERS))
+@pytest.mark.parametrize("dtype", [None, {'t': 'category'}, {'t': 'string[pyarrow]', 'i': str}])
+def test_backends_follow_the_dtypes_of_read_csv(tmp_path, parser, dtype):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    expected = pd.read_csv(path, dtype=dtype)
+    pd.testing.assert_frame_equal(parse_csv(str(path), dtype=dtype, parser=parser), expected)
+    # Uploads too
+    upload = io.BytesIO(CSV.encode())
+    pd.testing.assert_frame_equal(parse_csv(upload, dtype=dtype, parser=parser), expected)
+
+
+def test_byte_ranges_end_on_line_breaks(tmp_path):
+    path = tmp_path / "data.csv"
+    df = pd.DataFrame({'x': np.arange(1_000), 't': np.resize(["a", "bb", "ccc"], 1_000)})
+    df.to_csv(path, index=False)
+    header, ranges = byte_ranges(str(path), range_bytes=1_000)
+    assert header == b"x,t\n"
+    assert ranges[0][0] == len(header) and ranges[-1][1] == os.path.getsize(path)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    frames = [parse_range(str(path), header, start, end) for start, end in ranges]
+    assert len(frames) > 5
+    pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), df)
+
+
+def test_needs_text_reparse():
+    numbers, floats, text = pd.Series([1, 2]), pd.Series([1.5, np.nan]), pd.Series(["a", np.nan])
+    missing = pd.Series([np.nan, np.nan])
+    assert not needs_text_reparse([numbers, floats, missing])
+    assert not needs_text_reparse([text, pd.Series([None, None], dtype=object)])
+    assert needs_text_reparse([numbers, text])
+    assert needs_text_reparse([pd.Series([True, np.nan], dtype=object), text])
+
+
+@pytest.mark.parametrize("parser", ['pyarrow', 'parallel'])
+@pytest.mark.parametrize("wide", [["1", "18446744073709551615"], ["-1", "18446744073709551615"], ["1.5", "1e19"]])
+def test_integers_beyond_int64(tmp_path, monkeypatch, parser, wide):
+    monkeypatch.setattr(common.parsers, 'PARALLEL_RANGE_BYTES', 64)
+    path = tmp_path / "data.csv"
+    # The wide values are in the last byte range only
+    path.write_text("x,n\n" + "".join(f"{i},{i}\n" for i in range(50)) + "".join(f"{value},1\n" for value in wide))
+    expected = pd.read_csv(path)
+    pd.testing.assert_frame_equal(parse_csv(str(path), parser=parser), expected)
+
+
+def test_parallel_ranges_follow_read_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(common.parsers, 'PARALLEL_RANGE_BYTES', 1_000)
+    path = tmp_path / "data.csv"
+    n_rows = 2_000
+    df = pd.DataFrame({
+        'i': np.arange(n_rows),
+        # Integers in the first ranges, floats in the last ones
+        'f': np.where(np.arange(n_rows) < 1_500, 1, 0.5),
+        # Numbers, then text
+        'm': np.where(np.arange(n_rows) < 1_900, "7", "text"),
+        # Missing in the first ranges only
+        'e': np.where(np.arange(n_rows) < 1_000, None, "a"),
+    })
+    df.to_csv(path, index=False)
+    assert len(byte_ranges(str(path))[1]) > 10
+    pd.testing.assert_frame_equal(parse_csv(str(path), parser='parallel'), pd.read_csv(path))
@@ -0,0 +1,77 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.progressive import MARGIN_COLUMN, ProgressiveLoad, SampleEstimate, quantile_interval, start_progressive_load
+
+
+def write_csv(path, n_rows=50_000):
+    pd.DataFrame({'x': np.arange(n_rows), 't': np.resize(["a", "b", "c"], n_rows)}).to_csv(path, index=False)
+
+
+def test_sample_estimate_covers_the_file(tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_csv(path)
+    progress = ProgressiveLoad(path, lambda: None, sample_rows=1_000, block_bytes=16 * 1024)
+    # Sampling alone: the load is only marked done once every block was read
+    progress.run_sampling()
+    estimate = progress.estimate()
+    assert estimate.k == 1_000
+    assert estimate.n_rows == 50_000
+    assert estimate.fraction == 1.0
+
+
+def test_finished_load_is_forgotten(tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_csv(path)
+    loads = []
+    progress = start_progressive_load(path, path, lambda: loads.append(path))
+    assert start_progressive_load(path, path, lambda: loads.append(path)) in (progress, None)
+    progress.wait()
+    assert progress.done and progress.exception is None
+    # A finished load keeps neither the file nor the sample
+    assert progress.file_path is None and progress.reservoir is None and progress.estimate() is None
+    # Later runs get None (the exact load then reads the caches) instead of the finished load, whether
+    # the dataset is still cached or not, and the file is not loaded again in the background
+    for _ in range(3):
+        assert start_progressive_load(path, path, lambda: loads.append(path)) is None
+    assert loads == [path]
+
+
+def test_failed_load_is_done(tmp_path):
+    def fail():
+        raise ValueError("unreadable")
+
+    path = str(tmp_path / "data.csv")
+    write_csv(path, 1_000)
+    progress = ProgressiveLoad(path, fail).start().wait()
+    assert progress.done
+    assert isinstance(progress.exception, ValueError)
+
+
+def test_quantile_intervals_cover_the_percentiles():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=100_000)
+    expected = np.percentile(values, [5, 50, 95])
+    covered = np.zeros(3)
+    for _ in range(200):
+        sample = np.sort(rng.choice(values, 1_000, replace=False))
+        for i, p in enumerate([5, 50, 95]):
+            low, high = quantile_interval(sample, p, len(values))
+            covered[i] += low <= expected[i] <= high
+    assert np.all(covered / 200 >= 0.9)
+    # A sample of every row gives the percentile itself
+    assert quantile_interval(np.sort(values), 50, len(values))[0] == np.sort(values)[50_000]
+
+
+def test_sample_extremes_are_bounds():
+    df = pd.DataFrame({'x': np.random.default_rng(0).normal(size=1_000)})
+    summary = SampleEstimate(df, 100_000).column('num', 'x')[0].set_index('Description')
+    assert "Minimum Value (at most)" in summary.index and "Maximum Value (at least)" in summary.index
+    assert summary.loc["Median Value", MARGIN_COLUMN] != ""
+    assert summary.loc["Percentile p99", MARGIN_COLUMN] != ""
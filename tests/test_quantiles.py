@@ -0,0 +1,59 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.quantiles import DEFAULT_PERCENTILES, KLLSketch, exact_quantiles
+
+
+def rank_error(values, estimates):
+    """Largest distance between the requested and the actual rank of the estimates, as a fraction of the values."""
+    ordered = np.sort(values)
+    errors = []
+    for p, estimate in estimates.items():
+        low = np.searchsorted(ordered, estimate, side='left') / len(ordered)
+        high = np.searchsorted(ordered, estimate, side='right') / len(ordered)
+        errors.append(max(low - p / 100, p / 100 - high, 0))
+    return max(errors)
+
+
+def test_exact_quantiles_match_numpy():
+    values = np.random.default_rng(0).normal(size=1_001)
+    expected = np.percentile(values, DEFAULT_PERCENTILES)
+    assert list(exact_quantiles(values).values()) == pytest.approx(expected)
+    assert np.isnan(exact_quantiles(np.empty(0))[50])
+
+
+def test_kll_is_exact_before_compacting():
+    values = np.random.default_rng(0).normal(size=100)
+    sketch = KLLSketch(k=200).update(values)
+    assert sketch.exact
+    assert sketch.quantiles() == pytest.approx(exact_quantiles(values))
+
+
+def test_kll_rank_error_after_merging_chunks():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.lognormal(size=150_000), rng.normal(size=50_000)])
+    sketch = KLLSketch(k=200)
+    for chunk in np.array_split(values, 9):
+        sketch.merge(KLLSketch(k=200, seed=len(chunk)).update(chunk))
+    assert not sketch.exact and sketch.n == len(values)
+    # The sketch keeps O(k) items
+    assert sum(len(level) for level in sketch.levels) < 3 * sketch.k
+    percentiles = (0, 1, 5, 25, 50, 75, 95, 99, 100)
+    estimates = sketch.quantiles(percentiles)
+    assert estimates[0] == values.min() and estimates[100] == values.max()
+    assert rank_error(values, estimates) <= sketch.error
+    assert KLLSketch.from_state(sketch.to_state()).quantiles(percentiles) == estimates
+
+
+def test_kll_ignores_missing_values():
+    sketch = KLLSketch().update([np.nan, 1.0, 2.0, np.nan, 3.0])
+    assert sketch.n == 3
+    assert sketch.quantiles((50,)) == {50: 2.0}
+    with pytest.raises(ValueError):
+        sketch.merge(KLLSketch(k=sketch.k + 1))
@@ -0,0 +1,53 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.cache import IngestionCache
+from common.lazy import ComputationStore
+from common.scheduler import PROFILE_KINDS, ProfileScheduler
+from tab_df.logics import load_dataset
+
+
+def write_csv(path, n_rows=5_000):
+    rng = np.random.default_rng(0)
+    t = pd.Series(rng.choice(["a", "B", "12", ""], n_rows))
+    t[rng.random(n_rows) < 0.1] = np.nan
+    pd.DataFrame({
+        'x': rng.normal(size=n_rows),
+        'n': rng.integers(0, 50, n_rows),
+        't': t,
+        'd': (pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 10 ** 6, n_rows), unit='min')).astype(str),
+    }).to_csv(path, index=False)
+
+
+@pytest.mark.parametrize("options", [{}, {'optimize_dtypes': True}])
+def test_worker_processes_analyse_every_kind_of_column(tmp_path, monkeypatch, options):
+    path = str(tmp_path / "data.csv")
+    write_csv(path)
+    dataset = load_dataset(path, cache=IngestionCache(), **options)
+    threads = ProfileScheduler(dataset, store=ComputationStore()).start().wait()
+    shipped = []
+    analyze_in_process = ProfileScheduler.analyze_in_process
+
+    def ship(self, finder, col_name):
+        shipped.append(col_name)
+        return analyze_in_process(self, finder, col_name)
+
+    monkeypatch.setattr(ProfileScheduler, 'analyze_in_process', ship)
+    processes = ProfileScheduler(dataset, processes=True, store=ComputationStore()).start().wait()
+    # The date column is also a text column
+    assert sorted(shipped) == ['d', 'd', 'n', 't', 'x']
+    for kind, cols_kind, _ in PROFILE_KINDS:
+        finder = threads.store.get(dataset.fingerprint, cols_kind, params=threads.params)
+        for col_name in finder.cols_list:
+            expected = threads.store.get(dataset.fingerprint, kind, col_name, threads.params)
+            analysis = processes.store.get(dataset.fingerprint, kind, col_name, processes.params)
+            assert analysis.df is None
+            pd.testing.assert_frame_equal(analysis.get_summary(), expected.get_summary())
+            pd.testing.assert_frame_equal(analysis.frequent, expected.frequent)
@@ -0,0 +1,82 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(os.path.dirname(__file__)).resolve().parents[0]))
+
+from common.sketches import HyperLogLog, Reservoir, SpaceSaving
+
+
+@pytest.mark.parametrize("n_distinct", [10, 1_000, 200_000])
+def test_hyperloglog_estimate_within_its_error(n_distinct):
+    sketch = HyperLogLog(precision=12)
+    sketch.update(np.arange(n_distinct))
+    sketch.update(np.arange(n_distinct))
+    # 4 standard errors
+    assert sketch.estimate() == pytest.approx(n_distinct, rel=4 * sketch.error)
+
+
+def test_hyperloglog_merge_is_the_sketch_of_the_union():
+    whole = HyperLogLog(precision=10).update(np.arange(50_000))
+    left = HyperLogLog(precision=10).update(np.arange(30_000))
+    right = HyperLogLog(precision=10).update(np.arange(20_000, 50_000))
+    np.testing.assert_array_equal(left.merge(right).registers, whole.registers)
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(precision=11))
+    assert HyperLogLog.from_state(whole.to_state()).estimate() == whole.estimate()
+
+
+def test_space_saving_is_exact_within_its_capacity():
+    values = np.repeat(["a", "b", "c"], [5, 3, 1])
+    summary = SpaceSaving(capacity=10).update(values)
+    assert summary.exact and summary.max_error == 0
+    assert summary.top().to_dict() == {"a": 5, "b": 3, "c": 1}
+
+
+def test_space_saving_bounds_merged_counts():
+    rng = np.random.default_rng(0)
+    values = rng.zipf(1.5, 100_000)
+    values = values[values < 10_000]
+    true_counts = pd.Series(values).value_counts()
+    summary = SpaceSaving(capacity=50)
+    for chunk in np.array_split(values, 7):
+        summary.merge(SpaceSaving(capacity=50).update(chunk))
+    assert summary.n == len(values) and not summary.exact
+    # Counts are upper bounds over-estimated by at most n / capacity, and every value more
+    # frequent than that is tracked
+    tracked = summary.counts
+    assert (tracked >= true_counts.reindex(tracked.index)).all()
+    assert (tracked - summary.errors <= true_counts.reindex(tracked.index)).all()
+    assert (tracked - true_counts.reindex(tracked.index) <= summary.max_error).all()
+    assert set(true_counts[true_counts > summary.max_error].index) <= set(tracked.index)
+    restored = SpaceSaving.from_state(summary.to_state())
+    pd.testing.assert_series_equal(restored.top(), summary.top())
+
+
+def test_reservoir_keeps_a_uniform_sample():
+    n_rows, size, n_runs = 100, 10, 400
+    rows = pd.DataFrame({'row': np.arange(n_rows)})
+    included = np.zeros(n_rows)
+    for seed in range(n_runs):
+        reservoir = Reservoir(size, seed)
+        for chunk in np.array_split(np.arange(n_rows), 4):
+            reservoir.update(rows.iloc[chunk])
+        assert reservoir.n == n_rows and len(reservoir.rows) == size
+        assert reservoir.rows['row'].is_unique
+        included[reservoir.rows['row'].to_numpy()] += 1
+    # Every row is kept with probability size / n_rows (standard error 0.015)
+    assert np.abs(included / n_runs - size / n_rows).max() < 0.07
+
+
+def test_reservoir_merge_keeps_the_smallest_keys():
+    rows = pd.DataFrame({'row': np.arange(1_000)})
+    left = Reservoir(20, seed=1).update(rows.iloc[:600])
+    right = Reservoir(20, seed=2).update(rows.iloc[600:])
+    keys = np.sort(np.concatenate([left.keys, right.keys]))[:20]
+    merged = left.merge(right)
+    assert merged.n == 1_000
+    np.testing.assert_array_equal(merged.keys, keys)